@@ -0,0 +1,97 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .models import LanguageChoices
+
+BLOG_CACHE_ALIAS = 'blogs'
+LIST_TAG = 'list'
+
+
+def blog_cache():
+    return caches[BLOG_CACHE_ALIAS]
+
+
+def detail_tag(slug):
+    return f'detail:{slug}'
+
+
+def tag_key(tag):
+    return f'blogs:tag:{tag}'
+
+
+def tag_versions(tags):
+    """
+    Current version of each tag. Versions are timestamps in nanoseconds, so a
+    tag evicted from the cache comes back with a version newer than any entry
+    stored before, never with an old one.
+    """
+    cache = blog_cache()
+    keys = [tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate_tags(*tags):
+    """Every response stored under one of these tags stops being served."""
+    blog_cache().set_many({tag_key(tag): time.time_ns() for tag in tags}, None)
+
+
+def normalize_list_params(query_params, default_page_size, max_page_size):
+    """
+    Only the parameters that change the listing are kept, each with a single
+    representation, so tracking or cache-busting parameters do not create
+    new entries.
+    """
+    params = {}
+    try:
+        page = int(query_params.get('page', 1))
+    except (TypeError, ValueError):
+        page = 1
+    params['page'] = max(page, 1)
+    try:
+        page_size = int(query_params.get('page_size', default_page_size))
+    except (TypeError, ValueError):
+        page_size = default_page_size
+    params['page_size'] = min(max(page_size, 1), max_page_size)
+
+    language = (query_params.get('language') or '').strip().lower()
+    if language in LanguageChoices.values:
+        params['language'] = language
+    category = (query_params.get('category') or '').strip()
+    if category:
+        params['category'] = category
+    return params
+
+
+def response_key(name, params, versions):
+    identity = '&'.join(f'{key}={params[key]}' for key in sorted(params))
+    digest = hashlib.md5(identity.encode()).hexdigest()
+    return f'blogs:response:{name}:{digest}:{".".join(map(str, versions))}'
+
+
+def cached_response(name, params, tags, render):
+    """
+    Returns the cached data of a successful response for (name, params) while
+    the versions of its tags are unchanged; otherwise calls `render` and
+    stores its data. Entries of outdated versions are left to expire.
+    """
+    cache = blog_cache()
+    key = response_key(name, params, tag_versions(tags))
+    data = cache.get(key)
+    if data is not None:
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    response = render()
+    if response.status_code == 200:
+        cache.set(key, response.data)
+    response['X-Cache'] = 'MISS'
+    return response
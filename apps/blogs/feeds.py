@@ -0,0 +1,126 @@
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+from .cache import LIST_TAG, tag_versions
+from .models import BlogPayload
+
+# Límite de URLs por archivo del protocolo sitemap
+SITEMAP_MAX_URLS = 50000
+SITEMAP_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+SITEMAP_FOOTER = '</urlset>\n'
+
+
+def post_url(slug):
+    return settings.BLOG_FEEDS['POST_URL'].format(slug=slug)
+
+
+def render_fragments(blog, updated_at):
+    """
+    XML of the post for the sitemap, the RSS feed and the Atom feed. They are
+    built when the post is saved and stored in its BlogPayload, so serving a
+    sitemap or a feed only concatenates stored fragments.
+    """
+    url = escape(post_url(blog.slug))
+    title = escape(blog.title or '')
+    summary = escape(blog.excerpt or '')
+    published = datetime.combine(blog.date, dt_time.min, tzinfo=dt_timezone.utc) if blog.date else updated_at
+    return {
+        'sitemap_entry': (
+            f'<url><loc>{url}</loc><lastmod>{updated_at.date().isoformat()}</lastmod></url>\n'
+        ),
+        'rss_item': (
+            f'<item><title>{title}</title><link>{url}</link>'
+            f'<guid isPermaLink="true">{url}</guid>'
+            f'<pubDate>{http_date(published.timestamp())}</pubDate>'
+            f'<description>{summary}</description></item>\n'
+        ),
+        'atom_entry': (
+            f'<entry><title>{title}</title><link href={quoteattr(post_url(blog.slug))}/>'
+            f'<id>{url}</id><published>{published.isoformat()}</published>'
+            f'<updated>{updated_at.isoformat()}</updated><summary>{summary}</summary></entry>\n'
+        ),
+    }
+
+
+def last_modified():
+    """
+    Time of the last Blog save or delete: the version of the list tag, a
+    timestamp bumped on every change. Deletes count too, unlike MAX(updated_at).
+    """
+    version, = tag_versions([LIST_TAG])
+    return version // 10 ** 9
+
+
+def _conditional(request, modified, content_type, chunks):
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if since is not None and modified <= since:
+        response = HttpResponseNotModified()
+    else:
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Last-Modified'] = http_date(modified)
+    return response
+
+
+def sitemap_response(request):
+    """sitemap.xml streamed from the stored fragments, newest posts first."""
+    def chunks():
+        yield SITEMAP_HEADER
+        entries = (
+            BlogPayload.objects.exclude(sitemap_entry='')
+            .order_by('-date', '-blog_id')
+            .values_list('sitemap_entry', flat=True)[:SITEMAP_MAX_URLS]
+        )
+        for entry in entries.iterator(chunk_size=2000):
+            yield entry
+        yield SITEMAP_FOOTER
+
+    return _conditional(request, last_modified(), 'application/xml; charset=utf-8', chunks())
+
+
+def _feed_entries(language, field):
+    return (
+        BlogPayload.objects.filter(language=language).exclude(**{field: ''})
+        .order_by('-date', '-blog_id')
+        .values_list(field, flat=True)[:settings.BLOG_FEEDS['ITEMS']]
+    )
+
+
+def rss_response(request, language):
+    modified = last_modified()
+
+    def chunks():
+        title = escape(f"{settings.BLOG_FEEDS['TITLE']} ({language})")
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+            f'<title>{title}</title><link>{escape(settings.FRONTEND_URL)}</link>'
+            f'<description>{title}</description><language>{language}</language>'
+            f'<lastBuildDate>{http_date(modified)}</lastBuildDate>\n'
+        )
+        yield from _feed_entries(language, 'rss_item')
+        yield '</channel></rss>\n'
+
+    return _conditional(request, modified, 'application/rss+xml; charset=utf-8', chunks())
+
+
+def atom_response(request, language):
+    modified = last_modified()
+
+    def chunks():
+        title = escape(f"{settings.BLOG_FEEDS['TITLE']} ({language})")
+        updated = datetime.fromtimestamp(modified, tz=dt_timezone.utc).isoformat()
+        yield (
+            f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="{language}">'
+            f'<title>{title}</title><link href={quoteattr(settings.FRONTEND_URL)}/>'
+            f'<id>{escape(request.build_absolute_uri(request.path))}</id><updated>{updated}</updated>\n'
+        )
+        yield from _feed_entries(language, 'atom_entry')
+        yield '</feed>\n'
+
+    return _conditional(request, modified, 'application/atom+xml; charset=utf-8', chunks())
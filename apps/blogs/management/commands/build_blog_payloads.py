@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from apps.blogs.cache import LIST_TAG, invalidate_tags
+from apps.blogs.models import Blog
+from apps.blogs.payloads import build_payload, missing_payloads
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera el JSON pre-renderizado (y sus variantes gzip/brotli) del detalle de cada blog "
+        "y sus fragmentos del sitemap y los feeds. Por defecto solo los que aún no los tienen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Regenera también los existentes")
+
+    def handle(self, *args, **options):
+        blogs = (Blog.objects.all() if options['all'] else missing_payloads()).order_by('pk')
+
+        built = original = compressed = 0
+        for blog in blogs.iterator(chunk_size=200):
+            payload = build_payload(blog)
+            built += 1
+            original += len(payload.json)
+            compressed += len(payload.gzip)
+
+        self.stdout.write(f"Payloads generados: {built}")
+        if built:
+            # El sitemap y los feeds cambian: nuevo Last-Modified
+            invalidate_tags(LIST_TAG)
+            self.stdout.write(self.style.SUCCESS(
+                f"JSON: {original / 1024:.1f} KiB, gzip: {compressed / 1024:.1f} KiB "
+                f"({compressed / original:.0%})"
+            ))
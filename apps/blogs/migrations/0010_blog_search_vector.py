@@ -0,0 +1,54 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:40
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Same document as apps.blogs.search.blog_search_vector, written out so the
+# migration does not depend on the current code
+SEARCH_VECTOR_SQL = """
+    UPDATE blogs_blog SET search_vector =
+        setweight(to_tsvector(cfg, COALESCE(title, '')), 'A')
+        || setweight(to_tsvector(cfg, COALESCE(excerpt, '')), 'B')
+        || setweight(to_tsvector(cfg, COALESCE(content, '')), 'C')
+    FROM (
+        SELECT id AS blog_id, (CASE language
+            WHEN 'es' THEN 'spanish' WHEN 'en' THEN 'english' WHEN 'pt' THEN 'portuguese'
+            ELSE 'simple' END)::regconfig AS cfg
+        FROM blogs_blog
+    ) AS configs
+    WHERE blogs_blog.id = configs.blog_id
+"""
+
+
+def fill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(SEARCH_VECTOR_SQL)
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS blog_search_vector_gin '
+        'ON blogs_blog USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS blog_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('blogs', '0009_alter_blog_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vector, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0010_blog_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogPayload',
+            fields=[
+                ('blog', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='blogs.blog')),
+                ('slug', models.SlugField(max_length=500, unique=True)),
+                ('json', models.BinaryField()),
+                ('gzip', models.BinaryField()),
+                ('brotli', models.BinaryField(null=True)),
+                ('etag', models.CharField(max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
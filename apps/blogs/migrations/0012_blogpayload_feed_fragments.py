@@ -0,0 +1,46 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0011_blogpayload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpayload',
+            name='atom_entry',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='blogpayload',
+            name='date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='blogpayload',
+            name='language',
+            field=models.CharField(default='es', max_length=2),
+        ),
+        migrations.AddField(
+            model_name='blogpayload',
+            name='rss_item',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='blogpayload',
+            name='sitemap_entry',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddIndex(
+            model_name='blogpayload',
+            index=models.Index(fields=['-date', '-blog'], name='blog_payload_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpayload',
+            index=models.Index(fields=['language', '-date', '-blog'], name='blog_payload_lang_date_idx'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -22,6 +23,9 @@ class Blog(models.Model):
         default=LanguageChoices.ES,
         db_index=True
     )
+    # Documento de búsqueda (título, extracto y contenido) en la configuración del idioma del post.
+    # Se recalcula al guardar (apps.blogs.signals); solo se llena en PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['-date']
@@ -31,5 +35,43 @@ class Blog(models.Model):
             models.Index(fields=['category', '-date'], name='blog_cat_date_idx'),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Slug con el que se cargó, para invalidar su caché si se renombra
+        instance._loaded_slug = dict(zip(field_names, values)).get('slug')
+        return instance
+
     def __str__(self):
         return self.title or "Sin título"
+
+
+class BlogPayload(models.Model):
+    """
+    Respuesta de detalle ya renderizada de un Blog (JSON de BlogSerializer) con sus
+    variantes comprimidas. Se regenera al guardar el Blog (apps.blogs.signals), así
+    el detalle se sirve sin serializar.
+    """
+    blog = models.OneToOneField(Blog, on_delete=models.CASCADE, primary_key=True, related_name='payload')
+    slug = models.SlugField(unique=True, max_length=500)
+    json = models.BinaryField()
+    gzip = models.BinaryField()
+    brotli = models.BinaryField(null=True)
+    etag = models.CharField(max_length=40)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Copia de los campos del Blog por los que se ordenan y filtran el sitemap y los feeds
+    language = models.CharField(max_length=2, default=LanguageChoices.ES)
+    date = models.DateField(null=True)
+    # Fragmentos XML del post en el sitemap y en los feeds RSS/Atom (apps.blogs.feeds)
+    sitemap_entry = models.TextField(default='')
+    rss_item = models.TextField(default='')
+    atom_entry = models.TextField(default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-blog'], name='blog_payload_date_idx'),
+            models.Index(fields=['language', '-date', '-blog'], name='blog_payload_lang_date_idx'),
+        ]
+
+    def __str__(self):
+        return self.slug
@@ -0,0 +1,145 @@
+import gzip
+import hashlib
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from .cache import LIST_TAG, blog_cache, detail_tag, invalidate_tags, tag_versions
+from .feeds import render_fragments
+from .models import Blog, BlogPayload
+from .serializers import BlogSerializer
+
+try:
+    import brotli
+except ImportError:  # sin brotli solo se generan las variantes json y gzip
+    brotli = None
+
+IDENTITY = 'identity'
+GZIP = 'gzip'
+BROTLI = 'br'
+# Column of BlogPayload holding each variant
+VARIANT_FIELDS = {IDENTITY: 'json', GZIP: 'gzip', BROTLI: 'brotli'}
+
+
+def render_payload(blog):
+    """
+    JSON of BlogSerializer for the post, with its compressed variants, ETag
+    and its sitemap/RSS/Atom fragments.
+    """
+    body = JSONRenderer().render(BlogSerializer(blog).data)
+    return {
+        **render_fragments(blog, timezone.now()),
+        'slug': blog.slug,
+        'language': blog.language,
+        'date': blog.date,
+        'json': body,
+        # mtime fijo: el mismo contenido produce los mismos bytes
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        'brotli': brotli.compress(body, quality=11) if brotli else None,
+        'etag': f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+    }
+
+
+def build_payload(blog):
+    payload, _ = BlogPayload.objects.update_or_create(blog=blog, defaults=render_payload(blog))
+    return payload
+
+
+def missing_payloads():
+    """Posts without a payload, or with one older than the sitemap/feed fragments."""
+    return Blog.objects.exclude(pk__in=BlogPayload.objects.exclude(sitemap_entry='').values('blog_id'))
+
+
+def build_missing_payloads():
+    """
+    Builds the payloads the sitemap and the feeds read, for posts that predate
+    them or were written without the post_save signal. Checked once per
+    version of the list tag, so a complete set costs one cache lookup.
+    """
+    cache = blog_cache()
+    version, = tag_versions([LIST_TAG])
+    checked_key = f'blogs:payloads:complete:{version}'
+    if cache.get(checked_key):
+        return 0
+
+    built = 0
+    for blog in missing_payloads().order_by('pk').iterator(chunk_size=200):
+        build_payload(blog)
+        built += 1
+    if built:
+        # El sitemap y los feeds cambian: nuevo Last-Modified
+        invalidate_tags(LIST_TAG)
+        version, = tag_versions([LIST_TAG])
+    cache.set(f'blogs:payloads:complete:{version}', True)
+    return built
+
+
+def preferred_encoding(accept_encoding, available):
+    """Brotli, then gzip, among the encodings the client accepts (q=0 excluded)."""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if coding and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.lower())
+    for encoding in (BROTLI, GZIP):
+        if encoding in available and (encoding in accepted or '*' in accepted):
+            return encoding
+    return IDENTITY
+
+
+def _load_variant(slug, encoding):
+    """(etag, body) of a variant, building the payload when the post has none yet."""
+    row = BlogPayload.objects.filter(slug=slug).values_list('etag', VARIANT_FIELDS[encoding]).first()
+    if row is None:
+        blog = Blog.objects.filter(slug=slug).first()
+        if blog is None:
+            return None
+        payload = build_payload(blog)
+        row = (payload.etag, getattr(payload, VARIANT_FIELDS[encoding]))
+    if row[1] is None:
+        return None
+    return row[0], bytes(row[1])
+
+
+def payload_response(request, slug):
+    """
+    Detail response of a post from its pre-rendered payload, in the variant
+    matching Accept-Encoding, or None when the post does not exist. The bytes
+    are cached under the post's detail tag, so a hit touches neither the
+    database nor the serializer.
+    """
+    available = {GZIP, BROTLI} if brotli else {GZIP}
+    encoding = preferred_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), available)
+
+    cache = blog_cache()
+    version, = tag_versions([detail_tag(slug)])
+    key = f'blogs:payload:{slug}:{encoding}:{version}'
+    variant = cache.get(key)
+    cache_status = 'HIT'
+    if variant is None:
+        cache_status = 'MISS'
+        loaded = _load_variant(slug, encoding)
+        if loaded is None and encoding == BROTLI:
+            # Payload generado cuando brotli no estaba disponible
+            loaded = _load_variant(slug, GZIP)
+            encoding = GZIP
+        if loaded is None:
+            return None
+        variant = (encoding, *loaded)
+        cache.set(key, variant)
+
+    encoding, etag, body = variant
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+        if encoding != IDENTITY:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['X-Cache'] = cache_status
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,128 @@
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.utils.html import escape
+
+from .models import Blog
+
+# Text search configuration of PostgreSQL for each blog language
+SEARCH_CONFIGS = {
+    'es': 'spanish',
+    'en': 'english',
+    'pt': 'portuguese',
+}
+SEARCH_MIN_LENGTH = 2
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+HEADLINE_OPTIONS = {'max_words': 35, 'min_words': 15, 'max_fragments': 2}
+
+
+def normalize_term(term):
+    return ' '.join((term or '').split())
+
+
+def language_config():
+    """regconfig of each row, from its language column."""
+    return Case(
+        *(When(language=language, then=Value(config)) for language, config in SEARCH_CONFIGS.items()),
+        default=Value('simple'),
+    )
+
+
+def blog_search_vector():
+    """Weighted document of a post: title A, excerpt B, content C, in the post's language."""
+    config = language_config()
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector('excerpt', weight='B', config=config)
+        + SearchVector('content', weight='C', config=config)
+    )
+
+
+def update_search_vector(blog_ids):
+    """Recomputes search_vector for these posts in the database. PostgreSQL only."""
+    if connection.vendor != 'postgresql':
+        return
+    Blog.objects.filter(pk__in=blog_ids).update(search_vector=blog_search_vector())
+
+
+def _search_query(term, language):
+    if language in SEARCH_CONFIGS:
+        return SearchQuery(term, config=SEARCH_CONFIGS[language], search_type='websearch')
+    # Sin idioma, el término se analiza con la configuración de cada idioma
+    query = None
+    for config in SEARCH_CONFIGS.values():
+        language_query = SearchQuery(term, config=config, search_type='websearch')
+        query = language_query if query is None else query | language_query
+    return query
+
+
+def _postgres_search(queryset, term, language):
+    query = _search_query(term, language)
+    return (
+        queryset
+        .filter(search_vector=query)
+        .annotate(
+            rank=SearchRank(F('search_vector'), query),
+            headline=SearchHeadline(
+                'excerpt', query, config=language_config(),
+                start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP, **HEADLINE_OPTIONS,
+            ),
+        )
+        .order_by('-rank', '-date')
+    )
+
+
+def _portable_search(queryset, term):
+    """Every word in the title or excerpt; a match in the title ranks higher."""
+    words = term.split()
+    matches = Q()
+    title_matches = Q()
+    for word in words:
+        matches &= Q(title__icontains=word) | Q(excerpt__icontains=word)
+        title_matches &= Q(title__icontains=word)
+    return (
+        queryset
+        .filter(matches)
+        .annotate(rank=Case(When(title_matches, then=Value(1.0)), default=Value(0.5), output_field=FloatField()))
+        .order_by('-rank', '-date')
+    )
+
+
+def search_blogs(queryset, term, language=None):
+    """
+    Ranked full-text search over title, excerpt and content.
+
+    On PostgreSQL the query runs against the GIN-indexed `search_vector`,
+    stemmed with the configuration of each language, and the excerpt comes
+    back highlighted. Other backends fall back to `icontains` over title and
+    excerpt, highlighted by `highlight_excerpt`.
+    """
+    term = normalize_term(term)
+    if language in SEARCH_CONFIGS:
+        queryset = queryset.filter(language=language)
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, term, language)
+    return _portable_search(queryset, term)
+
+
+def highlight_excerpt(excerpt, term):
+    """Escaped excerpt with the words of the term wrapped in <mark>."""
+    if not excerpt:
+        return excerpt
+    text = escape(excerpt)
+    words = sorted(set(normalize_term(term).split()), key=len, reverse=True)
+    if not words:
+        return text
+    # The excerpt is escaped, so the words are matched in their escaped form
+    pattern = re.compile('|'.join(re.escape(escape(word)) for word in words), re.IGNORECASE)
+    return pattern.sub(lambda match: f'{HIGHLIGHT_START}{match.group(0)}{HIGHLIGHT_STOP}', text)
+
+
+def escape_headline(headline):
+    """Escapes a headline from PostgreSQL while keeping its <mark> tags."""
+    if not headline:
+        return headline
+    return escape(headline).replace(escape(HIGHLIGHT_START), HIGHLIGHT_START).replace(escape(HIGHLIGHT_STOP), HIGHLIGHT_STOP)
@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from .models import Blog, LanguageChoices
+from .search import escape_headline, highlight_excerpt
 
 class BlogSerializer(serializers.ModelSerializer):
     class Meta:
         model = Blog
-        fields = '__all__'
+        # search_vector es interno de la búsqueda
+        exclude = ['search_vector']
 
 class BlogListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -29,3 +31,18 @@ class BlogListSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"Idioma no soportado: {value}")
         return value
 
+
+
+class BlogSearchSerializer(BlogListSerializer):
+    """Resultado de búsqueda: campos del listado, relevancia y extracto con coincidencias en <mark>."""
+    rank = serializers.FloatField(read_only=True)
+    highlight = serializers.SerializerMethodField()
+
+    class Meta(BlogListSerializer.Meta):
+        fields = BlogListSerializer.Meta.fields + ['rank', 'highlight']
+
+    def get_highlight(self, obj):
+        headline = getattr(obj, 'headline', None)
+        if headline is not None:
+            return escape_headline(headline)
+        return highlight_excerpt(obj.excerpt, self.context.get('search_term', ''))
@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import LIST_TAG, detail_tag, invalidate_tags
+from .models import Blog
+from .payloads import build_payload
+from .search import update_search_vector
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def invalidate_blog_responses(sender, instance, **kwargs):
+    # El slug anterior también, por si se cambió en esta edición
+    slugs = {instance.slug, getattr(instance, '_loaded_slug', None)} - {None}
+    tags = [LIST_TAG, *(detail_tag(slug) for slug in slugs)]
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+@receiver(post_save, sender=Blog)
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'excerpt', 'content', 'language'} & set(update_fields):
+        return
+    update_search_vector([instance.pk])
+
+
+@receiver(post_save, sender=Blog)
+def rebuild_payload(sender, instance, **kwargs):
+    # El JSON del detalle se renderiza una vez aquí, no en cada lectura
+    build_payload(instance)
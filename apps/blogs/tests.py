@@ -1,3 +1,147 @@
-from django.test import TestCase
+import gzip
+import json
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from .cache import LIST_TAG, tag_versions
+from .models import Blog, BlogPayload
+from .payloads import brotli
+from .search import search_blogs
+
+BLOG_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'blogs': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-blogs'},
+}
+
+
+@override_settings(CACHES=BLOG_CACHES)
+class BlogTestCase(TestCase):
+    def setUp(self):
+        caches['blogs'].clear()
+
+    def make_blog(self, slug, **fields):
+        # Las etiquetas se invalidan on_commit
+        with self.captureOnCommitCallbacks(execute=True):
+            return Blog.objects.create(slug=slug, title=fields.pop('title', slug.replace('-', ' ')), **fields)
+
+
+class BlogListCacheTests(BlogTestCase):
+    def test_saving_a_post_invalidates_the_cached_list(self):
+        self.make_blog('primero')
+        self.client.get('/api/v1/blogs/')
+        self.assertEqual(self.client.get('/api/v1/blogs/')['X-Cache'], 'HIT')
+        version, = tag_versions([LIST_TAG])
+
+        self.make_blog('segundo')
+
+        response = self.client.get('/api/v1/blogs/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertGreater(tag_versions([LIST_TAG])[0], version)
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_cached_pages_link_relative_to_any_host(self):
+        for index in range(3):
+            self.make_blog(f'post-{index}')
+
+        first = self.client.get('/api/v1/blogs/', {'page_size': 2, 'utm_source': 'x'}, HTTP_HOST='a.example.com')
+        second = self.client.get('/api/v1/blogs/', {'page_size': 2}, HTTP_HOST='b.example.com', secure=True)
+
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json()['next'], '/api/v1/blogs/?page=2&page_size=2')
+        self.assertEqual(second.json()['next'], first.json()['next'])
+
+
+class BlogFeedTests(BlogTestCase):
+    def test_sitemap_includes_posts_without_payload(self):
+        self.make_blog('con-payload')
+        legacy = self.make_blog('anterior')
+        BlogPayload.objects.filter(blog=legacy).delete()
+
+        body = b''.join(self.client.get('/api/v1/blogs/sitemap.xml').streaming_content).decode()
+
+        self.assertIn('blog/anterior</loc>', body)
+        self.assertIn('blog/con-payload</loc>', body)
+        self.assertTrue(BlogPayload.objects.filter(blog=legacy).exists())
+
+    def test_feeds_are_filtered_by_language(self):
+        self.make_blog('hola', language='es', excerpt='Envíos <rápidos>')
+        self.make_blog('ola', language='pt')
+
+        rss = b''.join(self.client.get('/api/v1/blogs/feeds/es/rss.xml').streaming_content).decode()
+        atom = self.client.get('/api/v1/blogs/feeds/es/atom.xml')
+
+        self.assertIn(f'<link>{settings.FRONTEND_URL}blog/hola</link>', rss)
+        self.assertIn('Envíos &lt;rápidos&gt;', rss)
+        self.assertNotIn('blog/ola', rss)
+        self.assertEqual(atom['Content-Type'], 'application/atom+xml; charset=utf-8')
+
+    def test_unchanged_sitemap_answers_304(self):
+        self.make_blog('hola')
+        modified = self.client.get('/api/v1/blogs/sitemap.xml')['Last-Modified']
+
+        response = self.client.get('/api/v1/blogs/sitemap.xml', HTTP_IF_MODIFIED_SINCE=modified)
+
+        self.assertEqual(response.status_code, 304)
+
+
+class BlogSearchTests(BlogTestCase):
+    def test_portable_search_ranks_title_matches_first(self):
+        self.make_blog('en-el-extracto', title='Tipo de cambio', excerpt='Cómo enviar remesas a Brasil')
+        self.make_blog('en-el-titulo', title='Remesas a Brasil', excerpt='Guía')
+        self.make_blog('otro', title='Noticias', language='pt')
+
+        results = self.client.get('/api/v1/blogs/search/', {'q': 'remesas brasil'}).json()['results']
+
+        self.assertEqual([result['slug'] for result in results], ['en-el-titulo', 'en-el-extracto'])
+        self.assertEqual(results[1]['highlight'], 'Cómo enviar <mark>remesas</mark> a <mark>Brasil</mark>')
+
+    def test_short_terms_are_rejected(self):
+        self.assertEqual(self.client.get('/api/v1/blogs/search/', {'q': 'a'}).status_code, 400)
+
+    def test_search_vector_is_postgres_only(self):
+        blog = self.make_blog('vector', title='Remesas')
+
+        blog.refresh_from_db()
+        self.assertEqual(blog.search_vector is not None, connection.vendor == 'postgresql')
+        self.assertEqual(list(search_blogs(Blog.objects.all(), 'remesas', 'es')), [blog])
+
+
+class BlogPayloadTests(BlogTestCase):
+    def test_detail_is_served_in_the_accepted_encoding(self):
+        self.make_blog('detalle', content='Contenido ' * 200)
+
+        plain = self.client.get('/api/v1/blogs/detalle/', HTTP_ACCEPT_ENCODING='identity')
+        compressed = self.client.get('/api/v1/blogs/detalle/', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(json.loads(plain.content)['slug'], 'detalle')
+        self.assertEqual(compressed['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+
+    def test_matching_etag_answers_304_until_the_post_changes(self):
+        blog = self.make_blog('detalle')
+        etag = self.client.get('/api/v1/blogs/detalle/')['ETag']
+
+        self.assertEqual(self.client.get('/api/v1/blogs/detalle/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        blog.title = 'Nuevo título'
+        with self.captureOnCommitCallbacks(execute=True):
+            blog.save()
+        response = self.client.get('/api/v1/blogs/detalle/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['title'], 'Nuevo título')
+
+    def test_brotli_variant(self):
+        if brotli is None:
+            self.skipTest('brotli no está instalado')
+        self.make_blog('detalle')
+
+        response = self.client.get('/api/v1/blogs/detalle/', HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(brotli.decompress(response.content))['slug'], 'detalle')
@@ -1,10 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BlogViewSet
+from .views import BlogViewSet, language_feed, sitemap
 
 router = DefaultRouter()
 router.register(r'', BlogViewSet, basename='blogs')
 
 urlpatterns = [
+    path('sitemap.xml', sitemap, name='blogs-sitemap'),
+    path('feeds/<str:language>/rss.xml', language_feed, {'kind': 'rss'}, name='blogs-rss'),
+    path('feeds/<str:language>/atom.xml', language_feed, {'kind': 'atom'}, name='blogs-atom'),
     path('', include(router.urls)),
 ]
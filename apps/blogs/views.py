@@ -1,9 +1,17 @@
-from rest_framework import viewsets
+from django.http import Http404
+from django.views.decorators.http import require_safe
+from django.utils.http import urlencode
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from .models import Blog
-from .serializers import BlogSerializer, BlogListSerializer
+from .cache import LIST_TAG, cached_response, normalize_list_params
+from .feeds import atom_response, rss_response, sitemap_response
+from .models import Blog, LanguageChoices
+from .payloads import build_missing_payloads, payload_response
+from .search import SEARCH_MIN_LENGTH, normalize_term, search_blogs
+from .serializers import BlogSerializer, BlogListSerializer, BlogSearchSerializer
 from apps.users.permissions import IsStaff
 from rest_framework.permissions import AllowAny
 
@@ -11,26 +19,105 @@ class BlogPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    # Parámetros normalizados de la clave de caché (normalize_list_params), fijados por la vista
+    params = None
+
+    def get_page_size(self, request):
+        if self.params is not None:
+            return self.params['page_size']
+        return super().get_page_size(request)
+
+    def get_page_number(self, request, paginator):
+        if self.params is not None:
+            return self.params['page']
+        return super().get_page_number(request, paginator)
+
+    def page_link(self, page_number):
+        # Enlace relativo: la respuesta cacheada se sirve igual a cualquier host y esquema
+        return f"{self.request.path}?{urlencode({**self.params, 'page': page_number})}"
+
+    def get_next_link(self):
+        if self.params is None:
+            return super().get_next_link()
+        return self.page_link(self.page.next_page_number()) if self.page.has_next() else None
+
+    def get_previous_link(self):
+        if self.params is None:
+            return super().get_previous_link()
+        return self.page_link(self.page.previous_page_number()) if self.page.has_previous() else None
 
-@method_decorator(cache_page(60), name='list')
-@method_decorator(cache_page(60), name='retrieve')
 class BlogViewSet(viewsets.ModelViewSet):
+    """
+    Listados y detalle se guardan en la caché compartida 'blogs' (ver apps.blogs.cache)
+    y se invalidan por etiquetas cuando se guarda o borra un Blog.
+    """
     serializer_class = BlogSerializer
     lookup_field = 'slug'
     pagination_class = BlogPagination
 
     def get_queryset(self):
         base_qs = Blog.objects.all()
+        if self.action == 'search':
+            # El contenido solo se usa dentro del índice de búsqueda
+            return base_qs.only('id', 'title', 'slug', 'excerpt', 'category', 'public_id', 'read_time', 'date', 'language')
         if self.action == 'list':
             # Evita traer el campo pesado 'content' en listados
-            return (
+            qs = (
                 base_qs
                 .only('id', 'title', 'slug', 'excerpt', 'category', 'public_id', 'read_time', 'date', 'language')
                 .order_by('-date')
             )
+            params = self.paginator.params
+            if params.get('language'):
+                qs = qs.filter(language=params['language'])
+            if params.get('category'):
+                qs = qs.filter(category=params['category'])
+            return qs
         return base_qs.order_by('-date')
 
+    def list(self, request, *args, **kwargs):
+        params = normalize_list_params(
+            request.query_params, BlogPagination.page_size, BlogPagination.max_page_size
+        )
+        # La consulta y los enlaces de paginación usan los parámetros normalizados de la clave
+        self.paginator.params = params
+        return cached_response('list', params, [LIST_TAG], lambda: super(BlogViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        # JSON pre-renderizado al guardar, en la variante comprimida que acepte el cliente
+        response = payload_response(request, kwargs[self.lookup_field])
+        if response is None:
+            raise NotFound()
+        return response
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Búsqueda de texto completo: ?q=término&language=es&category=...&page=2"""
+        term = normalize_term(request.query_params.get('q')).lower()
+        if len(term) < SEARCH_MIN_LENGTH:
+            return Response(
+                {'error': f'El término de búsqueda debe tener al menos {SEARCH_MIN_LENGTH} caracteres'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        params = normalize_list_params(
+            request.query_params, BlogPagination.page_size, BlogPagination.max_page_size
+        )
+        params['q'] = term
+        self.paginator.params = params
+
+        def render():
+            queryset = search_blogs(self.get_queryset(), term, params.get('language'))
+            if params.get('category'):
+                queryset = queryset.filter(category=params['category'])
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True, context={**self.get_serializer_context(), 'search_term': term})
+            return self.get_paginated_response(serializer.data)
+
+        return cached_response('search', params, [LIST_TAG], render)
+
     def get_serializer_class(self):
+        if self.action == 'search':
+            return BlogSearchSerializer
         if self.action == 'list':
             return BlogListSerializer
         return BlogSerializer
@@ -39,3 +126,21 @@ class BlogViewSet(viewsets.ModelViewSet):
         if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
             return [AllowAny()]
         return [IsStaff()]
+
+
+@require_safe
+def sitemap(request):
+    """sitemap.xml de los blogs, armado con los fragmentos guardados al editar cada post."""
+    # Posts anteriores a los payloads: se generan una vez, no quedan fuera del sitemap
+    build_missing_payloads()
+    return sitemap_response(request)
+
+
+@require_safe
+def language_feed(request, language, kind):
+    if language not in LanguageChoices.values:
+        raise Http404()
+    build_missing_payloads()
+    if kind == 'atom':
+        return atom_response(request, language)
+    return rss_response(request, language)
@@ -0,0 +1,11 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Backends whose entries only exist inside the process that wrote them
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """True when every worker reading the cache sees what any other worker wrote to it."""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
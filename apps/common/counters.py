@@ -0,0 +1,58 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+
+class CacheCounterStore:
+    """
+    Counters kept in the Django cache, shared by every worker using the same
+    backend. Reads are a single `get_many` round trip.
+    """
+
+    def __init__(self, **options):
+        pass
+
+    def get_many(self, keys):
+        return cache.get_many(keys)
+
+    def incr_many(self, deltas, timeout):
+        for key, delta in deltas.items():
+            if cache.add(key, delta, timeout):
+                continue
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                # Expired between add and incr
+                cache.set(key, delta, timeout)
+
+
+class LocalCounterStore:
+    """Process-local stand-in for tests and single-process development servers."""
+
+    def __init__(self, max_entries=50000, **options):
+        self.max_entries = max_entries
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._counters.get(key)
+                if entry and entry[1] > now:
+                    found[key] = entry[0]
+        return found
+
+    def incr_many(self, deltas, timeout):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._counters) > self.max_entries:
+                self._counters = {key: entry for key, entry in self._counters.items() if entry[1] > now}
+            for key, delta in deltas.items():
+                entry = self._counters.get(key)
+                if entry and entry[1] > now:
+                    self._counters[key] = (entry[0] + delta, entry[1])
+                else:
+                    self._counters[key] = (delta, now + timeout)
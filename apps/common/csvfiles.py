@@ -0,0 +1,26 @@
+import codecs
+
+
+def text_lines(stream, encoding='utf-8-sig'):
+    """Yields the lines of a text or binary file, decoding them one at a time."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for line in stream:
+        yield decoder.decode(line) if isinstance(line, bytes) else line
+
+
+def csv_lines(stream, encoding='utf-8-sig'):
+    """
+    Returns (lines, delimiter) for csv.reader/DictReader over an uploaded
+    file. The delimiter is guessed from the header line: ';' (spreadsheets
+    with a Spanish or Portuguese locale) when it is more frequent than ','.
+    The file is still read one line at a time.
+    """
+    lines = text_lines(stream, encoding)
+    first = next(lines, '')
+    delimiter = ';' if first.count(';') > first.count(',') else ','
+
+    def rows():
+        yield first
+        yield from lines
+
+    return rows(), delimiter
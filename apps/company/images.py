@@ -0,0 +1,77 @@
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# Anchos generados para srcset; solo los menores que la imagen original, más su propio ancho
+VARIANT_WIDTHS = (480, 960, 1440)
+VARIANT_QUALITY = 80
+VARIANT_DIR = 'popups/variants'
+# AVIF requiere un Pillow compilado con libavif
+VARIANT_FORMATS = tuple(
+    name for name, available in (('avif', features.check('avif')), ('webp', features.check('webp'))) if available
+)
+CONTENT_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+
+def content_hash(field_file):
+    digest = hashlib.sha256()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()[:20]
+
+
+def variant_name(digest, width, image_format):
+    return f'{digest}-{width}.{image_format}'
+
+
+def generate_variants(field_file):
+    """
+    Writes responsive WebP/AVIF copies of an uploaded image to storage and
+    returns their description: {'source', 'hash', 'width', 'height',
+    'variants': {format: [{'width', 'name'}]}}. Names carry the hash of the
+    original's content, so a file under a given name never changes and the
+    same image uploaded twice reuses its files.
+    """
+    digest = content_hash(field_file)
+    field_file.open('rb')
+    try:
+        image = ImageOps.exif_transpose(Image.open(field_file))
+        image.load()
+    finally:
+        field_file.close()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'P') else 'RGB')
+
+    widths = sorted({width for width in VARIANT_WIDTHS if width < image.width} | {min(image.width, max(VARIANT_WIDTHS))})
+    variants = {}
+    for image_format in VARIANT_FORMATS:
+        variants[image_format] = []
+        for width in widths:
+            name = variant_name(digest, width, image_format)
+            path = f'{VARIANT_DIR}/{name}'
+            if not default_storage.exists(path):
+                height = round(image.height * width / image.width)
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                buffer = BytesIO()
+                resized.save(buffer, format=image_format.upper(), quality=VARIANT_QUALITY)
+                default_storage.save(path, ContentFile(buffer.getvalue()))
+            variants[image_format].append({'width': width, 'name': name})
+
+    return {
+        'source': field_file.name,
+        'hash': digest,
+        'width': image.width,
+        'height': image.height,
+        'variants': variants,
+    }
+
+
+def variant_path(name):
+    return f'{VARIANT_DIR}/{name}'
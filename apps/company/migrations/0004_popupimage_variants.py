@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0003_popupimage_end_date_popupimage_is_active_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='popupimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
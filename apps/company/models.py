@@ -22,5 +22,9 @@ class PopupImage(models.Model):
         default=True,
         help_text="Indicates if the popup is active or has been manually deactivated"
     )
+    # Copias WebP/AVIF por ancho de image_pe e image_br ({'pe': {...}, 'br': {...}}),
+    # generadas al subir la imagen (apps.company.images)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+
     class Meta:
         ordering = ['-created_at']
\ No newline at end of file
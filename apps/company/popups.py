@@ -0,0 +1,167 @@
+import bisect
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PopupImage
+
+TIMELINE_VERSION_KEY = 'company:popup-timeline:version'
+# Popups without country are shown in every country
+ALL_COUNTRIES = '*'
+NEVER = datetime.max.replace(tzinfo=dt_timezone.utc)
+
+
+def country_key(country):
+    return (country or '').strip().lower() or ALL_COUNTRIES
+
+
+class CountryTimeline:
+    """
+    Windows of one country: sorted boundaries (every start_date/end_date) and,
+    for each segment between two boundaries, the popups active in it, the
+    country's own first and then the global ones, newest first.
+    """
+
+    def __init__(self, popups):
+        self.boundaries = sorted(
+            {popup.start_date for popup in popups} | {popup.end_date for popup in popups if popup.end_date}
+        )
+        order = sorted(popups, key=lambda popup: (popup.country_key == ALL_COUNTRIES, -popup.created_at.timestamp()))
+        # Segment i covers [boundaries[i - 1], boundaries[i])
+        self.segments = [
+            [
+                popup for popup in order
+                if popup.start_date <= start and (popup.end_date is None or popup.end_date > start)
+            ] if start is not None else []
+            for start in [None, *self.boundaries]
+        ]
+
+    def at(self, instant):
+        """(popups, valid_until) at that instant: a bisect over the boundaries."""
+        index = bisect.bisect_right(self.boundaries, instant)
+        until = self.boundaries[index] if index < len(self.boundaries) else NEVER
+        return self.segments[index], until
+
+
+class PopupTimeline:
+    """
+    Process-local index of the scheduled popups by country.
+
+    Selecting the popup of a country is a dict lookup into the active set of
+    the current segment. A timer thread swaps that set at each window
+    boundary; a lookup arriving before the timer fires falls back to a bisect,
+    so the switch is exact either way. The index is rebuilt with one query
+    when a write bumps the shared version in the cache (checked at most every
+    `sync_interval` seconds) or after `max_staleness` seconds, which also
+    covers per-process caches that do not see the other workers' writes.
+    """
+
+    def __init__(self, sync_interval=1, max_staleness=60):
+        self.sync_interval = sync_interval
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._timelines = None
+        self._version = None
+        self._synced_at = 0
+        self._built_at = 0
+        # (active set by country, since, until)
+        self._current = None
+        self._timer = None
+        self._rendered = {}
+
+    def _rebuild(self, now):
+        popups = list(
+            PopupImage.objects.filter(Q(end_date__isnull=True) | Q(end_date__gt=timezone.now()), is_active=True)
+        )
+        for popup in popups:
+            popup.country_key = country_key(popup.country)
+        global_popups = [popup for popup in popups if popup.country_key == ALL_COUNTRIES]
+        countries = {popup.country_key for popup in popups} - {ALL_COUNTRIES}
+        timelines = {ALL_COUNTRIES: CountryTimeline(global_popups)}
+        for country in countries:
+            timelines[country] = CountryTimeline(
+                [popup for popup in popups if popup.country_key == country] + global_popups
+            )
+        self._timelines = timelines
+        self._rendered = {}
+        self._built_at = now
+        self._swap(timezone.now())
+
+    def _swap(self, instant):
+        """Active set of every country at `instant`, and a timer for the next boundary."""
+        active = {}
+        until = NEVER
+        for country, timeline in self._timelines.items():
+            popups, country_until = timeline.at(instant)
+            active[country] = (popups, country_until)
+            until = min(until, country_until)
+        self._current = (active, instant, until)
+
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        if until is not NEVER:
+            delay = max(0.0, (until - timezone.now()).total_seconds())
+            self._timer = threading.Timer(delay, self._tick)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _tick(self):
+        with self._lock:
+            if self._timelines is not None:
+                self._swap(timezone.now())
+
+    def sync(self):
+        now = time.monotonic()
+        if self._timelines is not None and now - self._synced_at <= self.sync_interval:
+            return
+        version = cache.get(TIMELINE_VERSION_KEY)
+        with self._lock:
+            if (
+                self._timelines is None
+                or version != self._version
+                or now - self._built_at > self.max_staleness
+            ):
+                self._rebuild(now)
+            self._version = version
+            self._synced_at = now
+
+    def select(self, country=None, instant=None):
+        """(popups, valid_until) for the country at the instant (now by default)."""
+        self.sync()
+        instant = instant or timezone.now()
+        key = country_key(country)
+        active, since, until = self._current
+        if since <= instant < until:
+            return active.get(key, active[ALL_COUNTRIES])
+        timelines = self._timelines
+        return timelines.get(key, timelines[ALL_COUNTRIES]).at(instant)
+
+    def invalidate(self):
+        """Forces the next lookup of this process to check the shared version."""
+        self._synced_at = 0
+
+    def render(self, popup, base, render):
+        """Response data and ETag of a popup, rendered once per popup and host."""
+        key = (popup.pk, base)
+        if key not in self._rendered:
+            data = render(popup)
+            digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:32]
+            self._rendered[key] = (data, f'"{digest}"')
+        return self._rendered[key]
+
+
+popup_timeline = PopupTimeline()
+
+
+def publish_popup_change():
+    """Tells every worker, once the write is committed, to rebuild its timeline."""
+    cache.set(TIMELINE_VERSION_KEY, time.time_ns(), None)
+    # Este proceso no espera al intervalo de sincronización
+    popup_timeline.invalidate()
@@ -1,7 +1,26 @@
+from django.urls import reverse
 from rest_framework import serializers
 from .models import PopupImage
 
 class PopupImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = PopupImage
-        fields = ['id', 'image_pe','image_br', 'date', 'country', 'alias', 'start_date','end_date','is_active','created_at']
+        fields = ['id', 'image_pe','image_br', 'date', 'country', 'alias', 'start_date','end_date','is_active','created_at', 'variants']
+
+    def get_variants(self, obj):
+        """Por imagen: tamaño original y, por formato, las copias por ancho con su URL inmutable."""
+        request = self.context.get('request')
+        result = {}
+        for key, image in (obj.variants or {}).items():
+            result[key] = {'width': image['width'], 'height': image['height']}
+            for image_format, sizes in image['variants'].items():
+                result[key][image_format] = [
+                    {'width': size['width'], 'url': self._asset_url(request, size['name'])} for size in sizes
+                ]
+        return result
+
+    def _asset_url(self, request, name):
+        url = reverse('popup-image-asset', args=[name])
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .images import generate_variants
+from .models import PopupImage
+from .popups import publish_popup_change
+
+# Clave en PopupImage.variants de cada campo de imagen
+IMAGE_FIELDS = (('pe', 'image_pe'), ('br', 'image_br'))
+
+
+@receiver(post_save, sender=PopupImage)
+def refresh_popup_variants(sender, instance, **kwargs):
+    variants = dict(instance.variants or {})
+    changed = False
+    for key, field_name in IMAGE_FIELDS:
+        field_file = getattr(instance, field_name)
+        if not field_file:
+            if variants.pop(key, None) is not None:
+                changed = True
+        elif variants.get(key, {}).get('source') != field_file.name:
+            variants[key] = generate_variants(field_file)
+            changed = True
+    if changed:
+        PopupImage.objects.filter(pk=instance.pk).update(variants=variants)
+        instance.variants = variants
+    transaction.on_commit(publish_popup_change)
+
+
+@receiver(post_delete, sender=PopupImage)
+def drop_active_popup(sender, instance, **kwargs):
+    transaction.on_commit(publish_popup_change)
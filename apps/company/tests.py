@@ -1,3 +1,117 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .images import VARIANT_FORMATS, variant_path
+from .models import PopupImage
+from .popups import PopupTimeline
+from .views import ASSET_MAX_AGE
+
+
+class PopupTimelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def make_popup(self, alias, country=None, start=0, end=None):
+        return PopupImage.objects.create(
+            alias=alias,
+            country=country,
+            start_date=self.now + timedelta(hours=start),
+            end_date=self.now + timedelta(hours=end) if end is not None else None,
+        )
+
+    def test_scheduled_windows(self):
+        self.make_popup('actual', end=2)
+        self.make_popup('futuro', start=2)
+        timeline = PopupTimeline()
+
+        popups, until = timeline.select(instant=self.now + timedelta(hours=1))
+        self.assertEqual([popup.alias for popup in popups], ['actual'])
+        self.assertEqual(until, self.now + timedelta(hours=2))
+
+        popups, _ = timeline.select(instant=self.now + timedelta(hours=3))
+        self.assertEqual([popup.alias for popup in popups], ['futuro'])
+
+    def test_country_popup_before_global(self):
+        self.make_popup('global')
+        self.make_popup('peru', country='PE')
+        timeline = PopupTimeline()
+
+        self.assertEqual(timeline.select('pe')[0][0].alias, 'peru')
+        self.assertEqual(timeline.select('br')[0][0].alias, 'global')
+
+
+class PopupImageViewTests(TestCase):
+    def setUp(self):
+        self.popup = PopupImage.objects.create(alias='campaña', start_date=timezone.now() + timedelta(days=1))
+
+    def test_anonymous_writes_are_rejected(self):
+        client = APIClient()
+        for method in ('post', 'put', 'patch', 'delete'):
+            with self.subTest(method=method):
+                response = getattr(client, method)('/api/v1/company/popup-images/', {}, format='json')
+                self.assertIn(response.status_code, (401, 403))
+
+        self.assertTrue(PopupImage.objects.filter(pk=self.popup.pk).exists())
+
+
+def png_upload(name, size, color):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class PopupVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='brasper-tests-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_variants_follow_the_uploaded_image(self):
+        popup = PopupImage.objects.create(
+            alias='campaña', start_date=timezone.now(), image_pe=png_upload('pe.png', (1000, 500), 'red'),
+        )
+        pe = popup.variants['pe']
+        first = pe['variants']['webp'][0]['name']
+
+        self.assertEqual([variant['width'] for variant in pe['variants']['webp']], [480, 960, 1000])
+        self.assertEqual(set(pe['variants']), set(VARIANT_FORMATS))
+        self.assertTrue(default_storage.exists(variant_path(first)))
+        self.assertEqual(PopupImage.objects.get(pk=popup.pk).variants, popup.variants)
+
+        popup.image_pe = png_upload('pe.png', (600, 300), 'blue')
+        popup.save()
+        self.assertNotEqual(popup.variants['pe']['hash'], pe['hash'])
+        self.assertEqual([variant['width'] for variant in popup.variants['pe']['variants']['webp']], [480, 600])
+
+        popup.image_pe = None
+        popup.save()
+        self.assertNotIn('pe', PopupImage.objects.get(pk=popup.pk).variants)
+
+    def test_assets_are_served_as_immutable(self):
+        popup = PopupImage.objects.create(
+            alias='campaña', start_date=timezone.now(), image_pe=png_upload('pe.png', (300, 150), 'red'),
+        )
+        name = popup.variants['pe']['variants']['webp'][0]['name']
+
+        response = self.client.get(f'/api/v1/company/popup-images/assets/{name}')
+        missing = self.client.get(f"/api/v1/company/popup-images/assets/{'0' * 20}-300.webp")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(f'max-age={ASSET_MAX_AGE}', response['Cache-Control'])
+        self.assertEqual(missing.status_code, 404)
+        response.close()
@@ -1,6 +1,13 @@
-from django.urls import path
-from .views import PopupImageView
+from django.urls import path, re_path
+from .views import PopupImageDetailView, PopupImageView, PopupScheduleView, popup_image_asset
 
 urlpatterns = [
     path('popup-images/', PopupImageView.as_view(), name='popup-images'),
-]
\ No newline at end of file
+    path('popup-images/schedule/', PopupScheduleView.as_view(), name='popup-schedule'),
+    path('popup-images/<int:pk>/', PopupImageDetailView.as_view(), name='popup-image-detail'),
+    re_path(
+        r'^popup-images/assets/(?P<name>[0-9a-f]{20}-\d+\.(?:webp|avif))$',
+        popup_image_asset,
+        name='popup-image-asset',
+    ),
+]
@@ -1,33 +1,60 @@
 from rest_framework import mixins
-from rest_framework.generics import GenericAPIView, ListCreateAPIView
+from rest_framework.generics import GenericAPIView, ListAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+from .images import CONTENT_TYPES, variant_path
 from .models import PopupImage
+from .popups import popup_timeline
 from .serializers import PopupImageSerializer
 from rest_framework.permissions import AllowAny
+from apps.users.permissions import IsStaff
+
+# Max-age del popup activo para navegadores y CDN; nunca pasa del próximo cambio programado
+POPUP_MAX_AGE = 60
+# Un año: los nombres de las variantes llevan el hash del contenido
+ASSET_MAX_AGE = 60 * 60 * 24 * 365
 
 class PopupImageView(
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
-    mixins.UpdateModelMixin,
-    mixins.DestroyModelMixin,
     GenericAPIView
 ):
+    """
+    Popup vigente (GET, público) y alta de popups (POST, staff). La edición y
+    el borrado de un popup concreto van por PopupImageDetailView, por id.
+    """
     queryset = PopupImage.objects.all()
     serializer_class = PopupImageSerializer
-    permission_classes = [AllowAny]
 
-    def get_object(self):
-        # Tomamos el primero según el orden definido en el modelo (último creado)
-        return PopupImage.objects.first()
+    def get_permissions(self):
+        if self.request.method == 'GET':
+            return [AllowAny()]
+        return [IsStaff()]
 
     def get(self, request, *args, **kwargs):
-        instance = self.get_object()
-        if instance:
-            serializer = self.get_serializer(instance)
-            return Response(serializer.data)
-        return Response({'error': 'No popup image found'}, status=status.HTTP_404_NOT_FOUND)
+        # Popup vigente del país (?country=pe) desde el índice en memoria; sin consultas
+        popups, valid_until = popup_timeline.select(request.query_params.get('country'))
+        if not popups:
+            return Response({'error': 'No popup image found'}, status=status.HTTP_404_NOT_FOUND)
+
+        data, etag = popup_timeline.render(
+            popups[0], request.build_absolute_uri('/'), lambda popup: self.get_serializer(popup).data
+        )
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        max_age = max(0, min(POPUP_MAX_AGE, int((valid_until - timezone.now()).total_seconds())))
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=max_age)
+        return response
 
     def post(self, request, *args, **kwargs):
         image_pe = request.FILES.get('image_pe')
@@ -39,41 +66,35 @@ class PopupImageView(
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Borrar anteriores
-        PopupImage.objects.all().delete()
-
+        # Los popups anteriores se conservan: cada uno se muestra en su ventana start_date/end_date
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def put(self, request, *args, **kwargs):
-        instance = self.get_object()
-        if not instance:
-            return Response({'error': 'No popup image found'}, status=status.HTTP_404_NOT_FOUND)
-
-        serializer = self.get_serializer(instance, data=request.data)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-
-        return Response(serializer.data)
 
-    def patch(self, request, *args, **kwargs):
-        instance = self.get_object()
-        if not instance:
-            return Response({'error': 'No popup image found'}, status=status.HTTP_404_NOT_FOUND)
-
-        serializer = self.get_serializer(instance, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-
-        return Response(serializer.data)
+class PopupScheduleView(ListAPIView):
+    """Todos los popups programados (vigentes, futuros y vencidos), por fecha de inicio."""
+    queryset = PopupImage.objects.order_by('-start_date', '-created_at')
+    serializer_class = PopupImageSerializer
+    permission_classes = [IsStaff]
 
-    def delete(self, request, *args, **kwargs):
-        instance = self.get_object()
-        if not instance:
-            return Response({'error': 'No popup image found'}, status=status.HTTP_404_NOT_FOUND)
 
-        instance.delete()
-        return Response({'message': 'Popup image deleted'}, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+class PopupImageDetailView(RetrieveUpdateDestroyAPIView):
+    """Edición de un popup concreto de la programación."""
+    queryset = PopupImage.objects.all()
+    serializer_class = PopupImageSerializer
+    permission_classes = [IsStaff]
+
+
+@require_safe
+def popup_image_asset(request, name):
+    """Variante WebP/AVIF de un popup. El nombre lleva el hash del contenido: se cachea un año."""
+    image_format = name.rsplit('.', 1)[-1]
+    path = variant_path(name)
+    if image_format not in CONTENT_TYPES or not default_storage.exists(path):
+        raise Http404()
+    response = FileResponse(default_storage.open(path, 'rb'), content_type=CONTENT_TYPES[image_format])
+    patch_cache_control(response, public=True, max_age=ASSET_MAX_AGE, immutable=True)
+    return response
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints_book', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaintsbook',
+            name='file_sha256',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='complaintsbook',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaintsbook',
+            index=models.Index(fields=['-date', '-id'], name='complaint_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaintsbook',
+            index=models.Index(fields=['type_nonconformity', '-date', '-id'], name='complaint_type_date_idx'),
+        ),
+    ]
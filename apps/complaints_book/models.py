@@ -30,6 +30,15 @@ class ComplaintsBook(models.Model):
     nonconformity_detail = models.TextField()
     order_nonconformity = models.CharField(max_length=100)
     file_upload = models.FileField(upload_to='uploads/', blank=True, null = True)
+    # Calculados mientras se recibe el adjunto (apps.complaints_book.uploads)
+    file_sha256 = models.CharField(max_length=64, blank=True, default='', editable=False)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='complaint_date_idx'),
+            models.Index(fields=['type_nonconformity', '-date', '-id'], name='complaint_type_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.type_nonconformity}"
\ No newline at end of file
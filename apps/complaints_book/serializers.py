@@ -6,3 +6,11 @@ class ComplaintsBookSerializer(serializers.ModelSerializer):
         model = ComplaintsBook
         fields = '__all__'
     file_upload = serializers.FileField(required=False)
+
+
+
+class ComplaintsBookPublicSerializer(serializers.ModelSerializer):
+    """Listado para quien no es staff: sin datos de contacto, documentos ni adjuntos."""
+    class Meta:
+        model = ComplaintsBook
+        fields = ['id', 'date', 'type_person', 'type_nonconformity']
@@ -1,3 +1,70 @@
-from django.test import TestCase
+import hashlib
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.users.models import Role, User
+
+from .models import ComplaintsBook
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='brasper-tests-media-')
+
+COMPLAINT = {
+    'type_person': 'individual', 'ruc': '20123456789', 'name': 'Ana', 'second_name': 'Lima', 'email': 'ana@example.com',
+    'country_code': '+51', 'phone_number': '987654321', 'type_identity_document': 'dni',
+    'identity_document_number': '12345678', 'department': 'Lima', 'province': 'Lima', 'district': 'Miraflores',
+    'address': 'Av. Larco 123', 'type_nonconformity': 'claim', 'nonconformity_detail': 'Demora',
+    'order_nonconformity': 'TX-1',
+}
+
+
+def staff_client():
+    role, _ = Role.objects.get_or_create(name=Role.STAFF)
+    user = User.objects.create(email='staff@example.com', first_name='Test', last_name='User', role=role)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user.tokens()['access']}")
+    return client
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, COMPLAINTS_UPLOAD={'MAX_SIZE': 1024})
+class ComplaintsBookTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = staff_client()
+
+    def post(self, content):
+        upload = SimpleUploadedFile('detalle.pdf', content, content_type='application/pdf')
+        return self.client.post('/api/v1/complaints/', {**COMPLAINT, 'file_upload': upload}, format='multipart')
+
+    def test_attachment_is_stored_with_its_hash(self):
+        content = b'%PDF' + b'x' * 500
+
+        response = self.post(content)
+
+        self.assertEqual(response.status_code, 201)
+        complaint = ComplaintsBook.objects.get()
+        self.assertEqual(complaint.file_sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(complaint.file_upload.read(), content)
+
+    def test_attachment_over_the_limit_is_rejected(self):
+        response = self.post(b'x' * 2048)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ComplaintsBook.objects.exists())
+
+    def test_public_list_is_redacted(self):
+        ComplaintsBook.objects.create(**COMPLAINT)
+
+        public = APIClient().get('/api/v1/complaints/').json()['results'][0]
+        staff = self.client.get('/api/v1/complaints/').json()['results'][0]
+
+        self.assertNotIn('email', public)
+        self.assertNotIn('identity_document_number', public)
+        self.assertEqual(staff['email'], 'ana@example.com')
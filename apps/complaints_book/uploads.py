@@ -0,0 +1,92 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+from .models import ComplaintsBook
+
+
+class HashedUploadedFile(UploadedFile):
+    """
+    Attachment streamed to a temporary file, kept on disk (delete=False) so
+    the storage can move it, with the SHA-256 and size computed while it was
+    received.
+    """
+
+    def __init__(self, name, content_type, charset, content_type_extra):
+        file = tempfile.NamedTemporaryFile(suffix='.upload', dir=settings.FILE_UPLOAD_TEMP_DIR, delete=False)
+        super().__init__(file, name, content_type, 0, charset, content_type_extra)
+        self.digest = hashlib.sha256()
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+
+    @property
+    def sha256(self):
+        return self.digest.hexdigest()
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.unlink(self.temporary_file_path())
+        except FileNotFoundError:
+            pass
+
+
+class ComplaintAttachmentUploadHandler(FileUploadHandler):
+    """
+    Writes the attachment to disk as it arrives, hashing it on the way, and
+    stops reading it as soon as it exceeds COMPLAINTS_UPLOAD['MAX_SIZE']. The
+    remaining body is drained, so the view can still answer with a 400.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.COMPLAINTS_UPLOAD['MAX_SIZE']
+        self.rejected = None
+        self.upload = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.upload = HashedUploadedFile(self.file_name, self.content_type, self.charset, self.content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.upload.size + len(raw_data) > self.max_size:
+            self.rejected = self.file_name
+            self.upload.discard()
+            self.upload = None
+            raise StopUpload(connection_reset=False)
+        self.upload.write(raw_data)
+
+    def file_complete(self, file_size):
+        upload, self.upload = self.upload, None
+        upload.file.flush()
+        upload.file.seek(0)
+        return upload
+
+    def upload_interrupted(self):
+        if self.upload is not None:
+            self.upload.discard()
+            self.upload = None
+
+
+def store_attachment(upload):
+    """
+    Saves the streamed attachment in the storage of `file_upload` and returns
+    the stored name. FileSystemStorage moves the temporary file instead of
+    copying it, so this is cheap enough to run inside the request.
+    """
+    field = ComplaintsBook._meta.get_field('file_upload')
+    return field.storage.save(field.generate_filename(None, upload.name), upload)
+
+
+def delete_attachment(name):
+    ComplaintsBook._meta.get_field('file_upload').storage.delete(name)
@@ -1,28 +1,116 @@
-from django.shortcuts import render
-from rest_framework.views import APIView
+from django.conf import settings
+from django.utils.dateparse import parse_date
+from rest_framework.generics import GenericAPIView
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework import status
 
 from apps.users.permissions import IsStaff
 from .models import ComplaintsBook
-from .serializers import ComplaintsBookSerializer
+from .serializers import ComplaintsBookPublicSerializer, ComplaintsBookSerializer
+from .uploads import ComplaintAttachmentUploadHandler, delete_attachment, store_attachment
 from rest_framework.permissions import AllowAny
-class ComplaintsBookListCreateView(APIView):
+
+
+class ComplaintsCursorPagination(CursorPagination):
+    """Keyset pagination over the (date, id) index, without COUNT over the book."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-date', '-id')
+
+    def get_page_size(self, request):
+        # page_size solo para staff; el listado público va en páginas fijas
+        if not IsStaff().has_permission(request, None):
+            return self.page_size
+        return super().get_page_size(request)
+
+
+class ComplaintsBookListCreateView(GenericAPIView):
+    queryset = ComplaintsBook.objects.all()
+    serializer_class = ComplaintsBookSerializer
+    pagination_class = ComplaintsCursorPagination
+
     def get_permissions(self):
         if self.request.method == 'GET':
-            return [AllowAny()] 
+            return [AllowAny()]
         elif self.request.method == 'POST':
             return [IsStaff()]  # Requiere autenticación
         return super().get_permissions()
+
+    def get_serializer_class(self):
+        # El listado público no expone email, teléfono ni documentos de quien reclama
+        if self.request.method == 'GET' and not IsStaff().has_permission(self.request, self):
+            return ComplaintsBookPublicSerializer
+        return super().get_serializer_class()
+
+    def initialize_request(self, request, *args, **kwargs):
+        # El adjunto se recibe en streaming; los handlers deben fijarse antes de leer el cuerpo
+        if request.method == 'POST':
+            request.upload_handlers = [ComplaintAttachmentUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_filters(self):
+        """Lookups of date_from, date_to (YYYY-MM-DD) and type, or a 400 response."""
+        params = self.request.query_params
+        filters = {}
+        for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+            value = params.get(param)
+            if not value:
+                continue
+            try:
+                filters[lookup] = parse_date(value)
+            except ValueError:
+                filters[lookup] = None
+            if filters[lookup] is None:
+                return None, Response({'error': f'{param} must be a date (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        type_nonconformity = params.get('type')
+        if type_nonconformity:
+            types = dict(ComplaintsBook.TYPE_NONCONFORMITY_CHOICES)
+            if type_nonconformity not in types:
+                return None, Response(
+                    {'error': f"type must be one of: {', '.join(types)}"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            filters['type_nonconformity'] = type_nonconformity
+        return filters, None
+
     def get(self, request):
-        complaints = ComplaintsBook.objects.all()
-        serializer = ComplaintsBookSerializer(complaints, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        filters, error = self.get_filters()
+        if error:
+            return error
+
+        # Paginado por cursor: cada página usa el índice de fecha (y tipo), a cualquier profundidad
+        page = self.paginate_queryset(self.get_queryset().filter(**filters))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def post(self, request):
-        serializer = ComplaintsBookSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            data = request.data  # el cuerpo se procesa aquí, con los handlers de subida
+            if any(getattr(handler, 'rejected', None) for handler in request.upload_handlers):
+                return Response(
+                    {'error': f"file_upload exceeds the maximum size of {settings.COMPLAINTS_UPLOAD['MAX_SIZE']} bytes"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            serializer = self.get_serializer(data=data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+            # El adjunto se guarda antes del reclamo: nunca queda un file_sha256 sin archivo.
+            # Hash y tamaño ya se calcularon al recibirlo
+            upload = serializer.validated_data.pop('file_upload', None)
+            if upload is None:
+                serializer.save()
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
+            stored = store_attachment(upload)
+            try:
+                serializer.save(file_upload=stored, file_sha256=upload.sha256, file_size=upload.size)
+            except Exception:
+                delete_attachment(stored)
+                raise
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        finally:
+            # Archivos temporales que quedan (el guardado ya movió el adjunto)
+            for _, uploads in request.FILES.lists():
+                for upload in uploads:
+                    upload.discard()
@@ -1,7 +1,5 @@
-import requests
-from google.auth.transport import requests
-from google.oauth2 import id_token
 from apps.users.models import User
+from apps.users.oauth.verifier import verify_google_id_token
 from django.contrib.auth import authenticate
 from django.conf import settings
 from rest_framework.exceptions import AuthenticationFailed
@@ -12,7 +10,7 @@ class Google():
     @staticmethod
     def validate(access_token):
         try:
-            id_info=id_token.verify_oauth2_token(access_token, requests.Request())
+            id_info=verify_google_id_token(access_token)
             if 'accounts.google.com' in id_info['iss']:
                 return id_info
         except:
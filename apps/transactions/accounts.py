@@ -0,0 +1,34 @@
+from django.core.cache import cache
+
+from .models import BankAccount
+from .serializers import BankAccountSerializer
+
+# Bump when BankAccountSerializer changes so cached lists are rebuilt
+USER_ACCOUNTS_VERSION = 1
+USER_ACCOUNTS_TIMEOUT = 60 * 60 * 24
+
+
+def user_accounts_key(user_id):
+    return f"transactions:user-accounts:v{USER_ACCOUNTS_VERSION}:{user_id}"
+
+
+def active_accounts(user_id):
+    """Active accounts of a user, newest first. Served by the (user, is_active, -created_at) index."""
+    return BankAccount.objects.select_related('currency').filter(user_id=user_id, is_active=True)
+
+
+def get_user_accounts(user_id):
+    """
+    Serialized active accounts of a user, as shown in the send flow dropdown.
+    Built once and kept in the cache until one of the user's accounts changes.
+    """
+    key = user_accounts_key(user_id)
+    accounts = cache.get(key)
+    if accounts is None:
+        accounts = [dict(row) for row in BankAccountSerializer(active_accounts(user_id), many=True).data]
+        cache.set(key, accounts, USER_ACCOUNTS_TIMEOUT)
+    return accounts
+
+
+def invalidate_user_accounts(user_ids):
+    cache.delete_many([user_accounts_key(user_id) for user_id in user_ids])
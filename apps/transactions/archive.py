@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedTransaction, Transaction
+
+# Only closed transactions leave the hot table
+CLOSED_STATUSES = ('completed', 'cancelled')
+ARCHIVE_BATCH_SIZE = 1000
+
+# Columns copied as-is from Transaction into ArchivedTransaction
+ARCHIVED_FIELDS = [
+    field.attname for field in ArchivedTransaction._meta.concrete_fields if field.name != 'archived_at'
+]
+
+
+def archive_cutoff(months):
+    return timezone.now() - timedelta(days=30 * months)
+
+
+def archivable_transactions(cutoff):
+    return Transaction.objects.filter(status__in=CLOSED_STATUSES, updated_at__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Moves one batch of closed transactions last touched before `cutoff` into
+    the archive table. Copy and delete run in the same database transaction so
+    a row is never in both tables or in neither: a row that conflicts with one
+    already archived raises IntegrityError and the whole batch is rolled back.
+    Returns the number moved.
+    """
+    with transaction.atomic():
+        rows = list(
+            archivable_transactions(cutoff)
+            .order_by('id')
+            .select_for_update(skip_locked=True)
+            .values(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        now = timezone.now()
+        ArchivedTransaction.objects.bulk_create(
+            [ArchivedTransaction(archived_at=now, **row) for row in rows]
+        )
+        Transaction.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        return len(rows)
+
+
+def archive_transactions(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archives in bounded batches, yielding the size of each batch moved."""
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return
+        yield moved
+
+
+def user_transaction_history(user_id):
+    """
+    Hot and archived transactions of a user, newest first. Archived rows are
+    only read by history views, the hot path never touches the archive table.
+    """
+    recent = list(Transaction.objects.filter(user_id=user_id).order_by('-created_at'))
+    archived = list(ArchivedTransaction.objects.filter(user_id=user_id).order_by('-created_at'))
+    return recent, archived
+
+
+def get_transaction_or_archived(pk):
+    """Looks the transaction up in the hot table first, then in the archive."""
+    found = Transaction.objects.filter(pk=pk).first()
+    if found is None:
+        found = ArchivedTransaction.objects.filter(pk=pk).first()
+    return found
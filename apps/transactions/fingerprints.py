@@ -0,0 +1,71 @@
+import hashlib
+import re
+import unicodedata
+
+PIX_RANDOM_KEY = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+PIX_PHONE_TYPES = ('phone', 'telefone', 'telefono', 'celular', 'tel')
+
+
+def _digits(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def _bank_slug(value):
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return re.sub(r'[^a-z0-9]', '', value.lower())
+
+
+def canonical_pix_key(pix_key, pix_key_type=None):
+    """Canonical form of a PIX key: emails and random keys lowercased, the rest digits only."""
+    key = (pix_key or '').strip()
+    if not key:
+        return ''
+    lowered = key.lower()
+    if '@' in lowered or PIX_RANDOM_KEY.match(lowered):
+        return lowered
+    digits = _digits(key)
+    if not digits:
+        return lowered
+    # Phones are stored with or without the +55 prefix
+    if (pix_key_type or '').lower() in PIX_PHONE_TYPES and len(digits) in (12, 13) and digits.startswith('55'):
+        digits = digits[2:]
+    return digits
+
+
+def canonical_account_value(country, bank_name=None, account_number=None, cci_number=None,
+                            pix_key=None, pix_key_type=None):
+    """
+    Canonical destination of an account: the PIX key for Brazil; the CCI for
+    Peru, or the bank plus account number when no CCI was given.
+    """
+    if country == 'BR':
+        pix = canonical_pix_key(pix_key, pix_key_type)
+        return f'pix:{pix}' if pix else ''
+    if country == 'PE':
+        cci = _digits(cci_number)
+        if cci:
+            return f'cci:{cci}'
+        account = _digits(account_number)
+        if account:
+            return f'account:{_bank_slug(bank_name)}:{account}'
+    return ''
+
+
+def account_fingerprint(country, **values):
+    """sha256 of country plus canonical value, or None when the account has no destination data."""
+    canonical = canonical_account_value(country, **values)
+    if not canonical:
+        return None
+    return hashlib.sha256(f'{country}:{canonical}'.encode()).hexdigest()
+
+
+def bank_account_fingerprint(account):
+    return account_fingerprint(
+        account.country,
+        bank_name=account.bank_name,
+        account_number=account.account_number,
+        cci_number=account.cci_number,
+        pix_key=account.pix_key,
+        pix_key_type=account.pix_key_type,
+    )
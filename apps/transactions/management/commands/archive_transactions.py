@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from apps.transactions.archive import (
+    ARCHIVE_BATCH_SIZE,
+    CLOSED_STATUSES,
+    archivable_transactions,
+    archive_cutoff,
+    archive_transactions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve a la tabla de archivo las transacciones cerradas (completadas o canceladas) "
+        "sin cambios en los últimos N meses, en lotes acotados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=12)
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        months = options['months']
+        batch_size = options['batch_size']
+        if months < 1 or batch_size < 1:
+            raise CommandError("--months y --batch-size deben ser mayores a 0")
+
+        cutoff = archive_cutoff(months)
+        self.stdout.write(f"Estados: {', '.join(CLOSED_STATUSES)}  sin cambios desde: {cutoff:%Y-%m-%d}")
+
+        if options['dry_run']:
+            pending = archivable_transactions(cutoff).count()
+            self.stdout.write(f"Transacciones por archivar: {pending}")
+            return
+
+        total = 0
+        try:
+            for batches, moved in enumerate(archive_transactions(cutoff, batch_size), start=1):
+                total += moved
+                self.stdout.write(f"Lote {batches}: {moved} transacciones archivadas")
+                if options['max_batches'] and batches >= options['max_batches']:
+                    break
+        except IntegrityError as error:
+            # El lote se revierte completo: ninguna transacción se borra sin quedar archivada
+            raise CommandError(
+                f"Conflicto con una transacción ya archivada tras {total} archivadas; lote revertido: {error}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Total archivadas: {total}"))
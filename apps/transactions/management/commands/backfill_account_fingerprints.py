@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.transactions.fingerprints import bank_account_fingerprint
+from apps.transactions.models import BankAccount
+
+FINGERPRINT_FIELDS = [
+    'id', 'country', 'bank_name', 'account_number', 'cci_number', 'pix_key', 'pix_key_type', 'fingerprint',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula la huella (fingerprint) de las cuentas bancarias existentes, recorriendo la tabla "
+        "por rangos de id. Por defecto solo las cuentas sin huella; con --all las recalcula todas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size debe ser mayor a 0")
+
+        queryset = BankAccount.objects.order_by('id').only(*FINGERPRINT_FIELDS)
+        if not options['all']:
+            queryset = queryset.filter(fingerprint__isnull=True)
+
+        last_id = 0
+        scanned = updated = 0
+        while True:
+            accounts = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not accounts:
+                break
+            last_id = accounts[-1].id
+            scanned += len(accounts)
+
+            changed = []
+            for account in accounts:
+                fingerprint = bank_account_fingerprint(account)
+                if fingerprint != account.fingerprint:
+                    account.fingerprint = fingerprint
+                    changed.append(account)
+            # bulk_update no dispara save() ni señales, solo escribe la columna
+            BankAccount.objects.bulk_update(changed, ['fingerprint'])
+            updated += len(changed)
+            self.stdout.write(f"Hasta id {last_id}: {scanned} revisadas, {updated} actualizadas")
+
+        self.stdout.write(self.style.SUCCESS(f"Total revisadas: {scanned}  actualizadas: {updated}"))
@@ -0,0 +1,87 @@
+import random
+import resource
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.transactions.reconciliation import (
+    MATCHED,
+    PendingTransaction,
+    Reconciler,
+    StatementLine,
+    name_tokens,
+)
+
+FIRST_NAMES = ['JUAN', 'MARIA', 'JOSE', 'ANA', 'LUIS', 'CARLA', 'PEDRO', 'LUCIA', 'JORGE', 'ROSA']
+LAST_NAMES = ['PEREZ', 'SILVA', 'QUISPE', 'SANTOS', 'ROJAS', 'SOUZA', 'FLORES', 'COSTA', 'TORRES', 'LIMA']
+CURRENCY = 'PEN'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la conciliación de un extracto sintético contra transacciones pendientes sintéticas "
+        "(por defecto 100.000 líneas contra 1.000.000 de transacciones), sin tocar la base de datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=100_000)
+        parser.add_argument('--transactions', type=int, default=1_000_000)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start_day = date.today() - timedelta(days=365)
+
+        started = time.perf_counter()
+        pending = [self._pending(rng, pk, start_day) for pk in range(1, options['transactions'] + 1)]
+        generated = time.perf_counter() - started
+
+        started = time.perf_counter()
+        reconciler = Reconciler(pending, CURRENCY)
+        indexed = time.perf_counter() - started
+
+        lines = self._lines(rng, pending, options['lines'])
+        started = time.perf_counter()
+        matched = sum(1 for result in reconciler.reconcile(lines) if result.status == MATCHED)
+        elapsed = time.perf_counter() - started
+
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(f"Transacciones pendientes: {len(pending)}  (generadas en {generated:.2f} s)")
+        self.stdout.write(f"Índice monto/moneda/día:  {indexed:.2f} s, {len(reconciler.index)} claves")
+        self.stdout.write(f"Conciliación:             {elapsed:.2f} s para {options['lines']} líneas "
+                          f"({elapsed / max(options['lines'], 1) * 1_000_000:.1f} µs/línea)")
+        self.stdout.write(f"Coincidencias aplicables: {matched}")
+        self.stdout.write(f"Memoria máxima del proceso: {peak_mb:.0f} MB")
+
+    @staticmethod
+    def _pending(rng, pk, start_day):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        return PendingTransaction(
+            pk,
+            f'BRT-SP{pk:010d}',
+            rng.randint(5_000, 2_000_000),
+            CURRENCY,
+            start_day + timedelta(days=rng.randint(0, 365)),
+            name_tokens(first, last),
+            (str(10_000_000 + pk),),
+        )
+
+    @staticmethod
+    def _lines(rng, pending, count):
+        # 90% of the lines pay an existing transaction, the rest are unrelated credits
+        for line_number in range(1, count + 1):
+            if rng.random() < 0.9:
+                paid = rng.choice(pending)
+                name = ' '.join(sorted(paid.names))
+                document = paid.documents[0] if rng.random() < 0.5 else None
+                yield StatementLine(
+                    line_number, f'OP{line_number}', paid.day + timedelta(days=rng.randint(0, 2)),
+                    Decimal(paid.amount_cents) / 100, name, document,
+                )
+            else:
+                yield StatementLine(
+                    line_number, f'OP{line_number}', date.today(),
+                    Decimal(rng.randint(5_000, 2_000_000)) / 100, 'OTRO DEPOSITO', None,
+                )
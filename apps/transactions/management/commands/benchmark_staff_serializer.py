@@ -0,0 +1,87 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.coin.models import Currency
+from apps.transactions.models import BankAccount, Transaction
+from apps.transactions.serializers import StaffTransactionSerializer
+from apps.transactions.snapshots import cache_account_snapshots, invalidate_account_snapshots
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de serializar el listado staff de transacciones por cada 1.000 filas, "
+        "comparando la serialización por fila con el constructor precompilado y los snapshots en caché."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+        transactions, accounts = self._build_rows(rows)
+        serializer = StaffTransactionSerializer(transactions, many=True)
+
+        # Antes: cada fila pasa por to_representation y arma dos diccionarios de cuenta
+        before = self._measure(repeat, lambda: [serializer.child.to_representation(t) for t in transactions])
+
+        # Después: snapshots ya en caché y filas armadas por el constructor precompilado
+        cache_account_snapshots(accounts)
+        after = self._measure(repeat, lambda: serializer.to_representation(transactions))
+        invalidate_account_snapshots([account.id for account in accounts])
+
+        per_thousand = 1000 / rows
+        self.stdout.write(f"Filas: {rows}  repeticiones: {repeat}")
+        self.stdout.write(f"Antes:   {before * per_thousand * 1000:.2f} ms / 1.000 filas")
+        self.stdout.write(f"Después: {after * per_thousand * 1000:.2f} ms / 1.000 filas")
+        self.stdout.write(self.style.SUCCESS(f"Mejora: x{before / after:.2f}"))
+        self.stdout.write(
+            "Nota: las filas se construyen en memoria, por lo que 'Antes' no incluye las consultas "
+            "perezosas a account.currency que hacía el listado real."
+        )
+
+    def _measure(self, repeat, fn):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def _build_rows(self, rows):
+        pen = Currency(id=1, code='PEN', name='Sol', symbol='S/')
+        brl = Currency(id=2, code='BRL', name='Real', symbol='R$')
+        now = timezone.now()
+        transactions = []
+        accounts = []
+        for index in range(1, rows + 1):
+            user = User(id=index, email=f'cliente{index}@example.com', first_name='Cliente', last_name=str(index))
+            seller = User(id=rows + 1, email='ventas@example.com', first_name='Ventas', username='ventas@example.com')
+            origin = BankAccount(
+                id=index * 2, user=user, country='PE', bank_name='BCP', currency=pen,
+                holder_names='Cliente', holder_surnames=str(index), document_number='12345678',
+                account_number=f'191{index:09d}', cci_number=f'002191{index:014d}', account_type='personal',
+            )
+            destination = BankAccount(
+                id=index * 2 + 1, user=user, country='BR', bank_name='Nubank', currency=brl,
+                holder_names='Destino', holder_surnames=str(index), document_number='98765432',
+                pix_key=f'destino{index}@example.com', pix_key_type='email', cpf='12345678901',
+                account_type='personal',
+            )
+            accounts.extend([origin, destination])
+            transactions.append(Transaction(
+                id=index, transaction_id=f'BRT-SR{now:%y%m%d}-{index:05d}', user=user, seller=seller,
+                origin_account=origin, destination_account=destination,
+                source_amount=Decimal('1000.00'), source_currency=pen,
+                destination_amount=Decimal('1500.00'), destination_currency=brl,
+                commission=Decimal('10.00'), taxes=Decimal('1.50'), total_send=Decimal('1011.50'),
+                exchange_rate=Decimal('1.5000'), payment_method='transfer', status='pending',
+                created_at=now, updated_at=now,
+            ))
+        return transactions, accounts
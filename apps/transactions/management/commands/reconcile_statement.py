@@ -0,0 +1,64 @@
+import csv
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.coin.models import Currency
+
+from apps.transactions.reconciliation import (
+    RECONCILIATION_WINDOW_DAYS,
+    iter_statement,
+    reconcile_statement,
+    result_row,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Concilia un extracto bancario (CSV u OFX) contra las transacciones pendientes. "
+        "Por defecto solo propone; con --apply marca como recibidas las coincidencias únicas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement')
+        parser.add_argument('--currency', required=True, help="Moneda del extracto, p.ej. PEN o BRL")
+        parser.add_argument('--apply', action='store_true')
+        parser.add_argument('--window-days', type=int, default=RECONCILIATION_WINDOW_DAYS)
+        parser.add_argument('--report', help="Ruta del CSV con el resultado por línea")
+
+    def handle(self, *args, **options):
+        path = options['statement']
+        currency = options['currency'].strip().upper()
+        if not Currency.objects.filter(code=currency).exists():
+            raise CommandError(f"Moneda desconocida: {currency}")
+        report_file = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else None
+        writer = None
+        totals = Counter()
+
+        try:
+            with open(path, 'rb') as statement:
+                results = reconcile_statement(
+                    iter_statement(statement, path),
+                    currency,
+                    apply=options['apply'],
+                    window_days=options['window_days'],
+                )
+                for result in results:
+                    totals[result.status] += 1
+                    if report_file:
+                        row = result_row(result)
+                        if writer is None:
+                            writer = csv.DictWriter(report_file, fieldnames=list(row))
+                            writer.writeheader()
+                        writer.writerow(row)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        finally:
+            if report_file:
+                report_file.close()
+
+        self.stdout.write(f"Líneas: {sum(totals.values())}")
+        for status_name in ('matched', 'ambiguous', 'unmatched'):
+            self.stdout.write(f"  {status_name}: {totals[status_name]}")
+        if options['apply']:
+            self.stdout.write(self.style.SUCCESS(f"Marcadas como recibidas: {totals['matched']}"))
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# (table, column, index name). The expression matches what Django emits for
+# `icontains` on PostgreSQL: UPPER(column::text) LIKE UPPER('%term%').
+TRIGRAM_INDEXES = [
+    ('transactions_transaction', 'transaction_id', 'trx_transaction_id_trgm'),
+    ('transactions_bankaccount', 'account_number', 'bank_account_number_trgm'),
+    ('transactions_bankaccount', 'cci_number', 'bank_account_cci_trgm'),
+    ('transactions_bankaccount', 'pix_key', 'bank_account_pix_key_trgm'),
+    ('transactions_bankaccount', 'document_number', 'bank_account_document_trgm'),
+    ('transactions_bankaccount', 'cpf', 'bank_account_cpf_trgm'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column, name in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _table, _column, name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('transactions', '0020_alter_coupon_code_alter_coupon_discount_percentage_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coin', '0004_remove_range_unique_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0021_transaction_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transaction_id', models.CharField(max_length=50, unique=True)),
+                ('source_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('destination_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('commission', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('taxes', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('total_send', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('cupon_commission', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('cupon_taxes', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('cupon_total_send', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('cupon_source_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('cupon_destination_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('exchange_rate', models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True)),
+                ('payment_method', models.CharField(max_length=150)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('received', 'Recibido'), ('processing', 'En Proceso'), ('observed', 'Observado'), ('completed', 'Finalizado'), ('cancelled', 'Cancelado')], max_length=20)),
+                ('payment_voucher', models.FileField(blank=True, null=True, upload_to='vouchers/')),
+                ('admin_voucher', models.FileField(blank=True, null=True, upload_to='admin_vouchers/')),
+                ('reason_cancel', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('coupon', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='transactions.coupon')),
+                ('destination_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='transactions.bankaccount')),
+                ('destination_currency', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='coin.currency')),
+                ('origin_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='transactions.bankaccount')),
+                ('seller', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('source_currency', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='coin.currency')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at'], name='archived_tx_user_created_idx'), models.Index(fields=['status', '-created_at'], name='archived_tx_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0022_archivedtransaction'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bankaccount',
+            index=models.Index(fields=['user', 'is_active', '-created_at'], name='bankaccount_user_active_idx'),
+        ),
+    ]
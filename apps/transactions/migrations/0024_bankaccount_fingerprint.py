@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0023_bankaccount_user_active_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankaccount',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bankaccount',
+            index=models.Index(fields=['fingerprint', 'user'], name='bankaccount_fingerprint_idx'),
+        ),
+    ]
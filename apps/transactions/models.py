@@ -9,6 +9,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from apps.coin.models import Currency
 from apps.users.models import User
+from .fingerprints import bank_account_fingerprint
 
 class BankAccount(models.Model):
     # Campo para identificar el país de la cuenta
@@ -159,9 +160,19 @@ class BankAccount(models.Model):
         null=True,
         blank=True)
     
+    # sha256 del país y la cuenta/CCI/PIX normalizados, para detectar cuentas duplicadas
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        self.fingerprint = bank_account_fingerprint(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'fingerprint' not in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'fingerprint'}
+        super().save(*args, **kwargs)
+
     def clean(self):
         """
         Realizamos validaciones específicas según el país seleccionado.
@@ -182,6 +193,12 @@ class BankAccount(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Cuenta Bancaria'
         verbose_name_plural = 'Cuentas Bancarias'
+        indexes = [
+            # Listado de cuentas activas por usuario
+            models.Index(fields=['user', 'is_active', '-created_at'], name='bankaccount_user_active_idx'),
+            # Cuentas con el mismo destino, y de qué usuarios
+            models.Index(fields=['fingerprint', 'user'], name='bankaccount_fingerprint_idx'),
+        ]
 
     def __str__(self):
         """
@@ -416,6 +433,13 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores cargados, para detectar cambios de estado o vendedor al guardar
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f"Transaction {self.transaction_id} - {self.source_amount} {self.source_currency} to {self.destination_amount} {self.destination_currency}"
 
@@ -468,3 +492,64 @@ class Transaction(models.Model):
                     
         super().save(*args, **kwargs)
 
+
+
+class ArchivedTransaction(models.Model):
+    """
+    Cold storage for closed transactions (completed / cancelled) moved out of
+    `Transaction` by the `archive_transactions` command. Rows keep their
+    original id and transaction_id so history lookups and references still work.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_transactions')
+    seller = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    transaction_id = models.CharField(max_length=50, unique=True)
+
+    origin_account = models.ForeignKey(
+        'transactions.BankAccount', on_delete=models.CASCADE, related_name='+', null=True, blank=True
+    )
+    destination_account = models.ForeignKey(
+        'transactions.BankAccount', on_delete=models.CASCADE, related_name='+', null=True, blank=True
+    )
+
+    source_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    source_currency = models.ForeignKey(
+        'coin.Currency', on_delete=models.PROTECT, related_name='+', null=True, blank=True
+    )
+    destination_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    destination_currency = models.ForeignKey(
+        'coin.Currency', on_delete=models.PROTECT, related_name='+', null=True, blank=True
+    )
+
+    commission = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    taxes = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    total_send = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    cupon_commission = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    cupon_taxes = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    cupon_total_send = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    cupon_source_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    cupon_destination_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    exchange_rate = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True)
+
+    payment_method = models.CharField(max_length=150)
+    status = models.CharField(max_length=20, choices=Transaction.STATUS_CHOICES)
+    payment_voucher = models.FileField(upload_to='vouchers/', null=True, blank=True)
+    admin_voucher = models.FileField(upload_to='admin_vouchers/', null=True, blank=True)
+    coupon = models.ForeignKey(
+        'transactions.Coupon', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    reason_cancel = models.CharField(max_length=255, null=True, blank=True)
+
+    # Fechas originales, sin auto_now para conservarlas al archivar
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_tx_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='archived_tx_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived transaction {self.transaction_id}"
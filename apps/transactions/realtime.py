@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from apps.common.caches import is_shared_cache
+
+STAFF_GROUP = 'staff'
+FEED_TICKET_SALT = 'transactions.feed.ticket'
+
+
+def seller_group(seller_id):
+    return f'seller:{seller_id}'
+
+
+class BaseChannelLayer(ABC):
+    """
+    Minimal publish/read layer used by the staff transaction feed. Every group
+    numbers its messages with an increasing sequence, which the feed sends as
+    the SSE event id, so a client reconnecting with Last-Event-ID resumes
+    right after the last event it received.
+    """
+
+    # False when the layer cannot deliver the events published by every worker
+    available = True
+
+    @abstractmethod
+    def publish(self, group, message):
+        """Appends the message to the group; called from request threads after commit."""
+
+    @abstractmethod
+    def last_sequence(self, group):
+        """Sequence of the last message published to the group, 0 when none."""
+
+    @abstractmethod
+    def read(self, group, after, timeout):
+        """
+        Waits up to `timeout` seconds for messages newer than `after` and
+        returns (sequence, message) pairs, possibly none. A pair with message
+        None marks a message that is no longer retained.
+        """
+
+    async def aread(self, group, after, timeout):
+        """`read` for the ASGI feed; by default it waits on a thread outside the event loop."""
+        return await sync_to_async(self.read, thread_sensitive=False)(group, after, timeout)
+
+
+class InMemoryChannelLayer(BaseChannelLayer):
+    """Process-local layer, for tests and single-process development servers."""
+
+    def __init__(self, retention=300, **options):
+        self.retention = retention
+        self._messages = defaultdict(deque)
+        self._sequences = defaultdict(int)
+        self._condition = threading.Condition()
+
+    def publish(self, group, message):
+        now = time.monotonic()
+        with self._condition:
+            self._sequences[group] += 1
+            messages = self._messages[group]
+            messages.append((self._sequences[group], now, message))
+            while messages and messages[0][1] < now - self.retention:
+                messages.popleft()
+            self._condition.notify_all()
+
+    def last_sequence(self, group):
+        with self._condition:
+            return self._sequences[group]
+
+    def read(self, group, after, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequences[group] > after, timeout)
+            retained = {sequence: message for sequence, _, message in self._messages[group] if sequence > after}
+            return [
+                (sequence, retained.get(sequence))
+                for sequence in range(after + 1, self._sequences[group] + 1)
+            ]
+
+
+class CacheChannelLayer(BaseChannelLayer):
+    """
+    Layer backed by the default Django cache: each group keeps a sequence
+    counter and its recent messages. Events only cross worker processes when
+    the cache itself is shared (Redis, Memcached, files on one host); with
+    LocMem the layer is not `available` and the feed refuses to start.
+    """
+
+    def __init__(self, poll_interval=1.0, retention=300, **options):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.available = is_shared_cache()
+
+    def sequence_key(self, group):
+        return f'transactions:feed:{group}:seq'
+
+    def message_key(self, group, sequence):
+        return f'transactions:feed:{group}:{sequence}'
+
+    def publish(self, group, message):
+        sequence_key = self.sequence_key(group)
+        cache.add(sequence_key, 0, timeout=None)
+        sequence = cache.incr(sequence_key)
+        cache.set(self.message_key(group, sequence), message, self.retention)
+
+    def last_sequence(self, group):
+        return cache.get(self.sequence_key(group), 0)
+
+    def read(self, group, after, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self.last_sequence(group)
+            remaining = deadline - time.monotonic()
+            if current > after or remaining <= 0:
+                break
+            time.sleep(min(self.poll_interval, remaining))
+        if current <= after:
+            return []
+        return self._messages(group, after, current, cache.get_many(self._message_keys(group, after, current)))
+
+    async def aread(self, group, after, timeout):
+        # Sondeo sin ocupar un hilo entre consultas
+        deadline = time.monotonic() + timeout
+        while True:
+            current = await cache.aget(self.sequence_key(group), 0)
+            remaining = deadline - time.monotonic()
+            if current > after or remaining <= 0:
+                break
+            await asyncio.sleep(min(self.poll_interval, remaining))
+        if current <= after:
+            return []
+        return self._messages(group, after, current, await cache.aget_many(self._message_keys(group, after, current)))
+
+    def _message_keys(self, group, after, current):
+        return [self.message_key(group, sequence) for sequence in range(after + 1, current + 1)]
+
+    def _messages(self, group, after, current, found):
+        return [
+            (sequence, found.get(self.message_key(group, sequence))) for sequence in range(after + 1, current + 1)
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_channel_layer():
+    options = dict(settings.TRANSACTION_FEED)
+    layer_class = import_string(options.pop('LAYER'))
+    return layer_class(**{key.lower(): value for key, value in options.items()})
+
+
+def feed_group_for(user, scope=None):
+    """Group a staff or sales user listens to, or None. Staff may follow every transaction."""
+    role_name = user.role.name if user.role else None
+    if role_name not in ('staff', 'sales'):
+        return None
+    if role_name == 'staff' and scope == 'all':
+        return STAFF_GROUP
+    return seller_group(user.id)
+
+
+def build_transaction_event(event, transaction, previous_status=None):
+    """Small delta sent to the feed instead of the full staff row."""
+    return {
+        'event': event,
+        'id': transaction.id,
+        'transaction_id': transaction.transaction_id,
+        'status': transaction.status,
+        'previous_status': previous_status,
+        'seller': transaction.seller_id,
+        'user': transaction.user_id,
+        'updated_at': transaction.updated_at.isoformat() if transaction.updated_at else None,
+    }
+
+
+def publish_transaction_event(message):
+    layer = get_channel_layer()
+    layer.publish(STAFF_GROUP, message)
+    if message['seller']:
+        layer.publish(seller_group(message['seller']), message)
+
+
+def issue_feed_ticket(group):
+    """
+    Signed ticket that lets an EventSource (which cannot send headers) open
+    the feed of `group`. It is not an access token: it only opens the feed
+    and expires after TRANSACTION_FEED['TICKET_TTL'] seconds, so a ticket
+    left in an access log is useless soon after.
+    """
+    return signing.dumps({'group': group}, salt=FEED_TICKET_SALT, compress=True)
+
+
+def feed_ticket_group(ticket):
+    """Group of a valid ticket, or None when it is missing, forged or expired."""
+    if not ticket:
+        return None
+    try:
+        data = signing.loads(ticket, salt=FEED_TICKET_SALT, max_age=settings.TRANSACTION_FEED['TICKET_TTL'])
+    except signing.BadSignature:
+        return None
+    return data.get('group')
@@ -0,0 +1,340 @@
+import csv
+import re
+import unicodedata
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common.csvfiles import csv_lines, text_lines
+
+from .models import Transaction
+from .realtime import publish_transaction_event
+from .risk import to_cents
+
+# Days a deposit may arrive after (or, with bank cut-off times, before) the transaction
+RECONCILIATION_WINDOW_DAYS = 3
+RECONCILIATION_APPLY_BATCH = 1000
+# A match is applied only when the best candidate reaches this score and is unique
+RECONCILIATION_MIN_SCORE = 1
+
+MATCHED = 'matched'
+AMBIGUOUS = 'ambiguous'
+UNMATCHED = 'unmatched'
+
+# currency: the line's own currency when the statement states one per line (CSV column, OFX CURDEF)
+StatementLine = namedtuple('StatementLine', 'line_number reference date amount name document currency', defaults=(None,))
+PendingTransaction = namedtuple('PendingTransaction', 'id transaction_id amount_cents currency day names documents')
+ReconciliationResult = namedtuple('ReconciliationResult', 'line status transaction candidates score')
+
+# Column names accepted in CSV statements, in Spanish, Portuguese or English
+CSV_COLUMNS = {
+    'date': ('fecha', 'data', 'date', 'fecha_operacion'),
+    'amount': ('monto', 'importe', 'valor', 'amount', 'abono', 'credito'),
+    'name': ('nombre', 'depositante', 'ordenante', 'nome', 'name', 'descripcion', 'description'),
+    'document': ('documento', 'dni', 'ruc', 'cpf', 'cnpj', 'document'),
+    'reference': ('referencia', 'operacion', 'nro_operacion', 'reference', 'id'),
+    'currency': ('moneda', 'moeda', 'divisa', 'currency'),
+}
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y%m%d', '%d/%m/%y')
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+
+def normalize_text(value):
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return re.sub(r'[^A-Z0-9 ]+', ' ', value.upper())
+
+
+def name_tokens(*values):
+    return frozenset(token for value in values for token in normalize_text(value).split() if len(token) > 1)
+
+
+def normalize_currency(value):
+    return (value or '').strip().upper() or None
+
+
+def normalize_document(value):
+    return re.sub(r'\D', '', value or '') or None
+
+
+def parse_amount(value):
+    value = (value or '').strip().replace(' ', '')
+    # 1.234,56 (PE/BR) or 1,234.56
+    if ',' in value and value.rfind(',') > value.rfind('.'):
+        value = value.replace('.', '').replace(',', '.')
+    else:
+        value = value.replace(',', '')
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def parse_date(value):
+    value = (value or '').strip()[:10]
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def iter_csv_statement(stream):
+    """Yields the credits of a CSV statement. Rows are read one at a time."""
+    lines, delimiter = csv_lines(stream)
+    reader = csv.reader(lines, delimiter=delimiter)
+    header = ['_'.join(normalize_text(column).split()).lower() for column in next(reader, [])]
+    positions = {}
+    for key, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in header:
+                positions[key] = header.index(alias)
+                break
+    if 'date' not in positions or 'amount' not in positions:
+        raise ValueError("El extracto debe tener columnas de fecha y monto")
+
+    def column(row, key):
+        position = positions.get(key)
+        return row[position] if position is not None and position < len(row) else ''
+
+    for line_number, row in enumerate(reader, start=2):
+        amount = parse_amount(column(row, 'amount'))
+        deposit_date = parse_date(column(row, 'date'))
+        if amount is None or deposit_date is None or amount <= 0:
+            continue
+        yield StatementLine(
+            line_number,
+            column(row, 'reference').strip(),
+            deposit_date,
+            amount,
+            column(row, 'name').strip(),
+            normalize_document(column(row, 'document')),
+            normalize_currency(column(row, 'currency')),
+        )
+
+
+def iter_ofx_statement(stream):
+    """
+    Yields the credits of an OFX (SGML or XML) statement. Tags are scanned line
+    by line, keeping only the transaction being read and the statement
+    currency (CURDEF, or CURRENCY inside a transaction).
+    """
+    current = None
+    statement_currency = None
+    for line_number, line in enumerate(text_lines(stream), start=1):
+        if '<' not in line:
+            continue
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current:
+                    result = _ofx_line(current, statement_currency)
+                    if result:
+                        yield result
+                    current = None
+                elif not closing:
+                    current = {'line_number': line_number}
+            elif tag == 'CURDEF' and not closing:
+                statement_currency = normalize_currency(value)
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+    if current:
+        result = _ofx_line(current, statement_currency)
+        if result:
+            yield result
+
+
+def _ofx_line(values, statement_currency=None):
+    amount = parse_amount(values.get('TRNAMT'))
+    posted = values.get('DTPOSTED', '')[:8]
+    deposit_date = parse_date(posted)
+    if amount is None or deposit_date is None or amount <= 0:
+        return None
+    memo = values.get('MEMO', '')
+    # Banks usually put the depositor document in the memo
+    document = normalize_document(memo)
+    return StatementLine(
+        values['line_number'],
+        values.get('FITID', ''),
+        deposit_date,
+        amount,
+        values.get('NAME', '') or memo,
+        document if document and len(document) >= 8 else None,
+        normalize_currency(values.get('CURRENCY')) or statement_currency,
+    )
+
+
+def iter_statement(stream, filename=''):
+    if filename.lower().endswith(('.ofx', '.qfx')):
+        return iter_ofx_statement(stream)
+    return iter_csv_statement(stream)
+
+
+def pending_transactions(currency):
+    """
+    Pending transactions sent in `currency` (the statement's, a Currency code),
+    in the compact shape used by the matcher. The deposit is expected for
+    total_send, or source_amount when no charges were stored.
+    """
+    currency = normalize_currency(currency)
+    rows = (
+        Transaction.objects.filter(status='pending', source_currency__code=currency)
+        .values_list(
+            'id', 'transaction_id', 'total_send', 'source_amount', 'created_at',
+            'user__first_name', 'user__last_name', 'user__document_number',
+            'origin_account__holder_names', 'origin_account__holder_surnames',
+            'origin_account__document_number', 'origin_account__cpf',
+        )
+        .iterator(chunk_size=5000)
+    )
+    for (pk, transaction_id, total_send, source_amount, created_at, first_name, last_name,
+         user_document, holder_names, holder_surnames, account_document, cpf) in rows:
+        documents = tuple(filter(None, map(normalize_document, (user_document, account_document, cpf))))
+        yield PendingTransaction(
+            pk,
+            transaction_id,
+            to_cents(total_send or source_amount),
+            currency,
+            timezone.localtime(created_at).date() if timezone.is_aware(created_at) else created_at.date(),
+            name_tokens(first_name, last_name, holder_names, holder_surnames),
+            documents,
+        )
+
+
+class Reconciler:
+    """
+    Matches statement credits against pending transactions.
+
+    Pending transactions are indexed by (amount in cents, currency, day), so
+    each line only looks at the few hash buckets inside its date window, and a
+    credit never matches a transfer sent in another currency. Lines without a
+    currency of their own take the statement currency. Candidates are
+    scored by depositor document and name; a line is matched only when its best
+    candidate is unique and scores at least RECONCILIATION_MIN_SCORE, otherwise
+    it is left for manual review. Each transaction is matched at most once.
+    """
+
+    def __init__(self, pending, currency, window_days=RECONCILIATION_WINDOW_DAYS):
+        self.currency = normalize_currency(currency)
+        self.window_days = window_days
+        self.index = {}
+        for candidate in pending:
+            key = (candidate.amount_cents, candidate.currency, candidate.day.toordinal())
+            self.index.setdefault(key, []).append(candidate)
+        self.claimed = set()
+
+    def candidates(self, line):
+        cents = to_cents(line.amount)
+        currency = line.currency or self.currency
+        deposit_day = line.date.toordinal()
+        found = []
+        # Transactions created up to window_days before the deposit, or the day after
+        for day in range(deposit_day - self.window_days, deposit_day + 2):
+            for candidate in self.index.get((cents, currency, day), ()):
+                if candidate.id not in self.claimed:
+                    found.append(candidate)
+        return found
+
+    @staticmethod
+    def score(line, candidate, tokens):
+        score = 0
+        if line.document and line.document in candidate.documents:
+            score += 2
+        if tokens and candidate.names:
+            overlap = len(tokens & candidate.names) / min(len(tokens), len(candidate.names))
+            if overlap >= 0.5:
+                score += 1
+        return score
+
+    def match(self, line):
+        candidates = self.candidates(line)
+        if not candidates:
+            return ReconciliationResult(line, UNMATCHED, None, 0, 0)
+
+        tokens = name_tokens(line.name)
+        scored = sorted(
+            ((self.score(line, candidate, tokens), candidate) for candidate in candidates),
+            key=lambda item: (item[0], -abs(item[1].day.toordinal() - line.date.toordinal())),
+            reverse=True,
+        )
+        best_score, best = scored[0]
+        unique = len(scored) == 1 or scored[1][0] < best_score
+        if best_score >= RECONCILIATION_MIN_SCORE and unique:
+            self.claimed.add(best.id)
+            return ReconciliationResult(line, MATCHED, best, len(candidates), best_score)
+        return ReconciliationResult(line, AMBIGUOUS, best, len(candidates), best_score)
+
+    def reconcile(self, lines):
+        for line in lines:
+            yield self.match(line)
+
+
+def apply_matches(transaction_ids):
+    """
+    Marks matched transactions as received in one UPDATE per batch. Rows that
+    left `pending` meanwhile are skipped. Returns the number of rows updated.
+    """
+    if not transaction_ids:
+        return 0
+    now = timezone.now()
+    with transaction.atomic():
+        updated = list(
+            Transaction.objects.filter(id__in=transaction_ids, status='pending')
+            .select_for_update()
+            .values_list('id', 'transaction_id', 'seller_id', 'user_id')
+        )
+        Transaction.objects.filter(id__in=[row[0] for row in updated]).update(status='received', updated_at=now)
+
+        # Bulk updates skip post_save, so the feed events are published here
+        for pk, transaction_id, seller_id, user_id in updated:
+            message = {
+                'event': 'status_changed',
+                'id': pk,
+                'transaction_id': transaction_id,
+                'status': 'received',
+                'previous_status': 'pending',
+                'seller': seller_id,
+                'user': user_id,
+                'updated_at': now.isoformat(),
+            }
+            transaction.on_commit(lambda message=message: publish_transaction_event(message))
+    return len(updated)
+
+
+def reconcile_statement(lines, currency, apply=False, window_days=RECONCILIATION_WINDOW_DAYS, pending=None):
+    """
+    Runs the reconciliation of a statement in `currency` over a stream of its
+    lines, yielding one result per line. With `apply`, matches are marked
+    `received` in batches while the statement is read.
+    """
+    reconciler = Reconciler(pending_transactions(currency) if pending is None else pending, currency, window_days)
+    to_apply = []
+    for result in reconciler.reconcile(lines):
+        if apply and result.status == MATCHED:
+            to_apply.append(result.transaction.id)
+            if len(to_apply) >= RECONCILIATION_APPLY_BATCH:
+                apply_matches(to_apply)
+                to_apply = []
+        yield result
+    if to_apply:
+        apply_matches(to_apply)
+
+
+def result_row(result):
+    line = result.line
+    return {
+        'line': line.line_number,
+        'reference': line.reference,
+        'date': line.date.isoformat(),
+        'amount': str(line.amount),
+        'name': line.name,
+        'status': result.status,
+        'transaction': result.transaction.id if result.transaction else None,
+        'transaction_id': result.transaction.transaction_id if result.transaction else None,
+        'candidates': result.candidates,
+        'score': result.score,
+    }
@@ -0,0 +1,135 @@
+import time
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DIMENSIONS = ('user', 'document', 'destination_account')
+
+
+class VelocityChecker:
+    """
+    Sliding-window velocity rules over transaction creation.
+
+    Each window is split into `buckets` fixed slots; a window total is the sum
+    of its last slots, so checking a transaction reads a handful of counters in
+    one round trip instead of aggregating over `Transaction`. Counts and
+    amounts (in cents, per source currency) are tracked per user, per document
+    number and per destination account. `max_amount` maps a currency code to
+    the limit in that currency; currencies without a limit are only counted.
+    """
+
+    def __init__(self, rules, store, buckets=12):
+        self.rules = [self._normalize_rule(rule) for rule in rules]
+        self.store = store
+        self.buckets = buckets
+
+    @staticmethod
+    def _normalize_rule(rule):
+        if rule['dimension'] not in DIMENSIONS:
+            raise ValueError(f"Dimensión de riesgo desconocida: {rule['dimension']}")
+        rule = dict(rule)
+        max_amount = rule.get('max_amount')
+        if max_amount is not None:
+            if not isinstance(max_amount, dict):
+                raise ValueError(f"max_amount de {rule['name']} debe indicarse por moneda, p. ej. {{'PEN': 20000}}")
+            rule['max_amount_cents'] = {code.upper(): to_cents(limit) for code, limit in max_amount.items()}
+        return rule
+
+    def _bucket_size(self, rule):
+        return max(1, int(rule['window']) // self.buckets)
+
+    def _counter_prefix(self, rule, value):
+        return f"transactions:risk:{rule['dimension']}:{value}:{self._bucket_size(rule)}"
+
+    def _window_keys(self, rule, value, now, suffix):
+        bucket_size = self._bucket_size(rule)
+        current = int(now) // bucket_size
+        prefix = self._counter_prefix(rule, value)
+        return [f'{prefix}:{bucket}:{suffix}' for bucket in range(current - self.buckets + 1, current + 1)]
+
+    def _active_rules(self, dimensions):
+        for rule in self.rules:
+            value = dimensions.get(rule['dimension'])
+            if value:
+                yield rule, value
+
+    def evaluate(self, dimensions, amount, currency, now=None):
+        """
+        Returns the names of the rules the new transaction would exceed, counting
+        the transaction itself. `currency` is the code of the source currency.
+        """
+        now = time.time() if now is None else now
+        currency = (currency or '').upper()
+        amount_cents = to_cents(amount)
+        amount_suffix = f'amount:{currency}'
+
+        windows = []
+        keys = []
+        for rule, value in self._active_rules(dimensions):
+            # Only read the counters the rule actually limits
+            count_keys = self._window_keys(rule, value, now, 'count') if rule.get('max_count') is not None else []
+            max_amount_cents = rule.get('max_amount_cents', {}).get(currency)
+            amount_keys = self._window_keys(rule, value, now, amount_suffix) if max_amount_cents is not None else []
+            windows.append((rule, count_keys, amount_keys, max_amount_cents))
+            keys.extend(count_keys)
+            keys.extend(amount_keys)
+
+        if not windows:
+            return []
+
+        counters = self.store.get_many(keys)
+        triggered = []
+        for rule, count_keys, amount_keys, max_amount_cents in windows:
+            max_count = rule.get('max_count')
+            if max_count is not None:
+                count = sum(counters.get(key, 0) for key in count_keys) + 1
+                if count > max_count:
+                    triggered.append(rule['name'])
+                    continue
+            if max_amount_cents is not None:
+                total = sum(counters.get(key, 0) for key in amount_keys) + amount_cents
+                if total > max_amount_cents:
+                    triggered.append(rule['name'])
+        return triggered
+
+    def record(self, dimensions, amount, currency, now=None):
+        """Adds a created transaction to the current slot of every window."""
+        now = time.time() if now is None else now
+        currency = (currency or '').upper()
+        amount_cents = to_cents(amount)
+
+        deltas = {}
+        timeout = 0
+        for rule, value in self._active_rules(dimensions):
+            bucket_size = self._bucket_size(rule)
+            prefix = f'{self._counter_prefix(rule, value)}:{int(now) // bucket_size}'
+            deltas[f'{prefix}:count'] = 1
+            deltas[f'{prefix}:amount:{currency}'] = amount_cents
+            timeout = max(timeout, int(rule['window']) + bucket_size)
+
+        if deltas:
+            self.store.incr_many(deltas, timeout)
+
+
+def to_cents(amount):
+    return int((Decimal(str(amount or 0)) * 100).to_integral_value())
+
+
+@lru_cache(maxsize=None)
+def get_velocity_checker():
+    options = dict(settings.TRANSACTION_RISK)
+    store_class = import_string(options.pop('STORE'))
+    rules = options.pop('RULES', [])
+    buckets = options.pop('BUCKETS', 12)
+    store = store_class(**{key.lower(): value for key, value in options.items()})
+    return VelocityChecker(rules, store, buckets=buckets)
+
+
+def transaction_dimensions(user, destination_account_id):
+    return {
+        'user': user.id,
+        'document': user.document_number or None,
+        'destination_account': destination_account_id,
+    }
@@ -0,0 +1,100 @@
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Concat, Greatest
+
+from apps.users.models import User
+from .models import BankAccount, Transaction
+
+# Trigram indexes need at least three characters to narrow the scan
+SEARCH_MIN_LENGTH = 3
+# Upper bound of ranked results, keeps ranking and pagination cheap on large tables
+SEARCH_MAX_RESULTS = 200
+# Matches read (newest first, along the primary key) before ranking; a short
+# term such as "BRT" matches every transaction_id and must not rank the table
+SEARCH_CANDIDATES = 2000
+
+
+def normalize_term(term):
+    return ' '.join((term or '').split())
+
+
+def matching_user_ids(term):
+    """Ids of users whose email, document number or full name match the term."""
+    name_query = Q()
+    for word in term.split():
+        name_query &= Q(first_name__icontains=word) | Q(last_name__icontains=word)
+
+    return User.objects.filter(
+        Q(email__icontains=term) | Q(document_number__icontains=term) | name_query
+    ).values('id')
+
+
+def matching_account_ids(term):
+    """Ids of bank accounts whose account number, CCI, PIX key or document match the term."""
+    return BankAccount.objects.filter(
+        Q(account_number__icontains=term)
+        | Q(cci_number__icontains=term)
+        | Q(pix_key__icontains=term)
+        | Q(document_number__icontains=term)
+        | Q(cpf__icontains=term)
+    ).values('id')
+
+
+def _rank_expression(term):
+    rank = Case(
+        When(transaction_id__iexact=term, then=Value(2.0)),
+        When(transaction_id__istartswith=term, then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    if connection.vendor != 'postgresql':
+        return rank
+
+    full_name = Concat('user__first_name', Value(' '), 'user__last_name')
+    return rank + Greatest(
+        TrigramSimilarity('transaction_id', term),
+        TrigramWordSimilarity(term, 'user__email'),
+        TrigramWordSimilarity(term, full_name),
+    )
+
+
+def search_transactions(term, status=None):
+    """
+    Ranked transaction search by partial transaction id, customer name, email,
+    document number, PIX key or account number.
+
+    Users and accounts are resolved first through their own indexes so the
+    transaction filter stays a set of indexed OR conditions instead of a join
+    across every table. On PostgreSQL the `icontains` lookups are served by
+    the trigram GIN indexes; other backends fall back to plain scans.
+
+    Ranking runs in two steps: the newest SEARCH_CANDIDATES matches are read
+    in primary key order (plus an exact transaction_id match, however old),
+    and only those are ranked, so a term that matches most of the table
+    costs the same as a selective one.
+    """
+    term = normalize_term(term)
+    account_ids = matching_account_ids(term)
+
+    queryset = Transaction.objects.filter(
+        Q(transaction_id__icontains=term)
+        | Q(user_id__in=matching_user_ids(term))
+        | Q(origin_account_id__in=account_ids)
+        | Q(destination_account_id__in=account_ids)
+    )
+    if status:
+        queryset = queryset.filter(status=status)
+
+    candidates = list(queryset.order_by('-id').values_list('id', flat=True)[:SEARCH_CANDIDATES])
+    exact = Transaction.objects.filter(transaction_id__iexact=term)
+    if status:
+        exact = exact.filter(status=status)
+    candidates.extend(exact.values_list('id', flat=True))
+
+    return (
+        Transaction.objects.filter(id__in=candidates)
+        .select_related('user', 'seller', 'source_currency', 'destination_currency', 'coupon')
+        .annotate(rank=_rank_expression(term))
+        .order_by('-rank', '-created_at')[:SEARCH_MAX_RESULTS]
+    )
@@ -1,6 +1,11 @@
 from datetime import timezone
+from operator import attrgetter
+from django.db import models
 from rest_framework import serializers
-from .models import BankAccount, Coupon, Transaction
+from rest_framework.fields import SkipField
+from .models import ArchivedTransaction, BankAccount, Coupon, Transaction
+from .fingerprints import account_fingerprint
+from .snapshots import build_account_snapshot, get_account_snapshots
 from apps.users.models import User
 
 class BankAccountSerializer(serializers.ModelSerializer):
@@ -76,8 +81,45 @@ class BankAccountSerializer(serializers.ModelSerializer):
             data.pop('cci_number', None)
             data.pop('cci_number_confirmation', None)
 
+        # Evitar registrar dos veces la misma cuenta destino (búsqueda por huella indexada)
+        if not self.instance and data.get('user'):
+            fingerprint = account_fingerprint(
+                country,
+                bank_name=data.get('bank_name'),
+                account_number=data.get('account_number'),
+                cci_number=data.get('cci_number'),
+                pix_key=data.get('pix_key'),
+                pix_key_type=data.get('pix_key_type'),
+            )
+            if fingerprint and BankAccount.objects.filter(
+                fingerprint=fingerprint, user=data['user'], is_active=True
+            ).exists():
+                raise serializers.ValidationError("Esta cuenta bancaria ya está registrada")
+
         return data
 
+class SharedBankAccountSerializer(serializers.ModelSerializer):
+    """Cuenta de un grupo de cuentas con la misma huella, para revisión de staff"""
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+
+    class Meta:
+        model = BankAccount
+        fields = [
+            'id',
+            'user',
+            'user_email',
+            'country',
+            'bank_name',
+            'holder_names',
+            'holder_surnames',
+            'account_number',
+            'cci_number',
+            'pix_key',
+            'is_active',
+            'created_at'
+        ]
+        read_only_fields = fields
+
 class CouponSerializer(serializers.ModelSerializer):
     """Legacy serializer without new fields for existing endpoints"""
     source_currency_code = serializers.CharField(source='source_currency.code', read_only=True)
@@ -176,6 +218,11 @@ class TransactionSerializer(serializers.ModelSerializer):
            'updated_at'
        ]
        read_only_fields = ['id', 'transaction_id', 'created_at', 'updated_at']
+       extra_kwargs = {
+           # La moneda de la cuenta se carga en la misma consulta
+           'origin_account': {'queryset': BankAccount.objects.select_related('currency')},
+           'destination_account': {'queryset': BankAccount.objects.select_related('currency')},
+       }
 
    def validate(self, data):
         """
@@ -189,6 +236,33 @@ class TransactionSerializer(serializers.ModelSerializer):
 
         return data
    
+class ArchivedTransactionSerializer(TransactionSerializer):
+    """Read-only representation of archived rows, same layout as TransactionSerializer"""
+    class Meta(TransactionSerializer.Meta):
+        model = ArchivedTransaction
+        read_only_fields = TransactionSerializer.Meta.fields
+        extra_kwargs = {}
+
+
+class StaffTransactionListSerializer(serializers.ListSerializer):
+    """
+    Serializes staff transaction listings through a precompiled row builder.
+    Account details come from cached snapshots fetched once for the whole page.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        transactions = list(iterable)
+
+        account_ids = set()
+        for transaction in transactions:
+            account_ids.add(transaction.origin_account_id)
+            account_ids.add(transaction.destination_account_id)
+
+        build_row = self.child.compile_row_builder(get_account_snapshots(account_ids))
+        return [build_row(transaction) for transaction in transactions]
+
+
 class StaffTransactionSerializer(serializers.ModelSerializer):
     # Custom read-only fields to display related information
     user_email = serializers.EmailField(source='user.email', read_only=True)
@@ -206,8 +280,15 @@ class StaffTransactionSerializer(serializers.ModelSerializer):
     # Optional coupon code display
     coupon_code = serializers.CharField(source='coupon.code', read_only=True)
     
+    # Account detail fields resolved from snapshots, mapped to their FK column
+    ACCOUNT_DETAIL_FIELDS = {
+        'origin_account_details': 'origin_account_id',
+        'destination_account_details': 'destination_account_id',
+    }
+
     class Meta:
         model = Transaction
+        list_serializer_class = StaffTransactionListSerializer
         fields = [
             'id',
             'transaction_id',
@@ -262,48 +343,74 @@ class StaffTransactionSerializer(serializers.ModelSerializer):
     def get_account_details(self, account):
         if not account:
             return None
-
-        # Datos base que comparten ambos países
-        details = {
-            'bank_name': account.bank_name,
-            'currency': {
-                'id': account.currency.id if account.currency else None,
-                'name': account.currency.name if account.currency else None,
-                'code': account.currency.code if account.currency else None,
-                'symbol': account.currency.symbol if account.currency else None
-            },
-            'account_type': account.get_account_type_display(),
-            'third_party': account.third_party,
-            'country': account.country
-        }
-
-        # Datos específicos según el país
-        if account.country == 'PE':
-            details.update({
-                'holder_names': account.holder_names,
-                'holder_surnames': account.holder_surnames,
-                'document_number': account.document_number,
-                'account_number': account.account_number,
-                'cci_number': account.cci_number
-            })
-        elif account.country == 'BR':
-            details.update({
-                'holder_names': account.holder_names,
-                'holder_surnames': account.holder_surnames,
-                'document_number': account.document_number,
-                'account_number': account.account_number,
-                'pix_key': account.pix_key,
-                'pix_key_type': account.pix_key_type,
-                'cpf': account.cpf
-            })
-
-        return details
+        return build_account_snapshot(account)
 
     def get_origin_account_details(self, obj):
         return self.get_account_details(obj.origin_account)
 
     def get_destination_account_details(self, obj):
         return self.get_account_details(obj.destination_account)
+
+    def compile_row_builder(self, snapshots):
+        """
+        Resolves once, per field, how its value is read so each row is built with
+        a flat loop instead of the generic per-field serializer machinery.
+        """
+        readers = []
+        concrete_fields = self._concrete_field_names()
+        for field in self._readable_fields:
+            name = field.field_name
+            if name in self.ACCOUNT_DETAIL_FIELDS:
+                readers.append((name, self._snapshot_reader(self.ACCOUNT_DETAIL_FIELDS[name], snapshots)))
+            elif isinstance(field, serializers.SerializerMethodField):
+                readers.append((name, getattr(self, field.method_name)))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField) and '.' not in field.source:
+                # Read the FK column directly, the related object is never needed
+                readers.append((name, attrgetter(self.Meta.model._meta.get_field(field.source).attname)))
+            elif field.source in concrete_fields:
+                readers.append((name, self._field_reader(field, attrgetter(field.source))))
+            else:
+                readers.append((name, self._field_reader(field, field.get_attribute)))
+
+        def build_row(instance):
+            row = {}
+            for name, read in readers:
+                try:
+                    row[name] = read(instance)
+                except SkipField:
+                    continue
+            return row
+
+        return build_row
+
+    @staticmethod
+    def _snapshot_reader(attname, snapshots):
+        get_id = attrgetter(attname)
+
+        def read(instance):
+            return snapshots.get(get_id(instance))
+
+        return read
+
+    @classmethod
+    def _concrete_field_names(cls):
+        return {
+            model_field.name for model_field in cls.Meta.model._meta.concrete_fields
+            if not model_field.is_relation
+        }
+
+    @staticmethod
+    def _field_reader(field, get_attribute):
+        to_representation = field.to_representation
+
+        def read(instance):
+            attribute = get_attribute(instance)
+            if attribute is None:
+                return None
+            return to_representation(attribute)
+
+        return read
+
     def validate(self, data):
         """
         Custom validation logic for staff transactions
@@ -372,4 +479,11 @@ class TransactionResponseSerializer(serializers.ModelSerializer):
     def get_payment_voucher(self, obj):
         if obj.payment_voucher:
             return self.context['request'].build_absolute_uri(obj.payment_voucher.url)
-        return None
\ No newline at end of file
+        return None
+
+
+class ArchivedStaffTransactionSerializer(StaffTransactionSerializer):
+    """Staff listing of archived transactions, read-only"""
+    class Meta(StaffTransactionSerializer.Meta):
+        model = ArchivedTransaction
+        read_only_fields = StaffTransactionSerializer.Meta.fields
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.coin.models import Currency
+from .accounts import invalidate_user_accounts
+from .models import BankAccount, Transaction
+from .realtime import build_transaction_event, publish_transaction_event
+from .snapshots import cache_account_snapshots, invalidate_account_snapshots
+
+
+@receiver(post_save, sender=BankAccount)
+def refresh_account_snapshot(sender, instance, **kwargs):
+    # Rebuild once per change, after the write is visible to other workers
+    def refresh():
+        cache_account_snapshots([instance])
+        invalidate_user_accounts([instance.user_id])
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_delete, sender=BankAccount)
+def drop_account_snapshot(sender, instance, **kwargs):
+    # delete() clears instance.pk before the on_commit callbacks run
+    account_id, user_id = instance.pk, instance.user_id
+
+    def drop():
+        invalidate_account_snapshots([account_id])
+        invalidate_user_accounts([user_id])
+
+    transaction.on_commit(drop)
+
+
+@receiver(post_save, sender=Currency)
+def drop_currency_account_snapshots(sender, instance, created, **kwargs):
+    if created:
+        return
+    account_ids = list(BankAccount.objects.filter(currency=instance).values_list('id', flat=True))
+    transaction.on_commit(lambda: invalidate_account_snapshots(account_ids))
+
+
+@receiver(post_save, sender=Transaction)
+def publish_transaction_change(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    previous_status = loaded.get('status')
+    previous_seller = loaded.get('seller_id')
+
+    if created:
+        event = 'created'
+    elif previous_seller != instance.seller_id and 'seller_id' in loaded:
+        event = 'assigned'
+    elif previous_status != instance.status and 'status' in loaded:
+        event = 'status_changed'
+    else:
+        return
+
+    instance._loaded_values = {**loaded, 'status': instance.status, 'seller_id': instance.seller_id}
+    message = build_transaction_event(event, instance, previous_status=previous_status)
+    transaction.on_commit(lambda: publish_transaction_event(message))
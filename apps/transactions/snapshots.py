@@ -0,0 +1,90 @@
+from django.core.cache import cache
+
+from .models import BankAccount
+
+# Bump when the snapshot layout changes so stale entries are never read back
+ACCOUNT_SNAPSHOT_VERSION = 1
+ACCOUNT_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+def account_snapshot_key(account_id):
+    return f"transactions:account-snapshot:v{ACCOUNT_SNAPSHOT_VERSION}:{account_id}"
+
+
+def build_account_snapshot(account):
+    """
+    Builds the flat representation of a bank account used by the staff
+    transaction listings. Expects `account.currency` to be already loaded.
+    """
+    currency = account.currency
+
+    # Datos base que comparten ambos países
+    snapshot = {
+        'bank_name': account.bank_name,
+        'currency': {
+            'id': currency.id if currency else None,
+            'name': currency.name if currency else None,
+            'code': currency.code if currency else None,
+            'symbol': currency.symbol if currency else None
+        },
+        'account_type': account.get_account_type_display(),
+        'third_party': account.third_party,
+        'country': account.country
+    }
+
+    # Datos específicos según el país
+    if account.country == 'PE':
+        snapshot.update({
+            'holder_names': account.holder_names,
+            'holder_surnames': account.holder_surnames,
+            'document_number': account.document_number,
+            'account_number': account.account_number,
+            'cci_number': account.cci_number
+        })
+    elif account.country == 'BR':
+        snapshot.update({
+            'holder_names': account.holder_names,
+            'holder_surnames': account.holder_surnames,
+            'document_number': account.document_number,
+            'account_number': account.account_number,
+            'pix_key': account.pix_key,
+            'pix_key_type': account.pix_key_type,
+            'cpf': account.cpf
+        })
+
+    return snapshot
+
+
+def cache_account_snapshots(accounts):
+    """Builds and stores the snapshots of the given accounts. Returns them by id."""
+    snapshots = {account.id: build_account_snapshot(account) for account in accounts}
+    if snapshots:
+        cache.set_many(
+            {account_snapshot_key(account_id): snapshot for account_id, snapshot in snapshots.items()},
+            ACCOUNT_SNAPSHOT_TIMEOUT
+        )
+    return snapshots
+
+
+def get_account_snapshots(account_ids):
+    """
+    Returns {account_id: snapshot} for the given ids, reading from the cache in a
+    single round trip and loading only the misses from the database.
+    """
+    account_ids = {account_id for account_id in account_ids if account_id}
+    if not account_ids:
+        return {}
+
+    keys = {account_snapshot_key(account_id): account_id for account_id in account_ids}
+    snapshots = {keys[key]: snapshot for key, snapshot in cache.get_many(keys).items()}
+
+    missing = account_ids - snapshots.keys()
+    if missing:
+        accounts = BankAccount.objects.select_related('currency').filter(id__in=missing)
+        snapshots.update(cache_account_snapshots(accounts))
+
+    return snapshots
+
+
+def invalidate_account_snapshots(account_ids):
+    cache.delete_many([account_snapshot_key(account_id) for account_id in account_ids])
@@ -1,3 +1,407 @@
-from django.test import TestCase
+import asyncio
+import io
+from unittest import mock
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.coin.models import Currency
+from apps.common.counters import LocalCounterStore
+from apps.users.models import Role
+
+from .accounts import get_user_accounts, user_accounts_key
+from .archive import archive_batch
+from .fingerprints import account_fingerprint, canonical_pix_key
+from .models import ArchivedTransaction, BankAccount, Transaction
+from . import search
+from .reconciliation import AMBIGUOUS, MATCHED, UNMATCHED, StatementLine, iter_statement, reconcile_statement
+from .realtime import CacheChannelLayer, InMemoryChannelLayer, feed_ticket_group, get_channel_layer, issue_feed_ticket
+from .risk import VelocityChecker, get_velocity_checker
+from .snapshots import account_snapshot_key, get_account_snapshots
+from .views import _feed_events
+
+
+class ChannelLayerTests(SimpleTestCase):
+    def test_read_resumes_after_sequence(self):
+        layer = InMemoryChannelLayer()
+        for index in range(3):
+            layer.publish('seller:1', {'event': 'created', 'id': index})
+
+        messages = layer.read('seller:1', after=1, timeout=0)
+
+        self.assertEqual([sequence for sequence, _ in messages], [2, 3])
+        self.assertEqual(layer.last_sequence('seller:1'), 3)
+
+    def test_expired_messages_are_reported(self):
+        layer = InMemoryChannelLayer(retention=0)
+        layer.publish('seller:1', {'event': 'created', 'id': 1})
+        layer.publish('seller:1', {'event': 'created', 'id': 2})
+
+        messages = layer.read('seller:1', after=0, timeout=0)
+
+        self.assertEqual(messages[0], (1, None))
+        self.assertEqual(messages[1][1]['id'], 2)
+
+    def test_cache_layer_is_not_shared_with_locmem(self):
+        self.assertFalse(CacheChannelLayer().available)
+
+
+async def collect(events):
+    return [chunk async for chunk in events]
+
+
+INMEMORY_FEED = {
+    'LAYER': 'apps.transactions.realtime.InMemoryChannelLayer', 'KEEPALIVE': 1, 'MAX_DURATION': 0.05, 'TICKET_TTL': 60,
+}
+
+
+class TransactionFeedTests(SimpleTestCase):
+    def test_stream_ends_after_max_duration(self):
+        layer = InMemoryChannelLayer()
+        layer.publish('seller:1', {'event': 'created', 'id': 1})
+
+        chunks = asyncio.run(collect(_feed_events(layer, 'seller:1', 0, keepalive=0.01, max_duration=0.05)))
+
+        self.assertEqual(chunks[0], 'retry: 1000\n\n')
+        self.assertTrue(chunks[1].startswith('id: 1\nevent: created\n'))
+
+    def test_feed_refuses_process_local_cache(self):
+        get_channel_layer.cache_clear()
+        self.addCleanup(get_channel_layer.cache_clear)
+
+        response = self.client.get('/api/v1/transactions/feed/')
+
+        self.assertEqual(response.status_code, 503)
+
+    @override_settings(TRANSACTION_FEED=INMEMORY_FEED)
+    def test_feed_requires_a_ticket(self):
+        get_channel_layer.cache_clear()
+        self.addCleanup(get_channel_layer.cache_clear)
+
+        for query in ('', '?ticket=forged', '?token=eyJhbGciOiJIUzI1NiJ9.e30.x'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get('/api/v1/transactions/feed/' + query).status_code, 401)
+
+    @override_settings(TRANSACTION_FEED=INMEMORY_FEED)
+    async def test_ticket_streams_its_group(self):
+        get_channel_layer.cache_clear()
+        self.addCleanup(get_channel_layer.cache_clear)
+        get_channel_layer().publish('seller:7', {'event': 'created', 'id': 1})
+
+        response = await self.async_client.get(
+            '/api/v1/transactions/feed/', {'ticket': issue_feed_ticket('seller:7'), 'last_event_id': 0}
+        )
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('id: 1\nevent: created\n', body)
+
+    @override_settings(TRANSACTION_FEED=INMEMORY_FEED)
+    def test_ticket_opens_its_group_until_it_expires(self):
+        ticket = issue_feed_ticket('seller:7')
+
+        self.assertEqual(feed_ticket_group(ticket), 'seller:7')
+        with override_settings(TRANSACTION_FEED={**INMEMORY_FEED, 'TICKET_TTL': -1}):
+            self.assertIsNone(feed_ticket_group(ticket))
+
+
+def make_user(email, **extra_fields):
+    fields = {'first_name': 'Test', 'last_name': 'User', **extra_fields}
+    return get_user_model().objects.create(email=email, **fields)
+
+
+class TransactionFeedTicketTests(TestCase):
+    def test_only_staff_and_sales_get_a_ticket(self):
+        for role_name, expected in (('staff', 201), ('client', 403)):
+            with self.subTest(role=role_name):
+                role, _ = Role.objects.get_or_create(name=role_name)
+                user = make_user(f'{role_name}@example.com', role=role)
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {user.tokens()['access']}")
+
+                response = client.post('/api/v1/transactions/feed/ticket/', {'scope': 'all'}, format='json')
+
+                self.assertEqual(response.status_code, expected)
+                if expected == 201:
+                    self.assertEqual(feed_ticket_group(response.data['ticket']), 'staff')
+
+
+LOCAL_RISK = {
+    'STORE': 'apps.common.counters.LocalCounterStore',
+    'BUCKETS': 12,
+    'RULES': [
+        {'name': 'user_daily_amount', 'dimension': 'user', 'window': 60 * 60 * 24, 'max_amount': {'PEN': 1000}},
+        {'name': 'destination_hourly_count', 'dimension': 'destination_account', 'window': 60 * 60, 'max_count': 2},
+    ],
+}
+
+
+class VelocityCheckerTests(SimpleTestCase):
+    def setUp(self):
+        self.checker = VelocityChecker(LOCAL_RISK['RULES'], LocalCounterStore(), buckets=12)
+        self.now = 1_800_000_000
+
+    def test_amounts_are_limited_per_currency(self):
+        dimensions = {'user': 1}
+        self.checker.record(dimensions, 900, 'PEN', now=self.now)
+
+        self.assertEqual(self.checker.evaluate(dimensions, 200, 'pen', now=self.now), ['user_daily_amount'])
+        self.assertEqual(self.checker.evaluate(dimensions, 100, 'PEN', now=self.now), [])
+        # BRL has no limit and does not add to the PEN total
+        self.assertEqual(self.checker.evaluate(dimensions, 5000, 'BRL', now=self.now), [])
+
+    def test_window_slides(self):
+        dimensions = {'destination_account': 7}
+        for _ in range(2):
+            self.checker.record(dimensions, 10, 'PEN', now=self.now)
+
+        self.assertEqual(self.checker.evaluate(dimensions, 10, 'PEN', now=self.now), ['destination_hourly_count'])
+        self.assertEqual(self.checker.evaluate(dimensions, 10, 'PEN', now=self.now + 60 * 60 + 300), [])
+
+    def test_amount_limits_must_name_the_currency(self):
+        with self.assertRaises(ValueError):
+            VelocityChecker([{'name': 'x', 'dimension': 'user', 'window': 60, 'max_amount': 20000}], LocalCounterStore())
+
+
+@override_settings(TRANSACTION_RISK=LOCAL_RISK)
+class CreateTransactionRiskTests(TestCase):
+    def setUp(self):
+        get_velocity_checker.cache_clear()
+        self.addCleanup(get_velocity_checker.cache_clear)
+        self.user = make_user('risk@example.com', document_number='12345678')
+        self.pen = Currency.objects.create(code='PEN', name='Sol')
+        self.brl = Currency.objects.create(code='BRL', name='Real')
+        self.origin = BankAccount.objects.create(user=self.user, country='PE', bank_name='BCP', currency=self.pen)
+        self.destination = BankAccount.objects.create(user=self.user, country='BR', bank_name='Nubank', currency=self.brl)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, amount):
+        response = self.client.post('/api/v1/transactions/transaction-create/', {
+            'user': self.user.id, 'origin_account': self.origin.id, 'destination_account': self.destination.id,
+            'source_amount': amount, 'destination_amount': amount, 'source_currency': self.pen.id,
+            'destination_currency': self.brl.id, 'exchange_rate': '1.0', 'payment_method': 'transfer', 'status': 'pending',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Transaction.objects.get(transaction_id=response.data['transaction_id'])
+
+    def test_transactions_over_a_rule_are_observed(self):
+        first = self.create('600.00')
+        second = self.create('600.00')
+
+        self.assertEqual(first.status, 'pending')
+        self.assertEqual(second.status, 'observed')
+
+
+class AccountCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('accounts@example.com')
+        self.pen = Currency.objects.create(code='PEN', name='Sol')
+
+    def make_account(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BankAccount.objects.create(user=self.user, country='PE', currency=self.pen, **fields)
+
+    def test_snapshot_follows_the_committed_account(self):
+        account = self.make_account(bank_name='BCP')
+        key = account_snapshot_key(account.id)
+        self.assertEqual(cache.get(key)['bank_name'], 'BCP')
+
+        account.bank_name = 'Interbank'
+        with self.captureOnCommitCallbacks(execute=True):
+            account.save()
+        self.assertEqual(get_account_snapshots([account.id])[account.id]['bank_name'], 'Interbank')
+
+        self.pen.name = 'Nuevo Sol'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pen.save()
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(get_account_snapshots([account.id])[account.id]['currency']['name'], 'Nuevo Sol')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            account.delete()
+        self.assertIsNone(cache.get(key))
+
+    def test_account_list_is_dropped_on_save_and_delete(self):
+        first = self.make_account(bank_name='BCP')
+        self.assertEqual(len(get_user_accounts(self.user.id)), 1)
+        with self.assertNumQueries(0):
+            get_user_accounts(self.user.id)
+
+        second = self.make_account(bank_name='Interbank')
+        self.assertIsNone(cache.get(user_accounts_key(self.user.id)))
+        self.assertEqual(len(get_user_accounts(self.user.id)), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual([account['id'] for account in get_user_accounts(self.user.id)], [second.id])
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = make_user('client@example.com')
+        self.cutoff = timezone.now() - timedelta(days=30)
+
+    def make_transaction(self, transaction_id, status='completed'):
+        created = Transaction.objects.create(
+            user=self.user, transaction_id=transaction_id, source_amount=100,
+            destination_amount=30, payment_method='transfer', status=status,
+        )
+        Transaction.objects.filter(pk=created.pk).update(updated_at=self.cutoff - timedelta(days=1))
+        return created
+
+    def test_moves_closed_transactions(self):
+        closed = self.make_transaction('TX-1')
+        pending = self.make_transaction('TX-2', status='pending')
+
+        self.assertEqual(archive_batch(self.cutoff), 1)
+
+        self.assertTrue(ArchivedTransaction.objects.filter(pk=closed.pk).exists())
+        self.assertFalse(Transaction.objects.filter(pk=closed.pk).exists())
+        self.assertTrue(Transaction.objects.filter(pk=pending.pk).exists())
+
+    def test_conflict_keeps_the_batch_in_the_hot_table(self):
+        closed = self.make_transaction('TX-1')
+        ArchivedTransaction.objects.create(
+            id=closed.pk + 1000, user=self.user, transaction_id='TX-1', source_amount=1,
+            destination_amount=1, payment_method='transfer', status='completed',
+            created_at=timezone.now(), updated_at=timezone.now(),
+        )
+
+        with self.assertRaises(IntegrityError):
+            archive_batch(self.cutoff)
+
+        self.assertTrue(Transaction.objects.filter(pk=closed.pk).exists())
+
+
+class TransactionSearchTests(TestCase):
+    def make_transaction(self, user, transaction_id):
+        return Transaction.objects.create(
+            user=user, transaction_id=transaction_id, source_amount=100, destination_amount=30,
+            payment_method='transfer',
+        )
+
+    def test_every_matching_user_is_searched(self):
+        get_user_model().objects.bulk_create(
+            get_user_model()(email=f'garcia{index}@example.com', username=f'garcia{index}@example.com',
+                             first_name='Ana', last_name='Garcia')
+            for index in range(search.SEARCH_MAX_RESULTS)
+        )
+        last = make_user('zz-garcia@example.com', first_name='Ana', last_name='Garcia')
+        self.make_transaction(last, 'BRT-PB-1')
+
+        results = list(search.search_transactions('garcia'))
+
+        self.assertEqual([transaction.transaction_id for transaction in results], ['BRT-PB-1'])
+
+    def test_only_the_newest_candidates_are_ranked(self):
+        user = make_user('rank@example.com')
+        oldest = self.make_transaction(user, 'BRT-PB-100')
+        for index in range(101, 104):
+            self.make_transaction(user, f'BRT-PB-{index}')
+
+        with mock.patch.object(search, 'SEARCH_CANDIDATES', 2):
+            broad = [transaction.transaction_id for transaction in search.search_transactions('BRT')]
+            exact = [transaction.id for transaction in search.search_transactions('brt-pb-100')]
+
+        self.assertEqual(broad, ['BRT-PB-103', 'BRT-PB-102'])
+        self.assertEqual(exact[0], oldest.id)
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.pen = Currency.objects.create(code='PEN', name='Sol')
+        self.brl = Currency.objects.create(code='BRL', name='Real')
+        self.user = make_user('juan@example.com', document_number='12345678')
+        self.user.first_name, self.user.last_name = 'Juan', 'Perez'
+        self.user.save()
+
+    def make_pending(self, transaction_id, currency, amount='150.00'):
+        return Transaction.objects.create(
+            user=self.user, transaction_id=transaction_id, source_amount=Decimal(amount),
+            total_send=Decimal(amount), destination_amount=1, source_currency=currency,
+            payment_method='transfer',
+        )
+
+    def line(self, name='JUAN PEREZ', document=None, amount='150.00', currency=None):
+        return StatementLine(2, 'OP1', date.today(), Decimal(amount), name, document, currency)
+
+    def test_matches_by_document_and_applies(self):
+        pending = self.make_pending('TX-1', self.pen)
+
+        result, = reconcile_statement([self.line(document='12345678')], 'PEN', apply=True)
+
+        self.assertEqual((result.status, result.transaction.id), (MATCHED, pending.id))
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'received')
+
+    def test_ignores_transactions_in_another_currency(self):
+        self.make_pending('TX-1', self.brl)
+
+        result, = reconcile_statement([self.line()], 'PEN', apply=True)
+
+        self.assertEqual(result.status, UNMATCHED)
+        self.assertFalse(Transaction.objects.filter(status='received').exists())
+
+    def test_line_currency_overrides_the_statement_currency(self):
+        self.make_pending('TX-1', self.pen)
+
+        result, = reconcile_statement([self.line(currency='BRL')], 'PEN')
+
+        self.assertEqual(result.status, UNMATCHED)
+
+    def test_equal_candidates_are_ambiguous(self):
+        self.make_pending('TX-1', self.pen)
+        self.make_pending('TX-2', self.pen)
+
+        result, = reconcile_statement([self.line()], 'PEN', apply=True)
+
+        self.assertEqual((result.status, result.candidates), (AMBIGUOUS, 2))
+        self.assertFalse(Transaction.objects.filter(status='received').exists())
+
+    def test_reads_semicolon_csv(self):
+        statement = io.BytesIO('Fecha;Monto;Nombre;Moneda\n01/02/2026;1.234,50;Ana Lima;pen\n01/02/2026;-5,00;Cargo;PEN\n'.encode())
+
+        line, = iter_statement(statement, 'extracto.csv')
+
+        self.assertEqual((line.date, line.amount, line.currency), (date(2026, 2, 1), Decimal('1234.50'), 'PEN'))
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_pix_keys_are_canonical(self):
+        self.assertEqual(canonical_pix_key(' Ana@Mail.com '), 'ana@mail.com')
+        self.assertEqual(canonical_pix_key('123.456.789-09', 'cpf'), '12345678909')
+        self.assertEqual(canonical_pix_key('+55 (11) 98765-4321', 'phone'), canonical_pix_key('11987654321', 'phone'))
+
+    def test_same_destination_same_fingerprint(self):
+        self.assertEqual(
+            account_fingerprint('PE', bank_name='BCP', cci_number='002-193-001234567890-12'),
+            account_fingerprint('PE', bank_name='Interbank', cci_number='00219300123456789012'),
+        )
+        self.assertEqual(
+            account_fingerprint('PE', bank_name='Banco de Crédito', account_number='193-1234567-0-12'),
+            account_fingerprint('PE', bank_name='banco de credito', account_number='1931234567012'),
+        )
+        self.assertNotEqual(
+            account_fingerprint('PE', bank_name='BCP', account_number='1931234567012'),
+            account_fingerprint('PE', bank_name='BBVA', account_number='1931234567012'),
+        )
+        self.assertIsNone(account_fingerprint('PE', bank_name='BCP'))
+
+
+class BankAccountFingerprintTests(TestCase):
+    def test_saving_stores_the_fingerprint(self):
+        user = make_user('pix@example.com')
+        account = BankAccount.objects.create(
+            user=user, country='BR', bank_name='Nubank', pix_key='ANA@MAIL.COM', pix_key_type='email',
+        )
+
+        self.assertEqual(account.fingerprint, account_fingerprint('BR', pix_key='ana@mail.com'))
+        self.assertTrue(BankAccount.objects.filter(fingerprint=account.fingerprint, user=user).exists())
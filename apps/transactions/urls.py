@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import BankAccountListCreateView, BankAccountDetailView, CouponByCodeView, CouponDetailView, CouponManagementView, CouponV2ByCodeView, CouponV2DetailView, CouponV2ManagementView, CreateTransactionView, StaffTransactionDetailView, StaffTransactionListView, StaffTransactionStatusView, StaffTransactionVoucherView, TransactionDetailView, TransactionListView, CouponAutomaticView, CouponAutomaticDetailView
+from .views import BankAccountListCreateView, BankAccountDetailView, CouponByCodeView, CouponDetailView, CouponManagementView, CouponV2ByCodeView, CouponV2DetailView, CouponV2ManagementView, CreateTransactionView, StaffTransactionDetailView, StaffTransactionListView, StaffTransactionSearchView, StaffSharedBankAccountsView, StaffStatementReconciliationView, StaffTransactionStatusView, StaffTransactionVoucherView, TransactionDetailView, TransactionListView, CouponAutomaticView, transaction_feed, TransactionFeedTicketView, CouponAutomaticDetailView
 
 urlpatterns = [
     path('coupons/', CouponManagementView.as_view(), name='coupon-list-create'),
@@ -13,10 +13,15 @@ urlpatterns = [
     path('coupons/automatic/', CouponAutomaticView.as_view(), name='coupon-automatic'),
     path('coupons/automatic/<int:pk>/', CouponAutomaticDetailView.as_view(), name='coupon-automatic-detail'),
     path('bank-accounts/', BankAccountListCreateView.as_view(), name='bank-account-list-create'),
+    path('bank-accounts/shared/', StaffSharedBankAccountsView.as_view(), name='bank-account-shared'),
     path('bank-accounts/<int:pk>/', BankAccountDetailView.as_view(), name='bank-account-detail'),
     path('', TransactionListView.as_view(), name='transaction-list'),
     path('<int:pk>/', TransactionDetailView.as_view(), name='transaction-detail'),
     path('transactions/',StaffTransactionListView.as_view(),name='transaction-list'),
+    path('search/',StaffTransactionSearchView.as_view(),name='transaction-search'),
+    path('feed/',transaction_feed,name='transaction-feed'),
+    path('feed/ticket/',TransactionFeedTicketView.as_view(),name='transaction-feed-ticket'),
+    path('reconcile/',StaffStatementReconciliationView.as_view(),name='transaction-reconcile'),
 
     # Transaction steps - Following a logical flow for staff operations
     path('<int:pk>/review/',StaffTransactionDetailView.as_view(),name='transaction-review'),
@@ -1,19 +1,31 @@
 from venv import logger
-from apps.transactions.models import BankAccount, Coupon, Transaction
-from apps.transactions.serializers import BankAccountSerializer, CouponSerializer, CouponV2Serializer, StaffTransactionSerializer,  TransactionConfirmSerializer, TransactionResponseSerializer, TransactionInitSerializer, TransactionSerializer
+import json
+import time
+from asgiref.sync import sync_to_async
+from apps.transactions.models import ArchivedTransaction, BankAccount, Coupon, Transaction
+from apps.transactions.serializers import ArchivedStaffTransactionSerializer, ArchivedTransactionSerializer, BankAccountSerializer, SharedBankAccountSerializer, CouponSerializer, CouponV2Serializer, StaffTransactionSerializer,  TransactionConfirmSerializer, TransactionResponseSerializer, TransactionInitSerializer, TransactionSerializer
 from rest_framework.generics import GenericAPIView
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import Http404
+from django.conf import settings
+from django.db.models import Count
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
 
+from apps.coin.models import Currency
 from apps.users.permissions import IsOwnerOrStaff, IsStaff
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from .accounts import active_accounts, get_user_accounts
+from .archive import get_transaction_or_archived, user_transaction_history
 from .email_service import EmailService
+from .realtime import feed_group_for, feed_ticket_group, get_channel_layer, issue_feed_ticket
+from .reconciliation import RECONCILIATION_WINDOW_DAYS, iter_statement, reconcile_statement, result_row
+from .risk import get_velocity_checker, transaction_dimensions
+from .search import SEARCH_MIN_LENGTH, search_transactions
 
 User = get_user_model()
 
@@ -40,29 +52,32 @@ class BankAccountListCreateView(GenericAPIView):
             if not self.request.user.is_authenticated:
                 return BankAccount.objects.none()
 
-            # Verificar si el usuario es staff de manera segura
-            is_staff = (
-                hasattr(self.request.user, 'role') and 
-                self.request.user.role is not None and 
-                self.request.user.role.name == 'staff'
-            )
+            user_id = self.get_account_owner_id()
+            if user_id:
+                return active_accounts(user_id)
+            # Staff sin user_id ve todas las cuentas activas
+            return BankAccount.objects.select_related('currency').filter(is_active=True)
 
-            if is_staff:
-                # Staff puede ver todas las cuentas si especifica user_id
-                user_id = self.request.query_params.get('user_id')
-                if user_id:
-                    return BankAccount.objects.filter(user_id=user_id, is_active=True)
-                return BankAccount.objects.filter(is_active=True)
-            
-            # Para usuarios no staff, mostrar solo sus propias cuentas
-            return BankAccount.objects.filter(
-                user=self.request.user,
-                is_active=True
-            )
-            
         except Exception as e:
             print(f"Error en get_queryset: {str(e)}")
             return BankAccount.objects.none()
+
+    def get_account_owner_id(self):
+        """
+        Usuario cuyas cuentas se listan: el propio usuario, o el user_id indicado por staff.
+        Devuelve None cuando staff lista todas las cuentas.
+        """
+        # Verificar si el usuario es staff de manera segura
+        is_staff = (
+            hasattr(self.request.user, 'role') and 
+            self.request.user.role is not None and 
+            self.request.user.role.name == 'staff'
+        )
+        if is_staff:
+            return self.request.query_params.get('user_id')
+        # Para usuarios no staff, mostrar solo sus propias cuentas
+        return self.request.user.id
+
     def post(self, request):
         """
         Crea una nueva cuenta bancaria.
@@ -77,7 +92,19 @@ class BankAccountListCreateView(GenericAPIView):
     def get(self, request):
         """
         Lista las cuentas bancarias del usuario con soporte para paginación.
+        Las cuentas de un usuario se sirven desde caché hasta que alguna cambie.
         """
+        user_id = self.get_account_owner_id() if request.user.is_authenticated else None
+        if user_id:
+            try:
+                accounts = get_user_accounts(int(user_id))
+            except ValueError:
+                return Response({'error': 'user_id inválido'}, status=status.HTTP_400_BAD_REQUEST)
+            page = self.paginate_queryset(accounts)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(accounts)
+
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
         
@@ -88,6 +115,51 @@ class BankAccountListCreateView(GenericAPIView):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+class StaffSharedBankAccountsView(GenericAPIView):
+    """
+    Cuentas destino registradas por más de un usuario, agrupadas por huella.
+    Con account_id devuelve todas las cuentas que comparten el destino de esa cuenta.
+    """
+    serializer_class = SharedBankAccountSerializer
+    pagination_class = BankAccountPagination
+    permission_classes = [IsStaff]
+
+    def get(self, request):
+        account_id = request.query_params.get('account_id')
+        if account_id:
+            if not account_id.isdigit():
+                return Response({'error': 'account_id inválido'}, status=status.HTTP_400_BAD_REQUEST)
+            account = get_object_or_404(BankAccount, pk=account_id)
+            accounts = self._accounts([account.fingerprint]) if account.fingerprint else []
+            return Response({
+                'fingerprint': account.fingerprint,
+                'users': len({shared.user_id for shared in accounts}),
+                'accounts': self.get_serializer(accounts, many=True).data,
+            })
+
+        groups = (
+            BankAccount.objects.filter(fingerprint__isnull=False)
+            .values('fingerprint')
+            .annotate(users=Count('user', distinct=True), accounts=Count('id'))
+            .filter(users__gt=1)
+            .order_by('-users', 'fingerprint')
+        )
+        page = self.paginate_queryset(groups)
+        accounts_by_fingerprint = {}
+        for shared in self._accounts([group['fingerprint'] for group in page]):
+            accounts_by_fingerprint.setdefault(shared.fingerprint, []).append(shared)
+        for group in page:
+            group['accounts'] = self.get_serializer(accounts_by_fingerprint.get(group['fingerprint'], []), many=True).data
+        return self.get_paginated_response(page)
+
+    @staticmethod
+    def _accounts(fingerprints):
+        return list(
+            BankAccount.objects.select_related('user')
+            .filter(fingerprint__in=fingerprints)
+            .order_by('user_id', '-created_at')
+        )
+
 class BankAccountDetailView(GenericAPIView):
     """
     Vista para operaciones detalladas de una cuenta bancaria específica:
@@ -503,15 +575,19 @@ class TransactionDetailView(GenericAPIView):
         ).order_by('-created_at')
     
     def get(self, request, *args, **kwargs): 
-        queryset = self.get_queryset()
-        if not queryset.exists():
+        # El historial incluye las transacciones archivadas del usuario
+        recent, archived = user_transaction_history(self.kwargs.get('pk'))
+        if not recent and not archived:
             return Response(
                 {"message": "No se encontraron transacciones para este usuario"},
                 status=status.HTTP_404_NOT_FOUND
             )
-            
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+
+        context = self.get_serializer_context()
+        data = self.get_serializer(recent, many=True).data
+        data += ArchivedTransactionSerializer(archived, many=True, context=context).data
+        data.sort(key=lambda row: row['created_at'], reverse=True)
+        return Response(data)
     
 class StaffTransactionListView(GenericAPIView):
     """View for listing and creating transactions by staff members"""
@@ -520,22 +596,38 @@ class StaffTransactionListView(GenericAPIView):
         return Transaction.objects.all()
   
     def get(self, request):
-        # Get queryset with all related fields to optimize performance
+        # Get queryset with all related fields to optimize performance.
+        # Account details are served from cached snapshots, so the accounts are not joined.
         transactions = Transaction.objects.all().select_related(
             'user', 
-            'origin_account', 
-            'destination_account',
+            'seller',
             'source_currency',
             'destination_currency',
             'coupon'
         ).order_by('-created_at')
         
+        # Closed transactions moved to the archive are only read on request
+        archived = request.query_params.get('archived', '').lower() in ('1', 'true')
+        if archived:
+            transactions = ArchivedTransaction.objects.select_related(
+                'user',
+                'seller',
+                'source_currency',
+                'destination_currency',
+                'coupon'
+            ).order_by('-created_at')
+
         # Apply filters if provided
         status_filter = request.query_params.get('status')
         if status_filter:
             transactions = transactions.filter(status=status_filter)
-            
-        serializer = self.get_serializer(transactions, many=True)
+
+        if archived:
+            serializer = ArchivedStaffTransactionSerializer(
+                transactions, many=True, context=self.get_serializer_context()
+            )
+        else:
+            serializer = self.get_serializer(transactions, many=True)
         return Response(serializer.data)
 
     def post(self, request):
@@ -545,6 +637,81 @@ class StaffTransactionListView(GenericAPIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class TransactionSearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class StaffTransactionSearchView(GenericAPIView):
+    """
+    Ranked search for the back office by partial transaction_id, customer name,
+    email, document number, PIX key or account number.
+    """
+    serializer_class = StaffTransactionSerializer
+    pagination_class = TransactionSearchPagination
+    permission_classes = [IsStaff]
+
+    def get(self, request):
+        term = request.query_params.get('q', '').strip()
+        if len(term) < SEARCH_MIN_LENGTH:
+            return Response(
+                {'error': f'La búsqueda requiere al menos {SEARCH_MIN_LENGTH} caracteres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Results are capped, so paginating the evaluated list avoids a COUNT over the table
+        results = list(search_transactions(term, status=request.query_params.get('status')))
+        page = self.paginate_queryset(results)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class StaffStatementReconciliationView(GenericAPIView):
+    """
+    Upload of a bank statement (CSV or OFX) in `currency` to reconcile it
+    against the pending transactions sent in that currency. Proposes matches by default; with `apply=true` unique matches
+    are marked as received.
+    """
+    permission_classes = [IsStaff]
+    parser_classes = [MultiPartParser, FormParser]
+    # Line results returned in the response, the summary always covers the whole file
+    max_results = 1000
+
+    def post(self, request):
+        statement = request.FILES.get('statement')
+        if not statement:
+            return Response({'error': 'Se requiere el archivo del extracto'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Moneda del extracto (código de Currency): solo se concilian transacciones enviadas en ella
+        currency = str(request.data.get('currency', '')).strip().upper()
+        if not currency or not Currency.objects.filter(code=currency).exists():
+            return Response({'error': 'Se requiere la moneda del extracto (currency)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        apply = str(request.data.get('apply', '')).lower() in ('1', 'true')
+        try:
+            window_days = int(request.data.get('window_days', RECONCILIATION_WINDOW_DAYS))
+        except ValueError:
+            return Response({'error': 'window_days debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+
+        summary = {'matched': 0, 'ambiguous': 0, 'unmatched': 0}
+        results = []
+        try:
+            for result in reconcile_statement(
+                iter_statement(statement, statement.name), currency, apply=apply, window_days=window_days
+            ):
+                summary[result.status] += 1
+                if len(results) < self.max_results:
+                    results.append(result_row(result))
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'applied': apply,
+            'currency': currency,
+            'summary': summary,
+            'results': results,
+            'truncated': sum(summary.values()) > len(results),
+        })
+
 # class StaffTransactionDetailView(GenericAPIView):
 #     """View for retrieving, updating and deleting individual transactions"""
 #     serializer_class = StaffTransactionSerializer
@@ -620,8 +787,14 @@ class StaffTransactionDetailView(GenericAPIView):
         return get_object_or_404(Transaction, pk=pk)
     
     def get(self, request, pk):
-        transaction = self.get_transaction(pk)
-        serializer = self.get_serializer(transaction)
+        # Falls back to the archive so closed transactions can still be reviewed
+        transaction = get_transaction_or_archived(pk)
+        if transaction is None:
+            raise Http404
+        if isinstance(transaction, ArchivedTransaction):
+            serializer = ArchivedStaffTransactionSerializer(transaction, context=self.get_serializer_context())
+        else:
+            serializer = self.get_serializer(transaction)
         return Response(serializer.data)
     def put(self, request, pk):
         transaction = self.get_transaction(pk)
@@ -793,8 +966,22 @@ class CreateTransactionView(GenericAPIView):
         try:
             user_id = data['user']
             user = User.objects.get(id=user_id)
-            
-            transaction = serializer.save()
+
+            # Reglas de velocidad: solo lee contadores en caché, no consulta Transaction
+            checker = get_velocity_checker()
+            validated = serializer.validated_data
+            destination_account = validated.get('destination_account')
+            source_currency = validated.get('source_currency')
+            dimensions = transaction_dimensions(user, destination_account.id if destination_account else None)
+            currency = source_currency.code if source_currency else None
+            triggered_rules = checker.evaluate(dimensions, validated['source_amount'], currency)
+
+            if triggered_rules:
+                logger.warning("Transacción observada para el usuario %s: %s", user.id, ', '.join(triggered_rules))
+                transaction = serializer.save(status='observed')
+            else:
+                transaction = serializer.save()
+            checker.record(dimensions, validated['source_amount'], currency)
             print(f"Transacción creada: ID={transaction.id}")
             
             response_serializer = TransactionResponseSerializer(
@@ -815,7 +1002,7 @@ class CreateTransactionView(GenericAPIView):
                         'date': transaction.created_at,
                         'amount': data['source_amount'],
                         'currency': data['source_currency'],
-                        'status': data['status'],
+                        'status': transaction.status,
                         'payment_method': data.get('payment_method', ''),
                         'description': f"Transferencia",
                         'source_currency': transaction.source_currency.code,
@@ -845,4 +1032,92 @@ class CreateTransactionView(GenericAPIView):
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+# Real-time feed
+class TransactionFeedTicketView(GenericAPIView):
+    """
+    Ticket to open the transaction feed. EventSource cannot send the
+    Authorization header, so instead of the access token in the URL the
+    client asks here for a short-lived ticket that only opens the feed.
+    Staff may pass `scope=all` to follow every transaction.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        group = feed_group_for(request.user, scope=request.data.get('scope'))
+        if group is None:
+            return Response({'error': 'Solo staff o ventas pueden suscribirse'}, status=status.HTTP_403_FORBIDDEN)
+        return Response({
+            'ticket': issue_feed_ticket(group),
+            'expires_in': settings.TRANSACTION_FEED['TICKET_TTL'],
+        }, status=status.HTTP_201_CREATED)
+
+
+async def _feed_events(layer, group, after, keepalive, max_duration):
+    """
+    Events after `after` for at most `max_duration` seconds. Under ASGI the
+    wait does not hold a thread; the stream then ends and EventSource
+    reconnects with Last-Event-ID.
+    """
+    yield 'retry: 1000\n\n'
+    deadline = time.monotonic() + max_duration
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        messages = await layer.aread(group, after, timeout=min(keepalive, remaining))
+        if not messages:
+            yield ': keepalive\n\n'
+            continue
+        for sequence, message in messages:
+            if message is None:
+                # Mensaje ya expirado: el cliente vuelve a cargar el listado
+                yield f'id: {sequence}\nevent: resync\ndata: {{}}\n\n'
+            else:
+                yield f"id: {sequence}\nevent: {message['event']}\ndata: {json.dumps(message)}\n\n"
+        after = messages[-1][0]
+
+
+def _last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return max(0, int(value)) if value else None
+    except ValueError:
+        return None
+
+
+async def transaction_feed(request):
+    """
+    Server-Sent Events stream for sellers: transactions assigned to them and
+    their status changes, as small deltas. Opened with `?ticket=` from
+    TransactionFeedTicketView, checked when the stream starts. Served by the
+    ASGI application (backend.asgi); each response lasts at most
+    TRANSACTION_FEED['MAX_DURATION'] seconds and the client resumes from
+    Last-Event-ID (with a new ticket once the previous one expired).
+    """
+    layer = get_channel_layer()
+    if not layer.available:
+        # Con una caché por proceso los eventos de otros workers nunca llegarían
+        return JsonResponse(
+            {'error': 'El feed requiere una caché compartida (CACHE_BACKEND)'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    group = feed_ticket_group(request.GET.get('ticket'))
+    if group is None:
+        return JsonResponse({'error': 'Ticket inválido o vencido'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    after = _last_event_id(request)
+    if after is None:
+        after = await sync_to_async(layer.last_sequence)(group)
+    response = StreamingHttpResponse(
+        _feed_events(
+            layer, group, after,
+            settings.TRANSACTION_FEED['KEEPALIVE'], settings.TRANSACTION_FEED['MAX_DURATION']
+        ),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import ROLE_CLAIM, ROLE_ID_CLAIM, VERSION_CLAIM
+
+# With a per-process cache a version bump reaches other workers after this timeout
+AUTH_VERSION_TIMEOUT = 60 * 5
+
+
+def auth_version_key(user_id):
+    return f"users:auth-version:{user_id}"
+
+
+def get_auth_version(user_id):
+    """Current auth_version of a user, from the cache or, on a miss, the database."""
+    key = auth_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            get_user_model().objects.filter(pk=user_id)
+            .values_list("auth_version", flat=True)
+            .first()
+        )
+        if version is None:
+            return None
+        cache.set(key, version, AUTH_VERSION_TIMEOUT)
+    return version
+
+
+def set_auth_version(user_id, version):
+    cache.set(auth_version_key(user_id), version, AUTH_VERSION_TIMEOUT)
+
+
+def forget_auth_versions(user_ids):
+    cache.delete_many([auth_version_key(user_id) for user_id in user_ids])
+
+
+# Authenticated users (with their role) cached per id and auth_version
+AUTH_USER_TIMEOUT = 60 * 15
+
+
+def auth_user_key(user_id, version):
+    return f"users:auth-user:{user_id}:v{version}"
+
+
+def load_auth_user(user_id):
+    """
+    Loads the User with its role for authentication. The entry is keyed by the
+    user's auth_version, so a version bump makes older entries unreachable, and
+    it is dropped on every User.save. Returns None when the user does not exist.
+    """
+    version = get_auth_version(user_id)
+    if version is not None:
+        user = cache.get(auth_user_key(user_id, version))
+        if user is not None:
+            return user
+
+    user = get_user_model().objects.select_related("role").filter(pk=user_id).first()
+    if user is not None:
+        cache.set(auth_user_key(user_id, user.auth_version), user, AUTH_USER_TIMEOUT)
+        set_auth_version(user_id, user.auth_version)
+    return user
+
+
+def forget_auth_user(user_id, version):
+    cache.delete(auth_user_key(user_id, version))
+
+
+class RoleTokenUser(TokenUser):
+    """Stateless user built from the token claims, with an unsaved Role holding the role name."""
+
+    @cached_property
+    def role(self):
+        from .models import Role
+
+        if not self.token.get(ROLE_CLAIM):
+            return None
+        return Role(id=self.token.get(ROLE_ID_CLAIM), name=self.token[ROLE_CLAIM])
+
+    @cached_property
+    def role_id(self):
+        return self.token.get(ROLE_ID_CLAIM)
+
+
+class RoleJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that answers read requests from the token claims.
+
+    When the request method is safe and the token's version claim matches the
+    user's current auth_version, a RoleTokenUser is returned and no query is
+    made. Writes, older tokens and stale versions get the User (with its role)
+    through the cached loader.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if request.method in SAFE_METHODS:
+            user = self.get_token_user(validated_token)
+            if user is not None:
+                return user, validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_token_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token or api_settings.USER_ID_CLAIM not in validated_token:
+            return None
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if get_auth_version(user_id) != validated_token[VERSION_CLAIM]:
+            return None
+        return RoleTokenUser(validated_token)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        user = load_auth_user(user_id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
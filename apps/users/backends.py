@@ -0,0 +1,11 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .authentication import load_auth_user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose session user lookup goes through the cached auth user loader."""
+
+    def get_user(self, user_id):
+        user = load_auth_user(user_id)
+        return user if self.user_can_authenticate(user) else None
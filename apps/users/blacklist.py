@@ -0,0 +1,188 @@
+import hashlib
+import math
+import secrets
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.common.caches import is_shared_cache
+
+TOKEN_PRUNE_BATCH_SIZE = 5000
+# Bumped on every blacklist, tells the other workers their filter is behind
+BLACKLIST_SEQUENCE_KEY = "users:token-blacklist:seq"
+# Seconds re-read on each catch up of the filter
+BLACKLIST_OVERLAP = 60
+
+
+def expired_token_ids(now=None, batch_size=TOKEN_PRUNE_BATCH_SIZE):
+    now = now or timezone.now()
+    return list(
+        OutstandingToken.objects.filter(expires_at__lt=now)
+        .order_by("expires_at")
+        .values_list("id", flat=True)[:batch_size]
+    )
+
+
+def prune_batch(token_ids):
+    """Deletes a batch of outstanding tokens and their blacklist rows. Returns (outstanding, blacklisted)."""
+    with transaction.atomic():
+        blacklisted, _ = BlacklistedToken.objects.filter(token_id__in=token_ids).delete()
+        outstanding, _ = OutstandingToken.objects.filter(id__in=token_ids).delete()
+    return outstanding, blacklisted
+
+
+def prune_expired_tokens(batch_size=TOKEN_PRUNE_BATCH_SIZE, now=None):
+    """
+    Deletes expired outstanding tokens (and their blacklist entries) in batches
+    of `batch_size`, yielding the counts of each batch. An expired token is
+    rejected by its `exp` claim anyway, so its rows are no longer needed.
+    """
+    now = now or timezone.now()
+    while True:
+        token_ids = expired_token_ids(now, batch_size)
+        if not token_ids:
+            return
+        yield prune_batch(token_ids)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings. False positives are possible, false negatives are not."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistFilter:
+    """
+    Process-local Bloom filter of the JTIs blacklisted and not yet expired.
+
+    A refresh token whose JTI is not in the filter cannot be blacklisted, so
+    the blacklist query is skipped, but only while the filter is current: every
+    blacklist bumps a sequence in the shared cache once committed, and a check
+    that reads a sequence other than the one the filter was last synced to
+    first catches up with the recent rows (one query, as the plain check). The
+    filter is rebuilt from scratch every `rebuild_interval` seconds or when it
+    outgrows its capacity, which also drops expired JTIs.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01, rebuild_interval=3600, **options):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._loaded_at = None
+        self._sequence = None
+        self._built_at = 0
+
+    def _load(self, since=None):
+        now = timezone.now()
+        queryset = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+        if since is not None:
+            # Rows committed late by slower transactions are caught by the overlap,
+            # adding a JTI twice is harmless
+            queryset = queryset.filter(blacklisted_at__gte=since - timedelta(seconds=BLACKLIST_OVERLAP))
+        self._loaded_at = now
+        return queryset.values_list("token__jti", flat=True).iterator(chunk_size=5000)
+
+    def _rebuild(self, now):
+        jtis = list(self._load())
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._built_at = now
+
+    def _catch_up(self):
+        for jti in self._load(self._loaded_at):
+            self._bloom.add(jti)
+
+    @staticmethod
+    def current_sequence():
+        """
+        Shared sequence, created when missing. It starts at a random value, so
+        a cache that lost the key never comes back to a sequence a worker has
+        already synced to.
+        """
+        sequence = cache.get(BLACKLIST_SEQUENCE_KEY)
+        if sequence is None:
+            cache.add(BLACKLIST_SEQUENCE_KEY, secrets.randbits(48), timeout=None)
+            sequence = cache.get(BLACKLIST_SEQUENCE_KEY)
+        return sequence
+
+    def sync(self):
+        """Brings the filter up to the shared sequence. Returns False when that sequence is unknown."""
+        # Read before loading rows: a blacklist published later bumps it again
+        sequence = self.current_sequence()
+        if sequence is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._bloom is None
+                or now - self._built_at > self.rebuild_interval
+                or self._bloom.count > self._bloom.capacity
+            ):
+                self._rebuild(now)
+            elif sequence != self._sequence:
+                self._catch_up()
+            self._sequence = sequence
+        return True
+
+    def might_be_blacklisted(self, jti):
+        if not self.sync():
+            return True
+        return jti in self._bloom
+
+    def add(self, jti):
+        """Adds a JTI blacklisted by this process, before its row is committed."""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def publish(self):
+        """Tells the other workers, once the blacklist row is committed, to catch up."""
+        self.current_sequence()
+        try:
+            cache.incr(BLACKLIST_SEQUENCE_KEY)
+        except ValueError:
+            # Evicted between both calls: any new value differs from the synced one
+            cache.set(BLACKLIST_SEQUENCE_KEY, secrets.randbits(48), timeout=None)
+
+
+@lru_cache(maxsize=None)
+def get_blacklist_filter():
+    """
+    The process BlacklistFilter, or None when TOKEN_BLACKLIST_FILTER is disabled
+    or the default cache is per process: the other workers' blacklists would
+    not reach the filter, so every refresh runs the blacklist query.
+    """
+    options = dict(getattr(settings, "TOKEN_BLACKLIST_FILTER", {}))
+    if not options.pop("ENABLED", False) or not is_shared_cache():
+        return None
+    return BlacklistFilter(**{key.lower(): value for key, value in options.items()})
@@ -0,0 +1,185 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    UNUSABLE_PASSWORD_PREFIX,
+    get_hashers_by_algorithm,
+    identify_hasher,
+    make_password,
+)
+from django.core.exceptions import ObjectDoesNotExist
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.views import APIView, exception_handler
+
+DEFAULT_PROFILE = "default"
+STAFF_PROFILE = "staff"
+
+
+# True while a DRF view runs (HashingFailFastMiddleware): a busy pool answers 503 instead of queueing
+fail_fast = contextvars.ContextVar("hashing_fail_fast", default=False)
+
+
+class HashingBusy(Exception):
+    """No hashing slot freed up within queue_timeout; only raised with fail_fast set."""
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "El servicio está ocupado, inténtalo en unos segundos."
+    default_code = "hashing_busy"
+
+
+def api_exception_handler(exc, context):
+    """DRF EXCEPTION_HANDLER: HashingBusy becomes a 503, everything else is handled as usual."""
+    if isinstance(exc, HashingBusy):
+        exc = HashingUnavailable()
+    return exception_handler(exc, context)
+
+
+class HashingFailFastMiddleware:
+    """
+    Sets fail_fast for the DRF views, so logins beyond the pool queue get a
+    503 at once. Admin and allauth pages, and management commands, wait for
+    a free slot instead of failing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = fail_fast.set(False)
+        try:
+            return self.get_response(request)
+        finally:
+            fail_fast.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None)
+        fail_fast.set(isinstance(view_class, type) and issubclass(view_class, APIView))
+
+
+@lru_cache(maxsize=None)
+def get_profile_hasher(profile):
+    """
+    Hasher instance of a PASSWORD_HASHING profile: the class registered in
+    PASSWORD_HASHERS for its HASHER algorithm, with the remaining keys of the
+    profile (time_cost, memory_cost, iterations...) set on the instance.
+    """
+    options = dict(settings.PASSWORD_HASHING["PROFILES"][profile])
+    hasher = get_hashers_by_algorithm()[options.pop("HASHER")].__class__()
+    for key, value in options.items():
+        setattr(hasher, key.lower(), value)
+    return hasher
+
+
+def password_profile(user):
+    """Staff accounts get the stronger profile, everyone else the default one."""
+    if user.is_staff or user.is_superuser:
+        return STAFF_PROFILE
+    if user.role_id is not None:
+        from .models import Role
+        from .registration import get_role_id
+
+        try:
+            if user.role_id == get_role_id(Role.STAFF):
+                return STAFF_PROFILE
+        except ObjectDoesNotExist:
+            pass
+    return DEFAULT_PROFILE
+
+
+def hash_password(password, profile=DEFAULT_PROFILE):
+    return make_password(password, hasher=get_profile_hasher(profile))
+
+
+def verify_password(password, encoded, profile=DEFAULT_PROFILE):
+    """
+    Returns (is_correct, must_update). must_update is True when the hash was
+    made with another algorithm or other parameters than the profile's.
+    """
+    if password is None or encoded is None or encoded.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return False, False
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, False
+
+    preferred = get_profile_hasher(profile)
+    is_correct = hasher.verify(password, encoded)
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    if not is_correct and not hasher_changed and must_update:
+        # Same time whether or not the hash is outdated
+        hasher.harden_runtime(password, encoded)
+    return is_correct, must_update
+
+
+class HashingPool:
+    """
+    Runs password hashing on at most `max_workers` threads per process, with
+    up to `queue_size` more callers waiting. Argon2 and PBKDF2 release the GIL
+    while hashing, so the request threads that are not logging in keep being
+    served. With fail_fast set, callers that wait longer than `queue_timeout`
+    get HashingBusy; the rest wait for a slot.
+    """
+
+    def __init__(self, max_workers=2, queue_size=16, queue_timeout=2, **options):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="password-hashing")
+        self.slots = threading.BoundedSemaphore(max_workers + queue_size)
+        self.queue_timeout = queue_timeout
+        self._local = threading.local()
+
+    def _call(self, fn, args):
+        self._local.inside = True
+        try:
+            return fn(*args)
+        finally:
+            self._local.inside = False
+
+    def run(self, fn, *args):
+        # Already on a pool thread, waiting on the pool could deadlock
+        if getattr(self._local, "inside", False):
+            return fn(*args)
+        if not fail_fast.get():
+            self.slots.acquire()
+        elif not self.slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusy()
+        try:
+            return self.executor.submit(self._call, fn, args).result()
+        finally:
+            self.slots.release()
+
+
+@lru_cache(maxsize=None)
+def get_hashing_pool():
+    options = dict(settings.PASSWORD_HASHING)
+    options.pop("PROFILES")
+    return HashingPool(**{key.lower(): value for key, value in options.items()})
+
+
+def set_user_password(user, raw_password):
+    if raw_password is None:
+        user.password = make_password(None)
+    else:
+        user.password = get_hashing_pool().run(hash_password, raw_password, password_profile(user))
+
+
+def check_user_password(user, raw_password):
+    """
+    Checks the password on the hashing pool. A correct password stored with an
+    outdated algorithm or parameters is rehashed with the user's profile and
+    saved; the rehash does not count as a password change for auth_version.
+    """
+    profile = password_profile(user)
+    is_correct, must_update = get_hashing_pool().run(verify_password, raw_password, user.password, profile)
+    if is_correct and must_update and user.pk:
+        user.password = get_hashing_pool().run(hash_password, raw_password, profile)
+        loaded = getattr(user, "_loaded_auth_values", None)
+        if loaded is not None and "password" in loaded:
+            loaded["password"] = user.password
+        user.save(update_fields=["password"])
+    return is_correct
@@ -0,0 +1,260 @@
+import csv
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from apps.common.csvfiles import csv_lines
+
+from .hashers import DEFAULT_PROFILE, hash_password, password_profile
+from .models import Role, User
+from .registration import conflict_error, get_role_id
+
+IMPORT_BATCH_SIZE = 1000
+# Columns copied as-is from the CSV to the User row
+IMPORT_FIELDS = (
+    "first_name", "last_name", "type_identity_document", "document_number", "country_code",
+    "phone_number", "country", "city", "province", "occupation",
+)
+TRUE_VALUES = ("1", "true", "si", "sí", "yes")
+
+ImportResult = namedtuple("ImportResult", "line email status user_id errors")
+CREATED = "created"
+FAILED = "error"
+
+
+def iter_user_rows(stream):
+    """Yields (line_number, row) from a CSV of users, reading it one line at a time."""
+    lines, delimiter = csv_lines(stream)
+    reader = csv.DictReader(lines, delimiter=delimiter)
+    if not reader.fieldnames or "email" not in [name.strip().lower() for name in reader.fieldnames]:
+        raise ValueError("El archivo debe tener una columna email")
+    for line_number, row in enumerate(reader, start=2):
+        yield line_number, {
+            (key or "").strip().lower(): (value or "").strip() for key, value in row.items() if key
+        }
+
+
+def _init_worker():
+    # Needed with the spawn start method; with fork the settings are inherited
+    django.setup()
+
+
+def is_password_hash(value):
+    try:
+        identify_hasher(value)
+    except ValueError:
+        return False
+    return True
+
+
+def hash_passwords(passwords, executor=None, profiles=None, allow_hashed=False):
+    """
+    Hashes the plaintext passwords with their hashing profile (see
+    apps.users.hashers), in the process pool when given. Empty
+    passwords become unusable ones. Values already in a Django hash format
+    (migrations from other systems) are kept only with allow_hashed.
+    """
+    hashed = [None] * len(passwords)
+    pending = []
+    for index, password in enumerate(passwords):
+        if not password:
+            hashed[index] = make_password(None)
+        elif allow_hashed and is_password_hash(password):
+            hashed[index] = password
+        else:
+            pending.append(index)
+
+    plain = [passwords[index] for index in pending]
+    plain_profiles = [profiles[index] if profiles else DEFAULT_PROFILE for index in pending]
+    if executor is not None and len(plain) > 1:
+        chunksize = max(1, len(plain) // (os.cpu_count() or 1) // 4)
+        results = executor.map(hash_password, plain, plain_profiles, chunksize=chunksize)
+    else:
+        results = map(hash_password, plain, plain_profiles)
+    for index, value in zip(pending, results):
+        hashed[index] = value
+    return hashed
+
+
+class UserImporter:
+    """
+    Creates users from CSV rows in batches. Each batch is validated in memory,
+    checked against existing emails/documents with two queries, hashed in the
+    process pool (in process with workers 0 or 1) and written with one
+    bulk_create. Role ids are resolved once per role name. Yields one
+    ImportResult per row.
+
+    Passwords that already look like a Django hash are rejected unless
+    allow_hashed is set (import_users --allow-hashed), otherwise a CSV could
+    set any hash, or none at all, on the accounts it creates.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, workers=None, default_role=Role.CLIENT, allow_hashed=False):
+        self.batch_size = batch_size
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.default_role = default_role
+        self.allow_hashed = allow_hashed
+        self.role_ids = {}
+        self.seen_emails = set()
+        self.seen_documents = set()
+
+    def role_id(self, name):
+        """Unknown roles are remembered too, so a bad column costs one query per file."""
+        if name not in self.role_ids:
+            try:
+                self.role_ids[name] = get_role_id(name)
+            except Role.DoesNotExist:
+                self.role_ids[name] = None
+        if self.role_ids[name] is None:
+            raise Role.DoesNotExist(f"Role {name} does not exist")
+        return self.role_ids[name]
+
+    def build(self, line, row):
+        """Returns (user, password, None) or (None, None, errors) for a CSV row."""
+        errors = {}
+        email = User.objects.normalize_email(row.get("email", ""))
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors["email"] = "Email inválido"
+        if email.lower() in self.seen_emails:
+            errors["email"] = "Email repetido en el archivo"
+
+        password = row.get("password", "")
+        if password and not self.allow_hashed and is_password_hash(password):
+            errors["password"] = "No se aceptan contraseñas ya cifradas"
+
+        document_number = row.get("document_number") or None
+        if document_number and document_number in self.seen_documents:
+            errors["document_number"] = "Documento repetido en el archivo"
+
+        role_name = row.get("role") or self.default_role
+        try:
+            role_id = self.role_id(role_name)
+        except Role.DoesNotExist:
+            errors["role"] = f"Rol desconocido: {role_name}"
+            role_id = None
+
+        if errors:
+            return None, None, errors
+
+        self.seen_emails.add(email.lower())
+        if document_number:
+            self.seen_documents.add(document_number)
+        fields = {field: row[field] for field in IMPORT_FIELDS if row.get(field)}
+        fields["document_number"] = document_number
+        user = User(
+            username=email,
+            email=email,
+            role_id=role_id,
+            is_verified=row.get("is_verified", "true").lower() in TRUE_VALUES,
+            **fields,
+        )
+        return user, password, None
+
+    def existing_conflicts(self, users):
+        emails = set(User.objects.filter(email__in=[user.email for user in users]).values_list("email", flat=True))
+        documents = [user.document_number for user in users if user.document_number]
+        taken_documents = set(
+            User.objects.filter(document_number__in=documents).values_list("document_number", flat=True)
+        ) if documents else set()
+        return emails, taken_documents
+
+    def write(self, users):
+        """bulk_create; on a conflict (concurrent signups) the batch falls back to row by row inserts."""
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            return {id(user): None for user in users}
+        except IntegrityError:
+            errors = {}
+            for user in users:
+                try:
+                    with transaction.atomic():
+                        user.save(force_insert=True)
+                    errors[id(user)] = None
+                except IntegrityError as error:
+                    user.pk = None
+                    errors[id(user)] = {
+                        field: str(messages[0]) for field, messages in conflict_error(error).detail.items()
+                    }
+            return errors
+
+    def process_batch(self, batch, executor):
+        results = {}
+        valid = []
+        for line, row in batch:
+            user, password, errors = self.build(line, row)
+            if errors:
+                results[line] = ImportResult(line, row.get("email", ""), FAILED, None, errors)
+            else:
+                valid.append((line, user, password))
+
+        if valid:
+            emails, documents = self.existing_conflicts([user for _, user, _ in valid])
+            accepted = []
+            for line, user, password in valid:
+                errors = {}
+                if user.email in emails:
+                    errors["email"] = "El email ya está registrado"
+                if user.document_number and user.document_number in documents:
+                    errors["document_number"] = "El número de documento ya está registrado"
+                if errors:
+                    results[line] = ImportResult(line, user.email, FAILED, None, errors)
+                else:
+                    accepted.append((line, user, password))
+
+            hashed = hash_passwords(
+                [password for _, _, password in accepted],
+                executor,
+                [password_profile(user) for _, user, _ in accepted],
+                self.allow_hashed,
+            )
+            for (_, user, _), password in zip(accepted, hashed):
+                user.password = password
+
+            write_errors = self.write([user for _, user, _ in accepted])
+            for line, user, _ in accepted:
+                errors = write_errors.get(id(user))
+                if errors:
+                    results[line] = ImportResult(line, user.email, FAILED, None, errors)
+                else:
+                    results[line] = ImportResult(line, user.email, CREATED, user.pk, None)
+
+        for line, _ in batch:
+            yield results[line]
+
+    def run(self, rows):
+        executor = ProcessPoolExecutor(self.workers, initializer=_init_worker) if self.workers > 1 else None
+        try:
+            batch = []
+            for line, row in rows:
+                batch.append((line, row))
+                if len(batch) >= self.batch_size:
+                    yield from self.process_batch(batch, executor)
+                    batch = []
+            if batch:
+                yield from self.process_batch(batch, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+
+def import_users(stream, **options):
+    return UserImporter(**options).run(iter_user_rows(stream))
+
+
+def result_row(result):
+    return {
+        "line": result.line,
+        "email": result.email,
+        "status": result.status,
+        "user_id": result.user_id,
+        "errors": result.errors,
+    }
@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users.authentication import forget_auth_user, forget_auth_versions
+from apps.users.models import Role, User
+from apps.users.tokens import RoleRefreshToken
+
+# Endpoints principales autenticados (GET), {user_id} se reemplaza por el usuario medido
+ENDPOINTS = (
+    '/api/v1/auth/profile/{user_id}/',
+    '/api/v1/transactions/bank-accounts/',
+    '/api/v1/transactions/{user_id}/',
+    '/api/v1/transactions/transactions/',
+    '/api/v1/coin/currencies/',
+    '/api/v1/coin/exchange-rates/',
+    '/api/v1/complaints/',
+    '/api/v1/company/popup-images/',
+    '/api/v1/blogs/',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Cuenta las consultas SQL por request en los endpoints principales, con la caché del "
+        "usuario autenticado fría y caliente, para tokens sin claims de rol y con claims de rol."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help="Usuario a medir (por defecto, el primer staff activo)")
+        parser.add_argument('--path', action='append', dest='paths', help="Endpoint adicional a medir")
+
+    def handle(self, *args, **options):
+        # Nada de lo que hagan los endpoints (ni el usuario temporal) queda guardado
+        with transaction.atomic():
+            user = self._get_user(options['email'])
+            self._report(user, options['paths'])
+            transaction.set_rollback(True)
+
+    def _report(self, user, extra_paths):
+        paths = [path.format(user_id=user.id) for path in ENDPOINTS + tuple(extra_paths or ())]
+        tokens = {
+            'sin claims': str(AccessToken.for_user(user)),
+            'con claims': str(RoleRefreshToken.for_user(user).access_token),
+        }
+
+        self.stdout.write(f"Usuario: {user.email} (id {user.id})")
+        self.stdout.write(f"{'endpoint':45} {'token':11} {'status':>6} {'fría':>5} {'caliente':>8} {'ahorro':>6}")
+        total_cold = total_warm = 0
+        for path in paths:
+            for label, token in tokens.items():
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+                forget_auth_versions([user.id])
+                forget_auth_user(user.id, user.auth_version)
+                status, cold = self._count(client, path)
+                _, warm = self._count(client, path)
+                total_cold += cold
+                total_warm += warm
+                self.stdout.write(f"{path:45} {label:11} {status:>6} {cold:>5} {warm:>8} {cold - warm:>6}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Consultas totales: {total_cold} con caché fría, {total_warm} con caché caliente"
+        ))
+
+    def _count(self, client, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        return response.status_code, len(queries.captured_queries)
+
+    def _get_user(self, email):
+        users = User.objects.filter(is_active=True)
+        if email:
+            user = users.filter(email=email).first()
+            if user is None:
+                raise CommandError(f"No se encontró un usuario activo con el email {email}")
+            return user
+        user = users.filter(role__name=Role.STAFF).first()
+        if user is None:
+            # Sin staff se mide con un usuario temporal, descartado con el rollback
+            role, _ = Role.objects.get_or_create(name=Role.STAFF)
+            user = User.objects.create(
+                email='auth-query-report@example.com', first_name='Auth', last_name='Report', role=role,
+            )
+            self.stdout.write("No hay usuarios staff: se usa un usuario temporal")
+        return user
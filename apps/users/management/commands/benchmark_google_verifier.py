@@ -0,0 +1,62 @@
+import datetime
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.core.management.base import BaseCommand
+from google.auth import crypt, jwt
+
+from apps.users.oauth.verifier import GoogleIdTokenVerifier, StaticCertificateStore
+
+AUDIENCE = "benchmark-client-id.apps.googleusercontent.com"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la verificación local de ID tokens de Google con un juego de claves de prueba, "
+        "sin acceso a la red."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=500)
+
+    def handle(self, *args, **options):
+        private_key, certificate = self._stub_key()
+        signer = crypt.RSASigner.from_string(private_key, key_id='stub')
+        verifier = GoogleIdTokenVerifier(StaticCertificateStore({'stub': certificate}))
+
+        now = int(time.time())
+        tokens = [
+            jwt.encode(signer, {
+                'iss': 'https://accounts.google.com', 'aud': AUDIENCE, 'sub': str(index),
+                'email': f'usuario{index}@gmail.com', 'iat': now, 'exp': now + 3600,
+            })
+            for index in range(options['tokens'])
+        ]
+
+        start = time.perf_counter()
+        for token in tokens:
+            verifier.verify(token, AUDIENCE)
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"Tokens verificados: {len(tokens)}")
+        self.stdout.write(self.style.SUCCESS(f"Promedio: {elapsed / len(tokens) * 1000:.3f} ms por token"))
+
+    def _stub_key(self):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'stub')])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        return private_pem, certificate.public_bytes(serialization.Encoding.PEM)
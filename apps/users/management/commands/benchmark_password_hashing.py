@@ -0,0 +1,53 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+
+from apps.users.hashers import get_hashing_pool, hash_password, verify_password
+
+PASSWORD = 'clave-de-prueba-123'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide los logins por segundo y por núcleo de cada perfil de hashing de PASSWORD_HASHING, "
+        "comparados con el PBKDF2 por defecto de Django, y el rendimiento a través del pool de hashing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20)
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        self.stdout.write(f"Núcleos: {os.cpu_count()}")
+
+        legacy = get_hasher('pbkdf2_sha256').encode(PASSWORD, get_hasher('pbkdf2_sha256').salt())
+        rate = self._measure(lambda: get_hasher('pbkdf2_sha256').verify(PASSWORD, legacy), logins)
+        self.stdout.write(f"pbkdf2_sha256 (Django): {rate:.1f} logins/s por núcleo")
+
+        for profile in settings.PASSWORD_HASHING['PROFILES']:
+            encoded = hash_password(PASSWORD, profile)
+            rate = self._measure(lambda: verify_password(PASSWORD, encoded, profile), logins)
+            self.stdout.write(f"Perfil {profile}: {rate:.1f} logins/s por núcleo")
+
+        # Varios hilos de petición compitiendo por el pool, como en un worker con hilos
+        encoded = hash_password(PASSWORD)
+        pool = get_hashing_pool()
+        threads = settings.PASSWORD_HASHING['MAX_WORKERS'] + settings.PASSWORD_HASHING['QUEUE_SIZE']
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as requests:
+            list(requests.map(lambda _: pool.run(verify_password, PASSWORD, encoded), range(logins * 2)))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Pool ({settings.PASSWORD_HASHING['MAX_WORKERS']} hilos): {logins * 2 / elapsed:.1f} logins/s por proceso"
+        ))
+
+    def _measure(self, verify, logins):
+        verify()
+        start = time.perf_counter()
+        for _ in range(logins):
+            verify()
+        return logins / (time.perf_counter() - start)
@@ -0,0 +1,75 @@
+import csv
+import json
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.users.imports import IMPORT_BATCH_SIZE, import_users, result_row
+from apps.users.models import Role
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa usuarios desde un CSV (email, password, role, document_number, ...). "
+        "Las contraseñas se cifran en un pool de procesos y las filas se insertan por lotes. "
+        "Las filas con errores se omiten y se informan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=None, help="Procesos para cifrar contraseñas (por defecto, uno por núcleo)")
+        parser.add_argument('--role', default=Role.CLIENT, help="Rol de las filas sin columna role")
+        parser.add_argument('--report', help="Ruta del CSV con el resultado de cada fila")
+        parser.add_argument(
+            '--allow-hashed', action='store_true',
+            help="Acepta contraseñas ya cifradas en formato de Django (migraciones desde otro sistema)",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Valida e inserta dentro de una transacción que se revierte")
+
+    def handle(self, *args, **options):
+        summary = {'created': 0, 'error': 0}
+        started = time.monotonic()
+        report = open(options['report'], 'w', newline='') if options['report'] else None
+        writer = None
+        if report:
+            writer = csv.DictWriter(report, fieldnames=['line', 'email', 'status', 'user_id', 'errors'])
+            writer.writeheader()
+
+        # Sin --dry-run cada lote se confirma por separado
+        atomic = transaction.atomic() if options['dry_run'] else nullcontext()
+        try:
+            with open(options['path'], 'rb') as stream, atomic:
+                results = import_users(
+                    stream,
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    default_role=options['role'],
+                    allow_hashed=options['allow_hashed'],
+                )
+                for result in results:
+                    summary[result.status] += 1
+                    if writer:
+                        row = result_row(result)
+                        row['errors'] = json.dumps(row['errors'], ensure_ascii=False) if row['errors'] else ''
+                        writer.writerow(row)
+                    elif result.errors:
+                        self.stderr.write(f"Línea {result.line} ({result.email}): {result.errors}")
+                    if sum(summary.values()) % options['batch_size'] == 0:
+                        self.stdout.write(f"Procesadas {sum(summary.values())} filas")
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        finally:
+            if report:
+                report.close()
+
+        elapsed = time.monotonic() - started
+        rate = sum(summary.values()) / elapsed * 60 if elapsed else 0
+        self.stdout.write(f"Filas: {sum(summary.values())} ({rate:.0f} por minuto)")
+        self.stdout.write(f"Con errores: {summary['error']}")
+        message = f"{'Se crearían' if options['dry_run'] else 'Creados'}: {summary['created']}"
+        self.stdout.write(self.style.SUCCESS(message))
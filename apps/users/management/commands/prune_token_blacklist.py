@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.users.blacklist import TOKEN_PRUNE_BATCH_SIZE, prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina en lotes acotados los tokens vencidos de token_blacklist (outstanding y blacklisted). "
+        "Pensado para correr periódicamente (cron) sin bloquear las tablas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=TOKEN_PRUNE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--sleep', type=float, default=0, help="Segundos de pausa entre lotes")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size debe ser mayor a 0")
+
+        now = timezone.now()
+        if options['dry_run']:
+            expired = OutstandingToken.objects.filter(expires_at__lt=now)
+            blacklisted = BlacklistedToken.objects.filter(token__expires_at__lt=now)
+            self.stdout.write(f"Tokens vencidos: {expired.count()} (en blacklist: {blacklisted.count()})")
+            return
+
+        total_outstanding = total_blacklisted = 0
+        for batches, (outstanding, blacklisted) in enumerate(prune_expired_tokens(batch_size, now), start=1):
+            total_outstanding += outstanding
+            total_blacklisted += blacklisted
+            self.stdout.write(f"Lote {batches}: {outstanding} tokens eliminados ({blacklisted} en blacklist)")
+            if options['max_batches'] and batches >= options['max_batches']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Total eliminados: {total_outstanding} tokens ({total_blacklisted} en blacklist)"
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.users.models import OneTimePassword
+from apps.users.otp import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina en lotes los tokens de verificación y restablecimiento vencidos guardados en la base "
+        "de datos. Los que viven en caché expiran solos por su TTL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size debe ser mayor a 0")
+
+        now = timezone.now()
+        if options['dry_run']:
+            expired = OneTimePassword.objects.filter(Q(expires_at__lt=now) | Q(expires_at__isnull=True))
+            self.stdout.write(f"Tokens vencidos: {expired.count()}")
+            return
+
+        total = 0
+        for batches, deleted in enumerate(purge_expired_tokens(options['batch_size'], now), start=1):
+            total += deleted
+            self.stdout.write(f"Lote {batches}: {deleted} tokens eliminados")
+        self.stdout.write(self.style.SUCCESS(f"Total eliminados: {total}"))
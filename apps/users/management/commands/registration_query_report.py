@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.users.registration import forget_role_ids
+from apps.users.serializers import RegisterSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Cuenta las consultas SQL por registro de cliente (validación + alta), con el id del rol "
+        "en caché y sin él. Los usuarios creados se descartan al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registrations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        total = options['registrations']
+        counts = []
+        with transaction.atomic():
+            # El primer registro lee el rol de la base de datos
+            forget_role_ids('client')
+            for index in range(total):
+                data = {
+                    'email': f'registro{index}@example.com',
+                    'password': 'clave-segura-123',
+                    'country_code': '+51',
+                    'phone_number': f'+519{index:08d}',
+                    'document_number': f'9{index:08d}',
+                    'first_name': 'Registro',
+                    'last_name': str(index),
+                }
+                with CaptureQueriesContext(connection) as queries:
+                    serializer = RegisterSerializer(data=data)
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+                # Los savepoints solo existen porque el reporte corre dentro de una transacción
+                counts.append(sum(
+                    1 for query in queries.captured_queries
+                    if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+                ))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Registros: {total}")
+        self.stdout.write(f"Primer registro (rol sin caché): {counts[0]} consultas")
+        if total > 1:
+            warm = counts[1:]
+            self.stdout.write(self.style.SUCCESS(
+                f"Resto: {sum(warm) / len(warm):.2f} consultas por registro"
+            ))
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# (table, column, index name). The expression matches what Django emits for
+# `icontains` on PostgreSQL: UPPER(column::text) LIKE UPPER('%term%').
+TRIGRAM_INDEXES = [
+    ('users_user', 'email', 'user_email_trgm'),
+    ('users_user', 'first_name', 'user_first_name_trgm'),
+    ('users_user', 'last_name', 'user_last_name_trgm'),
+    ('users_user', 'document_number', 'user_document_number_trgm'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column, name in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _table, _column, name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0012_alter_user_phone_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
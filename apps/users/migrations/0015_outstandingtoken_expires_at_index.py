@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# Used by prune_token_blacklist to find expired tokens without scanning the table
+INDEX_NAME = 'token_blacklist_outstandingtoken_expires_at_idx'
+
+
+def create_expires_at_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} '
+        f'ON token_blacklist_outstandingtoken (expires_at)'
+    )
+
+
+def drop_expires_at_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('users', '0014_user_auth_version'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_expires_at_index, drop_expires_at_index),
+    ]
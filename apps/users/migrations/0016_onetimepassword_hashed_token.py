@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_outstandingtoken_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='onetimepassword',
+            name='otp',
+        ),
+        migrations.AddField(
+            model_name='onetimepassword',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='onetimepassword',
+            name='purpose',
+            field=models.CharField(default='password_reset', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='onetimepassword',
+            name='token_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
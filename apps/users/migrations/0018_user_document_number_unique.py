@@ -0,0 +1,56 @@
+# Generated by Django 4.2.16 on 2026-10-19 15:31
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Cuántos documentos duplicados se listan en el error
+MAX_LISTED = 50
+
+
+def check_duplicate_document_numbers(apps, schema_editor):
+    """
+    Aborta antes de crear el índice único si hay documentos repetidos, con la
+    lista de usuarios afectados para corregirlos a mano.
+    """
+    User = apps.get_model('users', 'User')
+    duplicates = list(
+        User.objects.exclude(document_number__isnull=True).exclude(document_number='')
+        .values('document_number')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .order_by('document_number')
+        .values_list('document_number', flat=True)[:MAX_LISTED + 1]
+    )
+    if not duplicates:
+        return
+
+    users = {}
+    for document_number, user_id, email in (
+        User.objects.filter(document_number__in=duplicates[:MAX_LISTED])
+        .order_by('document_number', 'id')
+        .values_list('document_number', 'id', 'email')
+    ):
+        users.setdefault(document_number, []).append(f'{user_id} <{email}>')
+
+    lines = [f'  {document_number}: {", ".join(accounts)}' for document_number, accounts in users.items()]
+    if len(duplicates) > MAX_LISTED:
+        lines.append(f'  ... y más (se muestran los primeros {MAX_LISTED})')
+    raise RuntimeError(
+        'No se puede crear user_document_number_unique: hay números de documento repetidos.\n'
+        'Corrija o vacíe el documento de los usuarios duplicados y vuelva a migrar:\n' + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_user_admin_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_document_numbers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(condition=models.Q(('document_number__isnull', False), models.Q(('document_number', ''), _negated=True)), fields=('document_number',), name='user_document_number_unique'),
+        ),
+    ]
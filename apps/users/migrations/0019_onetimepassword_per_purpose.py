@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-19 16:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_user_document_number_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='onetimepassword',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='onetimepassword',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='onetimepassword',
+            constraint=models.UniqueConstraint(fields=('user', 'purpose'), name='otp_user_purpose_unique'),
+        ),
+    ]
@@ -1,10 +1,9 @@
 from datetime import timedelta
 from django.utils.timezone import now
-import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import RoleRefreshToken
 from django.core.validators import RegexValidator
 
 AUTH_PROVIDERS = {"email": "email", "google": "google"}
@@ -203,6 +202,12 @@ class User(AbstractUser):
         related_name="users",
         verbose_name=_("role"),
     )
+    # Se incrementa cuando cambian rol, estado o contraseña; los tokens emitidos
+    # con otra versión vuelven a consultar el usuario en la base de datos
+    auth_version = models.PositiveIntegerField(default=1, editable=False)
+
+    # Campos que invalidan los datos de autenticación guardados en los tokens
+    AUTH_VERSION_FIELDS = ("role_id", "is_active", "is_staff", "is_superuser", "password")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "country_code", "phone_number", "password"]
@@ -210,11 +215,47 @@ class User(AbstractUser):
     class Meta:
         verbose_name = _("User")
         verbose_name_plural = _("Users")
+        indexes = [
+            # varchar_pattern_ops sirve igualdad y búsquedas por prefijo (LIKE 'x%') en PostgreSQL
+            models.Index(
+                fields=["document_number"],
+                name="user_document_number_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+            # Listados de administración por rol, del más reciente al más antiguo
+            models.Index(fields=["role", "-date_joined"], name="user_role_date_joined_idx"),
+        ]
+        constraints = [
+            # El registro detecta documentos duplicados con este índice, sin consultar antes
+            models.UniqueConstraint(
+                fields=["document_number"],
+                condition=models.Q(document_number__isnull=False) & ~models.Q(document_number=""),
+                name="user_document_number_unique",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance._loaded_auth_values = {
+            field: loaded[field] for field in cls.AUTH_VERSION_FIELDS if field in loaded
+        }
+        return instance
 
     def save(self, *args, **kwargs):
         if not self.username:
             self.username = self.email
+
+        loaded = getattr(self, "_loaded_auth_values", None)
+        if self.pk and loaded and any(getattr(self, field) != value for field, value in loaded.items()):
+            self.auth_version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "auth_version"}
+
         super().save(*args, **kwargs)
+        self._loaded_auth_values = {field: getattr(self, field) for field in self.AUTH_VERSION_FIELDS}
 
     @property
     def get_full_name(self):
@@ -230,8 +271,20 @@ class User(AbstractUser):
         """Check if user is a staff member"""
         return self.role and self.role.name == Role.STAFF
 
+    def set_password(self, raw_password):
+        # Perfil de hashing según el tipo de usuario, calculado en el pool de hashing
+        from .hashers import set_user_password
+
+        set_user_password(self, raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        from .hashers import check_user_password
+
+        return check_user_password(self, raw_password)
+
     def tokens(self):
-        refresh = RefreshToken.for_user(self)
+        refresh = RoleRefreshToken.for_user(self)
         return {"refresh": str(refresh), "access": str(refresh.access_token)}
 
     def set_role(self, role_name):
@@ -244,11 +297,27 @@ class User(AbstractUser):
 
 
 class OneTimePassword(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE)
-    otp = models.UUIDField(default=uuid.uuid4, unique=True)
+    """
+    Database copy of the last token of each purpose (reset, verification) of a
+    user, used when the cache is process-local or unavailable (see
+    apps.users.otp). Only the hash of the token is stored.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    purpose = models.CharField(max_length=30, default="password_reset")
+    token_hash = models.CharField(max_length=64, null=True, blank=True)
+    # Failed checks of the current token, shared by every worker
+    attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "purpose"], name="otp_user_purpose_unique"),
+        ]
+
     def __str__(self):
         return f"{self.user.first_name} - otp code"
     
     def is_expired(self):
-        return now() > self.created_at + timedelta(minutes=15) 
+        expires_at = self.expires_at or self.created_at + timedelta(minutes=15)
+        return now() > expires_at
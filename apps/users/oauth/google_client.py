@@ -2,8 +2,7 @@ import time
 import requests
 from django.conf import settings
 from typing import Dict, Optional, Tuple
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from .verifier import verify_google_id_token
 
 class GoogleOAuthClient:
     """
@@ -30,15 +29,8 @@ class GoogleOAuthClient:
         start_time = time.time()
         try:
             # Verify the token
-            id_info = id_token.verify_oauth2_token(
-                token,
-                google_requests.Request(),
-                self.client_id
-            )
-
-            # Check if token is issued by Google
-            if id_info['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
-                return None, "Wrong issuer for token"
+            # Signature, audience and issuer are checked locally with the cached certs
+            id_info = verify_google_id_token(token, self.client_id)
 
             self._log_performance("Token Verification", start_time, time.time())
             return id_info, None
@@ -0,0 +1,139 @@
+import base64
+import json
+import re
+import threading
+import time
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from google.auth import jwt
+from requests.adapters import HTTPAdapter
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleCertificateStore:
+    """
+    Google's signing certificates ({kid: PEM}), kept in memory for as long as
+    the Cache-Control/Age headers of the certs endpoint allow. Fetches go
+    through one pooled requests.Session. When a refresh fails, the previous
+    certificates are kept for `stale_ttl` seconds so logins keep working.
+    """
+
+    def __init__(self, certs_url=GOOGLE_CERTS_URL, timeout=5, default_max_age=3600, stale_ttl=3600,
+                 min_refresh_interval=30, **options):
+        self.certs_url = certs_url
+        self.timeout = timeout
+        self.default_max_age = default_max_age
+        self.stale_ttl = stale_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=1))
+        self._lock = threading.Lock()
+        self._certs = None
+        self._expires_at = 0
+        self._fetched_at = 0
+
+    def _max_age(self, response):
+        match = MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else self.default_max_age
+        try:
+            age = int(response.headers.get("Age", 0))
+        except ValueError:
+            age = 0
+        return max(0, max_age - age)
+
+    def _fetch(self):
+        response = self.session.get(self.certs_url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json(), self._max_age(response)
+
+    def get_certs(self, force_refresh=False):
+        now = time.monotonic()
+        if self._certs is not None and now < self._expires_at and not force_refresh:
+            return self._certs
+
+        with self._lock:
+            now = time.monotonic()
+            if self._certs is not None and now < self._expires_at and not force_refresh:
+                return self._certs
+            # A token with an unknown kid must not trigger a fetch per request
+            if force_refresh and self._certs is not None and now - self._fetched_at < self.min_refresh_interval:
+                return self._certs
+            try:
+                certs, max_age = self._fetch()
+            except (requests.RequestException, ValueError):
+                if self._certs is not None and now < self._expires_at + self.stale_ttl:
+                    return self._certs
+                raise ValueError("Could not fetch Google certificates")
+            self._certs = certs
+            self._expires_at = now + max_age
+            self._fetched_at = now
+            return certs
+
+
+class StaticCertificateStore:
+    """Fixed key set, for tests and offline benchmarks."""
+
+    def __init__(self, certs=None, **options):
+        self.certs = dict(certs or {})
+
+    def get_certs(self, force_refresh=False):
+        return self.certs
+
+
+def token_key_id(token):
+    """Reads the `kid` of the JWT header without verifying the token."""
+    if isinstance(token, str):
+        token = token.encode()
+    try:
+        header = token.split(b".", 1)[0]
+        header += b"=" * (-len(header) % 4)
+        return json.loads(base64.urlsafe_b64decode(header)).get("kid")
+    except (ValueError, AttributeError):
+        raise ValueError("Malformed token")
+
+
+class GoogleIdTokenVerifier:
+    """
+    Verifies Google ID tokens locally against the certificate store. Same
+    checks as `id_token.verify_oauth2_token` (signature, exp/iat, audience,
+    issuer), without an HTTP request per login. Raises ValueError.
+    """
+
+    def __init__(self, store, clock_skew_in_seconds=5):
+        self.store = store
+        self.clock_skew_in_seconds = clock_skew_in_seconds
+
+    def verify(self, token, audience=None):
+        certs = self.store.get_certs()
+        if token_key_id(token) not in certs:
+            # Google rotated its keys before our copy expired
+            certs = self.store.get_certs(force_refresh=True)
+
+        id_info = jwt.decode(
+            token,
+            certs=certs,
+            audience=audience,
+            clock_skew_in_seconds=self.clock_skew_in_seconds,
+        )
+        if id_info.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError("Wrong issuer for token")
+        return id_info
+
+
+@lru_cache(maxsize=None)
+def get_google_verifier():
+    options = dict(settings.GOOGLE_ID_TOKEN_VERIFIER)
+    store_class = import_string(options.pop("STORE"))
+    clock_skew = options.pop("CLOCK_SKEW", 5)
+    store = store_class(**{key.lower(): value for key, value in options.items()})
+    return GoogleIdTokenVerifier(store, clock_skew_in_seconds=clock_skew)
+
+
+def verify_google_id_token(token, audience=None):
+    return get_google_verifier().verify(token, audience)
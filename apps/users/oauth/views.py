@@ -3,10 +3,12 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.conf import settings
-from rest_framework_simplejwt.tokens import RefreshToken
+from apps.users.tokens import RoleRefreshToken
 from .google_client import GoogleOAuthClient
 from .serializers import GoogleAuthSerializer, GoogleUserInfoSerializer
+from rest_framework.exceptions import ValidationError
 from ..models import User, Role  # Import Role model
+from ..registration import register_user
 from rest_framework.permissions import AllowAny
 class GoogleOAuthView(APIView):
     permission_classes = [AllowAny]
@@ -64,21 +66,20 @@ class GoogleOAuthView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )            # Get client role first
             try:
-                client_role = Role.objects.get(name=Role.CLIENT)  # Get client role by name constant
-                # Get or create user with role
-                user, created = User.objects.get_or_create(
-                    email=user_data['email'],
-                    defaults={
-                        'first_name': user_data.get('given_name', ''),
-                        'last_name': user_data.get('family_name', ''),
-                        'is_active': True,
-                        'role': client_role  # Assign role during creation
-                    }
-                )
-                user = User.objects.get(email=user.email)
-
-                if created:
-                    print("✓ User created with client role")
+                user = User.objects.select_related('role').filter(email=user_data['email']).first()
+                if user is None:
+                    try:
+                        # Single INSERT with the cached client role id
+                        user = register_user(
+                            email=user_data['email'],
+                            first_name=user_data.get('given_name', ''),
+                            last_name=user_data.get('family_name', ''),
+                            is_verified=False,
+                        )
+                        print("✓ User created with client role")
+                    except ValidationError:
+                        # Created by a concurrent request
+                        user = User.objects.select_related('role').get(email=user_data['email'])
                 else:
                     print("✓ Existing user found")
             except Role.DoesNotExist:
@@ -87,9 +88,8 @@ class GoogleOAuthView(APIView):
                     {'error': 'System configuration error: Client role not found'},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
-            user = User.objects.get(email=user)
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = RoleRefreshToken.for_user(user)
             tokens = {
                 'access': str(refresh.access_token),
                 'refresh': str(refresh),
@@ -0,0 +1,195 @@
+import hashlib
+import hmac
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.common.caches import is_shared_cache
+
+from .models import OneTimePassword
+
+PASSWORD_RESET = "password_reset"
+EMAIL_VERIFICATION = "email_verification"
+
+# Seconds each kind of token stays valid
+TOKEN_TTLS = {
+    PASSWORD_RESET: 15 * 60,
+    EMAIL_VERIFICATION: 10 * 60,
+}
+# Expired entries are kept this long so validation can answer "expired" instead of "invalid"
+EXPIRED_GRACE = 60 * 60
+# Failed attempts before a token is discarded (numeric codes are short)
+MAX_ATTEMPTS = 5
+
+VALID = "valid"
+EXPIRED = "expired"
+INVALID = "invalid"
+
+
+def token_key(purpose, user_id):
+    return f"users:otp:{purpose}:{user_id}"
+
+
+def attempts_key(purpose, user_id):
+    return f"users:otp:{purpose}:{user_id}:attempts"
+
+
+def hash_token(token):
+    """Tokens are stored as an HMAC of the secret key, never in clear."""
+    return hmac.new(settings.SECRET_KEY.encode(), str(token).encode(), hashlib.sha256).hexdigest()
+
+
+def uses_database():
+    """Process-local caches are not seen by the other workers: tokens then live in the database only."""
+    return not is_shared_cache()
+
+
+def generate_token(purpose):
+    if purpose == EMAIL_VERIFICATION:
+        return f"{secrets.randbelow(10 ** 6):06d}"
+    return secrets.token_urlsafe(32)
+
+
+def issue_token(user, purpose=PASSWORD_RESET):
+    """
+    Creates a new token for the user, replacing any previous one of the same
+    purpose (tokens of other purposes are kept), and returns it in clear so it
+    can be sent. Only its hash is kept: in the shared cache with a native TTL
+    or, when the cache is process-local or unavailable, in OneTimePassword.
+    """
+    token = generate_token(purpose)
+    token_hash = hash_token(token)
+    ttl = TOKEN_TTLS[purpose]
+    expires_at = time.time() + ttl
+
+    stored = False
+    if not uses_database():
+        try:
+            cache.set(token_key(purpose, user.pk), (token_hash, expires_at), ttl + EXPIRED_GRACE)
+            cache.delete(attempts_key(purpose, user.pk))
+            stored = True
+        except Exception:
+            pass
+
+    if stored:
+        # Copy left by an earlier cache outage, it would be accepted if the cache entry is lost
+        OneTimePassword.objects.filter(user=user, purpose=purpose).delete()
+    else:
+        OneTimePassword.objects.update_or_create(
+            user=user,
+            purpose=purpose,
+            defaults={
+                "token_hash": token_hash,
+                "attempts": 0,
+                "expires_at": timezone.now() + timedelta(seconds=ttl),
+            },
+        )
+    return token
+
+
+def _cached_entry(purpose, user_id):
+    """Returns (entry, reachable); entry is None when missing or the cache is down."""
+    try:
+        return cache.get(token_key(purpose, user_id)), True
+    except Exception:
+        return None, False
+
+
+def _stored_entry(purpose, user_id):
+    row = (
+        OneTimePassword.objects.filter(user_id=user_id, purpose=purpose)
+        .values_list("token_hash", "expires_at")
+        .first()
+    )
+    if row is None or not row[0]:
+        return None
+    return row[0], row[1].timestamp()
+
+
+def _register_failure(purpose, user_id):
+    if uses_database():
+        tokens = OneTimePassword.objects.filter(user_id=user_id, purpose=purpose)
+        tokens.update(attempts=F("attempts") + 1)
+        tokens.filter(attempts__gte=MAX_ATTEMPTS).delete()
+        return
+    key = attempts_key(purpose, user_id)
+    try:
+        if not cache.add(key, 1, TOKEN_TTLS[purpose]):
+            attempts = cache.incr(key)
+            if attempts >= MAX_ATTEMPTS:
+                discard_token(purpose, user_id)
+    except Exception:
+        pass
+
+
+def check_token(user_id, token, purpose=PASSWORD_RESET):
+    """Returns VALID, EXPIRED or INVALID. Hashes are compared in constant time."""
+    if uses_database():
+        # The database is the only copy every worker sees
+        entry = _stored_entry(purpose, user_id)
+    else:
+        entry, _ = _cached_entry(purpose, user_id)
+        if entry is None:
+            # Issued while the cache was unavailable
+            entry = _stored_entry(purpose, user_id)
+    if entry is None or not token:
+        return INVALID
+
+    token_hash, expires_at = entry
+    if not hmac.compare_digest(token_hash, hash_token(token)):
+        _register_failure(purpose, user_id)
+        return INVALID
+    if time.time() > expires_at:
+        return EXPIRED
+    return VALID
+
+
+def discard_token(purpose, user_id):
+    """Removes the token. Returns False when there was nothing left to remove."""
+    if uses_database():
+        # Only the database delete tells whether another worker consumed it first
+        deleted, _ = OneTimePassword.objects.filter(user_id=user_id, purpose=purpose).delete()
+        return bool(deleted)
+    removed = False
+    try:
+        removed = cache.delete(token_key(purpose, user_id))
+        cache.delete(attempts_key(purpose, user_id))
+    except Exception:
+        pass
+    if not removed:
+        deleted, _ = OneTimePassword.objects.filter(user_id=user_id, purpose=purpose).delete()
+        removed = removed or bool(deleted)
+    return removed
+
+
+def consume_token(user_id, token, purpose=PASSWORD_RESET):
+    """
+    Validates and removes the token in one step. A token can only be consumed
+    once, a second concurrent use finds nothing to remove and gets INVALID.
+    """
+    result = check_token(user_id, token, purpose)
+    if result == VALID and not discard_token(purpose, user_id):
+        return INVALID
+    return result
+
+
+def purge_expired_tokens(batch_size=5000, now=None):
+    """
+    Deletes expired OneTimePassword rows in batches, yielding the count of each
+    batch. Rows without expires_at predate the hashed tokens and are useless.
+    """
+    now = now or timezone.now()
+    while True:
+        ids = list(
+            OneTimePassword.objects.filter(Q(expires_at__lt=now) | Q(expires_at__isnull=True))
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        deleted, _ = OneTimePassword.objects.filter(id__in=ids).delete()
+        yield deleted
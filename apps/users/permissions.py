@@ -35,7 +35,8 @@ class IsOwnerOrStaff(BasePermission):
             return True
         
         # Verificar si el objeto tiene atributo user
-        elif hasattr(obj, 'user'):
-            return obj.user == request.user
+        elif hasattr(obj, 'user_id'):
+            # Compara ids: request.user puede ser el usuario construido desde el token
+            return obj.user_id == request.user.id
             
         return False
\ No newline at end of file
@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .models import Role, User
+
+ROLE_ID_TIMEOUT = 60 * 60
+
+# Unique constraints of users_user and the error reported for each:
+# (constraint name, column, field, detail). PostgreSQL reports the name of the
+# violated constraint; SQLite only its columns ("users_user.<column>").
+# email and username were created inline in 0001, so PostgreSQL named them.
+UNIQUE_CONFLICTS = (
+    ("user_document_number_unique", "document_number", "document_number", "El número de documento ya está registrado"),
+    ("users_user_email_key", "email", "email", "El email ya está registrado"),
+    # username is the email on signup
+    ("users_user_username_key", "username", "email", "El email ya está registrado"),
+)
+
+def role_id_key(name):
+    return f"users:role-id:{name}"
+
+
+def get_role_id(name):
+    """Id of the role with that name, cached. Raises Role.DoesNotExist."""
+    role_id = cache.get(role_id_key(name))
+    if role_id is None:
+        role_id = Role.objects.filter(name=name).values_list("id", flat=True).first()
+        if role_id is None:
+            raise Role.DoesNotExist(f"Role {name} does not exist")
+        cache.set(role_id_key(name), role_id, ROLE_ID_TIMEOUT)
+    return role_id
+
+
+def forget_role_ids(*names):
+    cache.delete_many([role_id_key(name) for name in names if name])
+
+
+def violated_constraint(error):
+    """
+    (constraint name, columns) of a unique violation. The name comes from the
+    driver diagnostics (psycopg); the columns from SQLite's message.
+    """
+    diag = getattr(error.__cause__, "diag", None)
+    name = getattr(diag, "constraint_name", None)
+    if name:
+        return name, ()
+    message = str(error)
+    prefix = "UNIQUE constraint failed: "
+    if not message.startswith(prefix):
+        return None, ()
+    table = User._meta.db_table
+    columns = [column.strip() for column in message[len(prefix):].split(",")]
+    return None, tuple(column[len(table) + 1:] for column in columns if column.startswith(f"{table}."))
+
+
+def conflict_error(error):
+    """Maps a unique violation on users_user to a ValidationError on the offending field."""
+    name, columns = violated_constraint(error)
+    for constraint, column, field, detail in UNIQUE_CONFLICTS:
+        if name == constraint or (name is None and columns == (column,)):
+            return serializers.ValidationError({field: [detail]})
+    return serializers.ValidationError(str(error))
+
+def register_user(email, password=None, role_name=Role.CLIENT, is_verified=True, **fields):
+    """
+    Creates a user with its role in a single INSERT.
+
+    Duplicated emails or document numbers are not looked up beforehand: the
+    unique indexes reject them and the IntegrityError is turned into a
+    ValidationError. The role id comes from the cache. Without a password
+    the account can only log in through a social provider.
+    """
+    email = User.objects.normalize_email(email)
+    role_id = get_role_id(role_name)
+    user = User(
+        username=email,
+        email=email,
+        role_id=role_id,
+        is_verified=is_verified,
+        **fields,
+    )
+    if password:
+        user.set_password(password)
+    else:
+        user.set_unusable_password()
+
+    try:
+        if transaction.get_connection().in_atomic_block:
+            # Savepoint so the outer transaction survives a conflict
+            with transaction.atomic():
+                user.save(force_insert=True)
+        else:
+            user.save(force_insert=True)
+    except IntegrityError as error:
+        raise conflict_error(error)
+
+    # Same role the INSERT used, so serializing the user needs no extra query
+    user.role = Role(id=role_id, name=role_name)
+    return user
@@ -1,6 +1,22 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from .models import Role, User
+from .registration import register_user
+from .tokens import RoleRefreshToken, stamp_user_claims
+
+
+class SparseFieldsMixin:
+    """Keeps only the fields listed in context["fields"], when given (sparse field selection)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get("fields")
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -53,6 +69,15 @@ class RegisterSerializer(serializers.ModelSerializer):
             "work_situation": {"required": False},
         }
 
+    def get_extra_kwargs(self):
+        extra_kwargs = super().get_extra_kwargs()
+        # El documento se valida en validate_document_number (mensaje propio)
+        extra_kwargs["document_number"] = {**extra_kwargs.get("document_number", {}), "validators": []}
+        if self.instance is None:
+            # En el alta los índices únicos detectan los duplicados (ver register_user)
+            extra_kwargs["email"] = {**extra_kwargs.get("email", {}), "validators": []}
+        return extra_kwargs
+
     def validate(self, attrs):
         password = attrs.get("password", "")
         password2 = attrs.pop("password2", "")
@@ -72,10 +97,7 @@ class RegisterSerializer(serializers.ModelSerializer):
             )
             if other_user:
                 raise serializers.ValidationError("El email ya está registrado")
-        # Si es creación
-        else:
-            if User.objects.filter(email=value).exists():
-                raise serializers.ValidationError("El email ya está registrado")
+        # En la creación lo valida el índice único al insertar
         return value
 
     def validate_document_number(self, value):
@@ -90,24 +112,17 @@ class RegisterSerializer(serializers.ModelSerializer):
         if instance:
             # Excluir el usuario actual de la validación
             exists = User.objects.exclude(pk=instance.pk).filter(document_number=value).exists()
-        else:
-            exists = User.objects.filter(document_number=value).exists()
-
-        if exists:
-            raise serializers.ValidationError("El número de documento ya está registrado")
+            if exists:
+                raise serializers.ValidationError("El número de documento ya está registrado")
+        # En la creación lo valida el índice único al insertar
 
         return value
     
     def create(self, validated_data):
-        email = validated_data.get("email")
-
         try:
-            # Obtener el rol de cliente por nombre
-            default_role = Role.objects.get(name="client")
-
-            user = User.objects.create_user(
-                username=email,
-                email=email,
+            # Un solo INSERT con el rol de cliente (id en caché)
+            return register_user(
+                email=validated_data["email"],
                 password=validated_data["password"],
                 first_name=validated_data.get("first_name", ""),
                 last_name=validated_data.get("last_name", ""),
@@ -118,18 +133,9 @@ class RegisterSerializer(serializers.ModelSerializer):
                 occupation=validated_data.get("occupation", ""),
                 work_situation=validated_data.get("work_situation", ""),
                 phone_number=validated_data.get("phone_number"),
-                is_verified=True,
             )
-
-            # Asignar el rol por defecto
-            user.role = default_role
-            user.save()
-
-            return user
         except Role.DoesNotExist:
             raise serializers.ValidationError("Error: No se encontró el rol de cliente")
-        except Exception as e:
-            raise serializers.ValidationError(str(e))
 
 
 class UserPersonalDataSerializer(serializers.ModelSerializer):
@@ -144,7 +150,7 @@ class UserPersonalDataSerializer(serializers.ModelSerializer):
         ]
 
 
-class StaffRegisterSerializer(serializers.ModelSerializer):
+class StaffRegisterSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(
         max_length=68,
         min_length=6,
@@ -242,21 +248,22 @@ class StaffRegisterSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
         data.pop("username", None)
+        # Con selección de campos solo se arma lo pedido (el resto no se cargó)
+        wanted = self.context.get("fields") or None
 
         # Información básica del usuario
-        data.update(
-            {
-                "full_name": f"{instance.first_name} {instance.last_name}",
-                "is_verified": instance.is_verified,
-                "is_active": instance.is_active,
-                "is_staff": instance.is_staff,
-                "date_joined": instance.date_joined,
-                "last_login": instance.last_login,
-            }
-        )
+        extra = {
+            "full_name": lambda: f"{instance.first_name} {instance.last_name}",
+            "is_verified": lambda: instance.is_verified,
+            "is_active": lambda: instance.is_active,
+            "is_staff": lambda: instance.is_staff,
+            "date_joined": lambda: instance.date_joined,
+            "last_login": lambda: instance.last_login,
+        }
+        data.update({name: value() for name, value in extra.items() if wanted is None or name in wanted})
 
         # Información del rol
-        if instance.role:
+        if (wanted is None or "role" in wanted) and instance.role:
             data["role"] = {
                 "id": instance.role.id,
                 "name": instance.role.name,
@@ -346,7 +353,7 @@ class RoleSerializer(serializers.ModelSerializer):
         model = Role
         fields = ['id', 'name']
 
-class UserFormSerializer(serializers.ModelSerializer):
+class UserFormSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     role = RoleSerializer(read_only=True)
     role_id = serializers.PrimaryKeyRelatedField(
         queryset=Role.objects.all(), source='role', write_only=True
@@ -399,3 +406,40 @@ class RoleSerializer(serializers.ModelSerializer):
 class PasswordResetRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
     frontend_url = serializers.URLField()
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Same flow as TokenRefreshSerializer, but the role and version claims are
+    re-read from the database so a refresh picks up role changes.
+    """
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user = (
+            User.objects.select_related("role")
+            .filter(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]})
+            .first()
+        )
+        if user is None or not user.is_active:
+            raise AuthenticationFailed("User not found or inactive", code="user_not_found")
+        stamp_user_claims(refresh, user)
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    pass
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data["refresh"] = str(refresh)
+
+        return data
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import forget_auth_user, forget_auth_versions, set_auth_version
+from .models import Role, User
+from .registration import forget_role_ids
+
+
+@receiver(post_save, sender=User)
+def publish_auth_version(sender, instance, **kwargs):
+    user_id, version = instance.pk, instance.auth_version
+
+    def publish():
+        set_auth_version(user_id, version)
+        # Profile changes keep the version, drop the cached user anyway
+        forget_auth_user(user_id, version)
+
+    transaction.on_commit(publish)
+
+
+@receiver(post_delete, sender=User)
+def drop_auth_version(sender, instance, **kwargs):
+    user_id, version = instance.pk, instance.auth_version
+
+    def drop():
+        forget_auth_versions([user_id])
+        forget_auth_user(user_id, version)
+
+    transaction.on_commit(drop)
+
+
+def bump_role_users(user_ids):
+    """Invalidates the role claims of the given users' tokens."""
+    if not user_ids:
+        return
+    User.objects.filter(pk__in=user_ids).update(auth_version=F("auth_version") + 1)
+    transaction.on_commit(lambda: forget_auth_versions(user_ids))
+
+
+@receiver(pre_save, sender=Role)
+def remember_role_name(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_name = Role.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+
+
+@receiver(post_save, sender=Role)
+def bump_renamed_role_users(sender, instance, created, **kwargs):
+    if created or getattr(instance, "_previous_name", instance.name) == instance.name:
+        return
+    bump_role_users(list(instance.users.values_list("pk", flat=True)))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def drop_cached_role_id(sender, instance, **kwargs):
+    names = (instance.name, getattr(instance, "_previous_name", None))
+    transaction.on_commit(lambda: forget_role_ids(*names))
+
+
+@receiver(pre_delete, sender=Role)
+def remember_role_users(sender, instance, **kwargs):
+    instance._user_ids = list(instance.users.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Role)
+def bump_deleted_role_users(sender, instance, **kwargs):
+    # role is SET_NULL on delete, which bypasses User.save
+    bump_role_users(getattr(instance, "_user_ids", []))
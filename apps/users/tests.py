@@ -1,3 +1,412 @@
-from django.test import TestCase
+import io
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
 
-# Create your tests here.
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .authentication import (
+    RoleJWTAuthentication, RoleTokenUser, auth_user_key, auth_version_key, forget_auth_user, forget_auth_versions,
+    get_auth_version, load_auth_user,
+)
+from .blacklist import BlacklistFilter, get_blacklist_filter
+from .hashers import HashingBusy, HashingPool, api_exception_handler, fail_fast
+from .imports import CREATED, FAILED, import_users
+from .models import OneTimePassword, Role, User
+from .oauth.verifier import GoogleIdTokenVerifier, StaticCertificateStore
+from .otp import (
+    EMAIL_VERIFICATION, INVALID, MAX_ATTEMPTS, PASSWORD_RESET, VALID, check_token, consume_token, issue_token,
+    token_key,
+)
+from .registration import conflict_error, register_user
+from .throttling import EmailRateThrottle, IPRateThrottle, get_throttle_store
+
+
+def make_user(email, role_name=Role.CLIENT, **extra_fields):
+    role, _ = Role.objects.get_or_create(name=role_name)
+    return User.objects.create(email=email, first_name='Test', last_name='User', role=role, **extra_fields)
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user.tokens()['access']}")
+    return client
+
+
+class AuthQueryCountTests(TestCase):
+    """SQL queries per request on the main endpoints, with the auth cache warm."""
+
+    # Endpoint -> queries once the authenticated user is cached
+    WARM_QUERIES = {
+        '/api/v1/auth/profile/{user_id}/': 1,
+        '/api/v1/transactions/bank-accounts/': 1,
+        '/api/v1/transactions/transactions/': 1,
+        '/api/v1/coin/currencies/': 1,
+        '/api/v1/coin/exchange-rates/': 1,
+        '/api/v1/complaints/': 1,
+        '/api/v1/company/popup-images/': 0,
+        '/api/v1/blogs/': 0,
+    }
+
+    def setUp(self):
+        cache.clear()
+        caches['blogs'].clear()
+        self.user = make_user('staff@example.com', Role.STAFF)
+        self.client = client_for(self.user)
+
+    def test_warm_requests(self):
+        for path, expected in self.WARM_QUERIES.items():
+            path = path.format(user_id=self.user.id)
+            with self.subTest(path=path):
+                self.assertLess(self.client.get(path).status_code, 500)
+                with self.assertNumQueries(expected):
+                    self.client.get(path)
+
+    def test_role_token_skips_user_query_on_cold_cache(self):
+        forget_auth_versions([self.user.id])
+        forget_auth_user(self.user.id, self.user.auth_version)
+
+        # auth_version check plus the currencies query; the role comes from the token
+        with self.assertNumQueries(2):
+            self.client.get('/api/v1/coin/currencies/')
+
+    def test_saving_the_user_drops_the_cached_entry(self):
+        load_auth_user(self.user.id)
+        key = auth_user_key(self.user.id, self.user.auth_version)
+        self.assertIsNotNone(cache.get(key))
+
+        self.user.first_name = 'Changed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertIsNone(cache.get(key))
+
+
+class RoleTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('role-token@example.com', Role.STAFF)
+        self.token = self.user.tokens()['access']
+
+    def authenticate(self, method):
+        request = getattr(APIRequestFactory(), method)('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return RoleJWTAuthentication().authenticate(request)[0]
+
+    def test_safe_methods_use_the_token_claims(self):
+        get_auth_version(self.user.id)
+
+        with self.assertNumQueries(0):
+            user = self.authenticate('get')
+        self.assertIsInstance(user, RoleTokenUser)
+        self.assertEqual(user.role.name, Role.STAFF)
+        self.assertIsInstance(self.authenticate('post'), User)
+
+    def test_role_rename_falls_back_to_the_database(self):
+        self.assertIsInstance(self.authenticate('get'), RoleTokenUser)
+
+        role = self.user.role
+        role.name = 'auditor'
+        with self.captureOnCommitCallbacks(execute=True):
+            role.save()
+        self.assertIsNone(cache.get(auth_version_key(self.user.id)))
+
+        user = self.authenticate('get')
+
+        self.assertIsInstance(user, User)
+        self.assertEqual(user.role.name, 'auditor')
+        self.assertEqual(cache.get(auth_version_key(self.user.id)), self.user.auth_version + 1)
+
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(prefix='brasper-tests-cache-'),
+    },
+    'blogs': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-blogs'},
+}
+
+
+class BlacklistFilterTests(TestCase):
+    def setUp(self):
+        self.user = make_user('tokens@example.com')
+
+    def blacklist(self, jti):
+        token = OutstandingToken.objects.create(
+            user=self.user, jti=jti, token=jti, expires_at=timezone.now() + timedelta(days=1),
+        )
+        BlacklistedToken.objects.create(token=token)
+
+    def test_disabled_without_a_shared_cache(self):
+        get_blacklist_filter.cache_clear()
+        self.addCleanup(get_blacklist_filter.cache_clear)
+
+        self.assertIsNone(get_blacklist_filter())
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_blacklist_from_another_worker_is_seen_at_once(self):
+        cache.clear()
+        worker, other_worker = BlacklistFilter(), BlacklistFilter()
+        self.assertFalse(worker.might_be_blacklisted('jti-1'))
+
+        self.blacklist('jti-1')
+        other_worker.publish()
+
+        self.assertTrue(worker.might_be_blacklisted('jti-1'))
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_current_filter_skips_the_query(self):
+        cache.clear()
+        worker = BlacklistFilter()
+        worker.might_be_blacklisted('jti-1')
+
+        with self.assertNumQueries(0):
+            self.assertFalse(worker.might_be_blacklisted('jti-2'))
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_lost_sequence_forces_a_catch_up(self):
+        cache.clear()
+        worker = BlacklistFilter()
+        worker.might_be_blacklisted('jti-1')
+
+        self.blacklist('jti-1')
+        cache.clear()
+
+        self.assertTrue(worker.might_be_blacklisted('jti-1'))
+
+
+class OneTimePasswordTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('otp@example.com')
+
+    def test_purposes_do_not_replace_each_other(self):
+        reset = issue_token(self.user, PASSWORD_RESET)
+        code = issue_token(self.user, EMAIL_VERIFICATION)
+
+        self.assertEqual(OneTimePassword.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(check_token(self.user.id, reset, PASSWORD_RESET), VALID)
+        self.assertEqual(check_token(self.user.id, code, EMAIL_VERIFICATION), VALID)
+
+    def test_reissued_token_ignores_a_stale_local_entry(self):
+        # Entrada que otro worker dejó en su LocMem antes de reemitir el token
+        cache.set(token_key(PASSWORD_RESET, self.user.id), ('stale', 0), 60)
+        token = issue_token(self.user, PASSWORD_RESET)
+
+        self.assertEqual(check_token(self.user.id, token, PASSWORD_RESET), VALID)
+
+    def test_token_is_consumed_once(self):
+        token = issue_token(self.user, PASSWORD_RESET)
+
+        self.assertEqual(consume_token(self.user.id, token, PASSWORD_RESET), VALID)
+        self.assertEqual(consume_token(self.user.id, token, PASSWORD_RESET), INVALID)
+
+    def test_failed_attempts_discard_the_token(self):
+        token = issue_token(self.user, PASSWORD_RESET)
+        for _ in range(MAX_ATTEMPTS):
+            check_token(self.user.id, 'wrong', PASSWORD_RESET)
+
+        self.assertEqual(check_token(self.user.id, token, PASSWORD_RESET), INVALID)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_shared_cache_keeps_tokens_out_of_the_database(self):
+        cache.clear()
+        token = issue_token(self.user, EMAIL_VERIFICATION)
+
+        self.assertFalse(OneTimePassword.objects.exists())
+        self.assertEqual(consume_token(self.user.id, token, EMAIL_VERIFICATION), VALID)
+
+
+LOCAL_THROTTLE = {'STORE': 'apps.common.counters.LocalCounterStore', 'BUCKETS': 10}
+
+
+@override_settings(AUTH_THROTTLE=LOCAL_THROTTLE)
+class AuthThrottleTests(TestCase):
+    # DEFAULT_THROTTLE_RATES: login_ip 20/m, login_email 10/15m
+    view = SimpleNamespace(throttle_scope='login')
+
+    def setUp(self):
+        get_throttle_store.cache_clear()
+        self.addCleanup(get_throttle_store.cache_clear)
+
+    def login(self, throttle_class, remote_addr='10.0.0.1', forwarded_for=None, email='ana@example.com'):
+        extra = {'REMOTE_ADDR': remote_addr}
+        if forwarded_for:
+            extra['HTTP_X_FORWARDED_FOR'] = forwarded_for
+        request = APIRequestFactory().post('/api/v1/auth/login/', {'email': email}, format='json', **extra)
+        return throttle_class().allow_request(Request(request, parsers=[JSONParser()]), self.view)
+
+    def test_rotating_forwarded_for_does_not_reset_the_ip_limit(self):
+        allowed = [self.login(IPRateThrottle, forwarded_for=f'203.0.113.{index}') for index in range(21)]
+
+        self.assertEqual(allowed.count(True), 20)
+        self.assertFalse(allowed[-1])
+        self.assertTrue(self.login(IPRateThrottle, remote_addr='10.0.0.2'))
+
+    def test_email_limit_applies_across_addresses(self):
+        allowed = [self.login(EmailRateThrottle, remote_addr=f'10.0.1.{index}', email=' Ana@Example.com') for index in range(11)]
+
+        self.assertFalse(allowed[-1])
+        self.assertTrue(self.login(EmailRateThrottle, email='otra@example.com'))
+
+
+class UserImportTests(TestCase):
+    def setUp(self):
+        Role.objects.get_or_create(name=Role.CLIENT)
+
+    def import_csv(self, content, **options):
+        return list(import_users(io.BytesIO(content.encode()), workers=0, **options))
+
+    def test_prehashed_passwords_need_the_flag(self):
+        content = f"email;password\nana@example.com;{make_password('secreto123')}\n"
+
+        rejected, = self.import_csv(content)
+        accepted, = self.import_csv(content, allow_hashed=True)
+
+        self.assertEqual((rejected.status, list(rejected.errors)), (FAILED, ['password']))
+        self.assertEqual(accepted.status, CREATED)
+        self.assertTrue(User.objects.get(email='ana@example.com').check_password('secreto123'))
+
+    def test_upload_is_capped(self):
+        client = client_for(make_user('staff-import@example.com', Role.STAFF))
+        rows = ''.join(f'user{index}@example.com,\n' for index in range(101))
+        upload = SimpleUploadedFile('users.csv', f'email,password\n{rows}'.encode(), content_type='text/csv')
+
+        response = client.post('/api/v1/auth/users/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(email__startswith='user').exists())
+
+
+class StaffListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = client_for(make_user('staff-0@example.com', Role.STAFF))
+        for index in range(1, 3):
+            make_user(f'staff-{index}@example.com', Role.STAFF)
+
+    def test_cursor_pages(self):
+        body = self.client.get('/api/v1/auth/staff/register/', {'page_size': 2}).json()
+
+        self.assertEqual(len(body['data']), 2)
+        self.assertIn('cursor=', body['next'])
+        self.assertNotIn('total', body)
+
+    def test_legacy_shape(self):
+        body = self.client.get('/api/v1/auth/staff/register/', {'legacy': 'true', 'page_size': 2}).json()
+
+        self.assertEqual(body['total'], 3)
+        self.assertEqual(len(body['data']), 3)
+        self.assertNotIn('next', body)
+
+
+class RegistrationConflictTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Role.objects.get_or_create(name=Role.CLIENT)
+        register_user('ana@example.com', document_number='12345678')
+
+    def test_duplicates_are_reported_on_their_field(self):
+        attempts = {
+            'email': {'email': 'ana@EXAMPLE.com', 'document_number': '87654321'},
+            'document_number': {'email': 'otra@example.com', 'document_number': '12345678'},
+        }
+        for field, fields in attempts.items():
+            with self.subTest(field=field):
+                with self.assertRaises(ValidationError) as raised:
+                    register_user(**fields)
+                self.assertEqual(list(raised.exception.detail), [field])
+
+    def test_constraint_name_from_the_driver(self):
+        cause = Exception('duplicate key value violates unique constraint')
+        cause.diag = SimpleNamespace(constraint_name='user_document_number_unique')
+        error = IntegrityError(*cause.args)
+        error.__cause__ = cause
+
+        self.assertEqual(list(conflict_error(error).detail), ['document_number'])
+
+
+class HashingPoolTests(SimpleTestCase):
+    def full_pool(self):
+        pool = HashingPool(max_workers=1, queue_size=0, queue_timeout=0)
+        pool.slots.acquire()
+        return pool
+
+    def test_api_callers_fail_fast_with_503(self):
+        pool = self.full_pool()
+        token = fail_fast.set(True)
+        self.addCleanup(fail_fast.reset, token)
+
+        with self.assertRaises(HashingBusy) as raised:
+            pool.run(len, 'secreto')
+
+        self.assertEqual(api_exception_handler(raised.exception, {}).status_code, 503)
+
+    def test_other_callers_wait_for_a_slot(self):
+        pool = self.full_pool()
+        threading.Timer(0.05, pool.slots.release).start()
+
+        self.assertEqual(pool.run(len, 'secreto'), 7)
+
+
+class GoogleIdTokenVerifierTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+        )
+        public_pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        cls.signer = crypt.RSASigner.from_string(private_pem, key_id='local-key')
+        cls.verifier = GoogleIdTokenVerifier(StaticCertificateStore({'local-key': public_pem.decode()}))
+
+    def sign(self, **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': 'brasper-client', 'sub': '1234',
+            'email': 'ana@example.com', 'iat': now, 'exp': now + 300, **claims,
+        }
+        return google_jwt.encode(self.signer, payload)
+
+    def test_valid_token(self):
+        id_info = self.verifier.verify(self.sign(), audience='brasper-client')
+
+        self.assertEqual((id_info['sub'], id_info['email']), ('1234', 'ana@example.com'))
+
+    def test_rejected_tokens(self):
+        past = int(time.time()) - 3600
+        tokens = {
+            'audience': self.sign(aud='otro-cliente'),
+            'issuer': self.sign(iss='https://evil.example.com'),
+            'expired': self.sign(iat=past - 300, exp=past),
+        }
+        for reason, token in tokens.items():
+            with self.subTest(reason=reason), self.assertRaises(ValueError):
+                self.verifier.verify(token, audience='brasper-client')
+
+    def test_unknown_key_is_rejected(self):
+        other = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+        )
+        token = google_jwt.encode(crypt.RSASigner.from_string(other, key_id='otra'), {'aud': 'brasper-client'})
+
+        with self.assertRaises(ValueError):
+            self.verifier.verify(token, audience='brasper-client')
@@ -0,0 +1,168 @@
+import hashlib
+import re
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# Scopes protected by the throttles, each one with _ip, _email and _global rates
+THROTTLE_SCOPES = ("login", "register", "password_reset")
+THROTTLE_KINDS = ("ip", "email", "global")
+# Hourly counters of allowed and rejected attempts kept for monitoring
+STATS_HOURS = 24
+RATE = re.compile(r"^(\d+)/(\d*)([smhd])")
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """'5/min' -> (5, 60), '10/15m' -> (10, 900)."""
+    match = RATE.match(rate or "")
+    if match is None:
+        raise ValueError(f"Tasa de throttling inválida: {rate}")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+@lru_cache(maxsize=None)
+def get_throttle_store():
+    options = dict(settings.AUTH_THROTTLE)
+    store_class = import_string(options.pop("STORE"))
+    options.pop("BUCKETS", None)
+    return store_class(**{key.lower(): value for key, value in options.items()})
+
+
+def stats_key(scope, kind, outcome, hour):
+    return f"users:throttle:stats:{scope}_{kind}:{outcome}:{hour}"
+
+
+def throttle_stats(now=None):
+    """Allowed and rejected attempts per rate in the last STATS_HOURS hours."""
+    current = int(now or time.time()) // 3600
+    hours = range(current - STATS_HOURS + 1, current + 1)
+    keys = {
+        (scope, kind, outcome): [stats_key(scope, kind, outcome, hour) for hour in hours]
+        for scope in THROTTLE_SCOPES
+        for kind in THROTTLE_KINDS
+        for outcome in ("allowed", "rejected")
+    }
+    counters = get_throttle_store().get_many([key for group in keys.values() for key in group])
+
+    stats = {}
+    for (scope, kind, outcome), group in keys.items():
+        stats.setdefault(f"{scope}_{kind}", {})[outcome] = sum(counters.get(key, 0) for key in group)
+    return stats
+
+
+class SlidingWindowThrottle(BaseThrottle, ABC):
+    """
+    Sliding-window limiter over the counter store in AUTH_THROTTLE.
+
+    The window is split into BUCKETS slots and the attempts of the last slots
+    are added up, so a check is one `get_many` and one increment, with no
+    per-attempt history. The rate is read from DEFAULT_THROTTLE_RATES under
+    `<view.throttle_scope>_<kind>`. Runs before the view, so rejected attempts
+    never reach password hashing or the database. Only POST is limited.
+    """
+
+    kind = None
+
+    @abstractmethod
+    def get_key(self, request, view):
+        """Identity the attempts are counted against, or None to skip this throttle."""
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if request.method != "POST" or scope is None:
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f"{scope}_{self.kind}")
+        key = self.get_key(request, view)
+        if rate is None or key is None:
+            return True
+
+        limit, window = parse_rate(rate)
+        buckets = settings.AUTH_THROTTLE.get("BUCKETS", 10)
+        bucket_size = max(1, window // buckets)
+        now = time.time()
+        current = int(now) // bucket_size
+        prefix = f"users:throttle:{scope}_{self.kind}:{key}:{bucket_size}"
+        keys = [f"{prefix}:{bucket}" for bucket in range(current - buckets + 1, current + 1)]
+
+        store = get_throttle_store()
+        counters = store.get_many(keys)
+        attempts = sum(counters.get(key, 0) for key in keys)
+        allowed = attempts < limit
+
+        if allowed:
+            store.incr_many({keys[-1]: 1}, window + bucket_size)
+        else:
+            # The oldest non-empty slot leaves the window first
+            oldest = next((index for index, key in enumerate(keys) if counters.get(key)), buckets - 1)
+            self.wait_time = (current + 1 + oldest) * bucket_size - now
+        outcome = "allowed" if allowed else "rejected"
+        store.incr_many({stats_key(scope, self.kind, outcome, int(now) // 3600): 1}, STATS_HOURS * 3600)
+        return allowed
+
+    def wait(self):
+        return max(0, getattr(self, "wait_time", 0))
+
+
+class IPRateThrottle(SlidingWindowThrottle):
+    """
+    Keyed by the client address. get_ident only trusts X-Forwarded-For up to
+    REST_FRAMEWORK['NUM_PROXIES'] hops (0 by default: REMOTE_ADDR), so a
+    client cannot dodge the limit by rotating that header.
+    """
+
+    kind = "ip"
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class EmailRateThrottle(SlidingWindowThrottle):
+    """Keyed by the email in the body, so distributed guesses against one account are limited too."""
+
+    kind = "email"
+
+    def get_key(self, request, view):
+        try:
+            email = request.data.get("email")
+        except AttributeError:
+            return None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+
+class GlobalRateThrottle(SlidingWindowThrottle):
+    """Caps the total attempts of a scope, whatever their origin."""
+
+    kind = "global"
+
+    def get_key(self, request, view):
+        return "all"
+
+
+class AuthThrottled(Throttled):
+    default_detail = "Demasiados intentos, inténtalo más tarde."
+    extra_detail_singular = "Vuelve a intentarlo en {wait} segundo."
+    extra_detail_plural = "Vuelve a intentarlo en {wait} segundos."
+
+
+class AuthThrottleMixin:
+    """
+    Applies the IP, email and global throttles in that order and stops at the
+    first rejection, so a flood from one address does not use up the global rate.
+    """
+
+    throttle_classes = [IPRateThrottle, EmailRateThrottle, GlobalRateThrottle]
+
+    def check_throttles(self, request):
+        for throttle in self.get_throttles():
+            if not throttle.allow_request(request, self):
+                raise AuthThrottled(throttle.wait())
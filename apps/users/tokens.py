@@ -0,0 +1,45 @@
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import get_blacklist_filter
+
+# Claims added to every token issued for a user
+ROLE_CLAIM = "role"
+ROLE_ID_CLAIM = "role_id"
+VERSION_CLAIM = "ver"
+
+
+def stamp_user_claims(token, user):
+    """Writes the role and the auth version of the user into the token."""
+    token[ROLE_CLAIM] = user.role.name if user.role_id else None
+    token[ROLE_ID_CLAIM] = user.role_id
+    token[VERSION_CLAIM] = user.auth_version
+    return token
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the role name and the user's auth_version. The
+    claims are copied to the access tokens it creates, so authentication can
+    trust them while the version still matches.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        return stamp_user_claims(super().for_user(user), user)
+
+    def check_blacklist(self):
+        # Skip the blacklist query when the JTI is certainly not blacklisted
+        blacklist_filter = get_blacklist_filter()
+        if blacklist_filter and not blacklist_filter.might_be_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            return
+        super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter = get_blacklist_filter()
+        if blacklist_filter:
+            blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+            transaction.on_commit(blacklist_filter.publish)
+        return result
@@ -17,6 +17,8 @@ from .views import (
     PasswordResetRequestView,
     PasswordResetValidateView,
     PasswordResetConfirmView,
+    ThrottleStatsView,
+    StaffUserImportView,
 )
 from .oauth.views import GoogleOAuthView
 
@@ -55,6 +57,8 @@ urlpatterns = [
     path('password-reset/', PasswordResetRequestView.as_view()),
     path('password-reset/validate/', PasswordResetValidateView.as_view()),
     path('password-reset/confirm/', PasswordResetConfirmView.as_view()), # Listar y crear usuarios
+    path('throttle-stats/', ThrottleStatsView.as_view(), name='throttle-stats'),
+    path('users/import/', StaffUserImportView.as_view(), name='users-import'),
     path('users/<int:pk>/', UserRetrieveUpdateDeleteView.as_view(), name='user-detail'),  # Operaciones en un usuario específico
     path('users/<str:role>/', UserListCreateView.as_view()),
     path('auth/google/', GoogleOAuthView.as_view(), name='google_oauth'),
@@ -1,22 +1,21 @@
 from django.core.mail import EmailMessage
-import random
 from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import status
 from apps.users.serializers import UserSerializer
-from .models import User, OneTimePassword
+from .models import User
+from .otp import EMAIL_VERIFICATION, issue_token
 from django.contrib.sites.shortcuts import get_current_site
 
 
 
 def send_generated_otp_to_email(email, request): 
     subject = "One time passcode for Email verification"
-    otp=random.randint(1000, 9999) 
     current_site=get_current_site(request).domain
     user = User.objects.get(email=email)
+    otp=issue_token(user, EMAIL_VERIFICATION)
     email_body=f"Hi {user.first_name} thanks for signing up on {current_site} please verify your email with the \n one time passcode {otp}"
     from_email=settings.EMAIL_HOST
-    otp_obj=OneTimePassword.objects.create(user=user, otp=otp)
     #send the email 
     d_email=EmailMessage(subject=subject, body=email_body, from_email=from_email, to=[user.email])
     d_email.send()
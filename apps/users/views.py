@@ -1,11 +1,15 @@
 from email.mime.image import MIMEImage
+from itertools import islice
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from apps.users.permissions import IsStaff
 from apps.users.utils import generate_login_response
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework import mixins
-from rest_framework.generics import GenericAPIView, ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.generics import GenericAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -22,13 +26,18 @@ from .serializers import (
     UserSerializer,
     UserFormSerializer,
     PasswordResetRequestSerializer,
+    RoleTokenRefreshSerializer,
 )
 from allauth.socialaccount.providers.oauth2.client import OAuth2Error
 
 from rest_framework.decorators import api_view
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import RoleRefreshToken
+from .oauth.verifier import verify_google_id_token
 from django.contrib.auth import logout
-from .models import OneTimePassword, User
+from .models import User
+from .throttling import AuthThrottleMixin, throttle_stats
+from .imports import UserImporter, iter_user_rows, result_row
+from .otp import EXPIRED, PASSWORD_RESET, VALID, check_token, consume_token, issue_token
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
@@ -41,7 +50,6 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from google.oauth2 import id_token
 from google.auth.transport import requests
 # users/views.py
 from .models import Role  # Asegúrate de que la ruta de importación sea correcta
@@ -50,16 +58,95 @@ User = get_user_model()
 
 
 # Manage Users
-class StaffRegisterView(GenericAPIView):
+class UserCursorPagination(CursorPagination):
+    """Keyset pagination, pages cost the same at any depth and need no COUNT."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-date_joined', '-id')
+
+
+class UserListMixin:
+    """
+    Filters (role, is_verified, country, type_identity_document), prefix search
+    (`q` over email, names and document number) and sparse fields (`fields`)
+    shared by the user administration listings.
+    """
+    pagination_class = UserCursorPagination
+    filter_fields = ('is_verified', 'country', 'type_identity_document')
+    # Fields a listing may be restricted to; must exist on the serializer
+    sparse_fields = ()
+    # Columns needed by the fields that are not model fields (or relations)
+    field_sources = {
+        'role': ('role__name',),
+        'role_name': ('role__name',),
+        'full_name': ('first_name', 'last_name'),
+    }
+
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [name for name in fields.split(',') if name in self.sparse_fields] or None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_requested_fields()
+        return context
+
+    def filter_users(self, queryset, role=None):
+        params = self.request.query_params
+        role = role or params.get('role')
+        if role:
+            queryset = queryset.filter(role_id__in=Role.objects.filter(name=role).values('id'))
+        for field in self.filter_fields:
+            value = params.get(field)
+            if value is None or value == '':
+                continue
+            if field == 'is_verified':
+                value = value.lower() in ('1', 'true')
+            queryset = queryset.filter(**{field: value})
+
+        term = params.get('q', '').strip()
+        if term:
+            # Prefijos: servidos por el índice de document_number y los índices trigram de 0013
+            queryset = queryset.filter(
+                Q(email__istartswith=term)
+                | Q(first_name__istartswith=term)
+                | Q(last_name__istartswith=term)
+                | Q(document_number__startswith=term)
+            )
+
+        fields = self.get_requested_fields()
+        if fields:
+            # Solo se leen las columnas de los campos pedidos (date_joined la usa el cursor)
+            model_fields = {field.name for field in User._meta.concrete_fields}
+            only = {'id', 'date_joined'}
+            for name in fields:
+                only.update(self.field_sources.get(name, (name,) if name in model_fields else ()))
+            if not any(name.startswith('role__') for name in only):
+                queryset = queryset.select_related(None)
+            queryset = queryset.prefetch_related(None).only(*only)
+        return queryset
+
+
+class StaffRegisterView(UserListMixin, GenericAPIView):
     serializer_class = StaffRegisterSerializer
     permission_classes = [IsStaff]
-    
+    sparse_fields = (
+        'id', 'email', 'first_name', 'last_name', 'role_name', 'role', 'full_name',
+        'is_verified', 'is_active', 'is_staff', 'date_joined', 'last_login',
+    )
 
     def get_queryset(self):
         """
         Retorna solo usuarios con rol de staff
         """
-        return User.objects.filter(role__name="staff")
+        return (
+            User.objects.filter(role__name="staff")
+            .select_related('role')
+            .prefetch_related('groups', 'user_permissions')
+        )
 
     def get(self, request, pk=None):
         if pk:
@@ -77,11 +164,26 @@ class StaffRegisterView(GenericAPIView):
                     status=status.HTTP_404_NOT_FOUND,
                 )
         else:
-            # Obtener todos los usuarios staff
-            users = self.get_queryset()
-            serializer = self.serializer_class(users, many=True)
+            users = self.filter_users(self.get_queryset())
+            if request.query_params.get('legacy', '').lower() in ('1', 'true'):
+                # Formato anterior (todos los staff con "total") para los clientes que aún lo leen
+                users = list(users)
+                serializer = self.get_serializer(users, many=True)
+                return Response(
+                    {"status": "success", "total": len(users), "data": serializer.data},
+                    status=status.HTTP_200_OK,
+                )
+
+            # Usuarios staff paginados por cursor, sin COUNT sobre la tabla
+            page = self.paginate_queryset(users)
+            serializer = self.get_serializer(page, many=True)
             return Response(
-                {"status": "success", "total": users.count(), "data": serializer.data},
+                {
+                    "status": "success",
+                    "next": self.paginator.get_next_link(),
+                    "previous": self.paginator.get_previous_link(),
+                    "data": serializer.data,
+                },
                 status=status.HTTP_200_OK,
             )
 
@@ -145,7 +247,8 @@ class StaffRegisterView(GenericAPIView):
             )
 
 
-class RegisterView(GenericAPIView):
+class RegisterView(AuthThrottleMixin, GenericAPIView):
+    throttle_scope = "register"
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
 
@@ -206,20 +309,6 @@ class RegisterView(GenericAPIView):
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-# Lista y creación de usuarios
-class UserListCreateView(ListCreateAPIView):
-   queryset = User.objects.all()
-   serializer_class = UserSerializer
-
-   def get(self, request, role=None, *args, **kwargs):
-       if role and role in ['sales', 'staff', 'client']:
-           queryset = self.get_queryset().filter(role__name=role)
-       else:
-           queryset = self.get_queryset()
-       
-       serializer = self.get_serializer(queryset, many=True)
-       return Response(serializer.data)
-
 # Detalle, actualización y eliminación de un usuario específico
 class UserRetrieveUpdateDeleteView(RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
@@ -243,13 +332,17 @@ def update_user_personal_data(request, user_id):
 
 class CustomTokenRefreshView(TokenRefreshView):
     """
-    Custom token refresh view that extends from TokenRefreshView
+    Custom token refresh view that extends from TokenRefreshView.
+    Re-stamps the role and version claims on every refresh.
     """
+    serializer_class = RoleTokenRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
         return response
 
-class LoginView(GenericAPIView):
+class LoginView(AuthThrottleMixin, GenericAPIView):
+    throttle_scope = "login"
     serializer_class = LoginSerializer
     permission_classes = [AllowAny]
 
@@ -282,7 +375,7 @@ class LogoutView(GenericAPIView):
         try:
             refresh_token = request.data.get("refresh_token")
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = RoleRefreshToken(refresh_token)
                 token.blacklist()
             logout(request)
             return Response(
@@ -301,12 +394,7 @@ class GoogleLogin(SocialLoginView):
 class CustomGoogleOAuth2Adapter(GoogleOAuth2Adapter):
    def complete_login(self, request, app, token, **kwargs):
        try:
-           id_token_object = id_token.verify_oauth2_token(
-               token.token,
-               requests.Request(),
-               app.client_id,
-               clock_skew_in_seconds=5
-           )
+           id_token_object = verify_google_id_token(token.token, app.client_id)
 
            return self.get_provider().sociallogin_from_response(request, {
                'id': id_token_object['sub'],
@@ -340,7 +428,7 @@ class GoogleLoginWithToken(SocialLoginView):
                    user.role = client_role
                    user.save()
                    print(f"Rol asignado: {user.role}")
-               refresh = RefreshToken.for_user(user)
+               refresh = RoleRefreshToken.for_user(user)
                # Solo acceder a role.name si role no es None
                role_str = str(user.role.name) if (hasattr(user, 'role') and user.role) else 'client'
                response.data.update({
@@ -661,11 +749,17 @@ class RoleCreateView(GenericAPIView):
 
 
 
-class UserListCreateView(mixins.ListModelMixin,
+class UserListCreateView(UserListMixin,
+                         mixins.ListModelMixin,
                          mixins.CreateModelMixin,
                          GenericAPIView):
     queryset = User.objects.all().select_related('role')
     serializer_class = UserFormSerializer # Cambia según necesidad
+    sparse_fields = ('id', 'username', 'email', 'role', 'phone_number', 'is_verified')
+
+    def get_queryset(self):
+        # users/<role>/ filtra por rol igual que ?role=
+        return self.filter_users(super().get_queryset(), role=self.kwargs.get('role'))
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -694,7 +788,8 @@ class UserRetrieveUpdateDestroyView(mixins.RetrieveModelMixin,
     def delete(self, request, *args, **kwargs):
         return self.destroy(request, *args, **kwargs)
 
-class PasswordResetRequestView(GenericAPIView):
+class PasswordResetRequestView(AuthThrottleMixin, GenericAPIView):
+    throttle_scope = "password_reset"
     serializer_class = PasswordResetRequestSerializer
     permission_classes = [AllowAny]
     def post(self, request):
@@ -705,16 +800,10 @@ class PasswordResetRequestView(GenericAPIView):
         frontend_url = serializer.validated_data['frontend_url']
         try:
             user = User.objects.get(email=email)
-             # Elimina tokens anteriores para ese usuario
-            OneTimePassword.objects.filter(user=user).delete()
-            # Crea un nuevo token
-            reset_token = OneTimePassword.objects.create(user=user)
-            token = str(reset_token.otp)
+            # Reemplaza cualquier token anterior, solo se guarda su hash (en caché con TTL)
+            token = issue_token(user, PASSWORD_RESET)
             uid = urlsafe_base64_encode(force_bytes(user.pk))
             reset_link = f"{frontend_url}/reset-password/{uid}/{token}/"
-            print(f"Este es el uid: {uid}")
-            print(f"Este es el token: {token}")
-            print(f"Este es el reset_link: {reset_link}")
             context = {
                 "reset_link": reset_link,
                 "current_year": now().year,
@@ -747,21 +836,75 @@ class PasswordResetRequestView(GenericAPIView):
             pass 
         return Response({"message": "Si el correo existe, se ha enviado un enlace"}, status=200)
 
+class ThrottleStatsView(GenericAPIView):
+    """Intentos permitidos y rechazados por los límites de autenticación en las últimas 24 horas."""
+    permission_classes = [IsAuthenticated, IsStaff]
+
+    def get(self, request):
+        return Response(throttle_stats(), status=status.HTTP_200_OK)
+
+
+class StaffUserImportView(GenericAPIView):
+    """
+    Upload of a CSV of users (email, password, role, document_number, ...) for
+    agent onboarding and customer migrations. Rows with errors are skipped and
+    reported, the rest are created in batches.
+
+    Passwords are hashed inside the request, without a process pool (a
+    gunicorn worker must not fork one), so the file is capped at max_rows.
+    Larger files and already hashed passwords go through `manage.py
+    import_users`.
+    """
+    permission_classes = [IsStaff]
+    parser_classes = [MultiPartParser, FormParser]
+    # ~0.2 s por hash con el perfil staff: 100 filas quedan bajo el timeout de 30 s de gunicorn
+    max_rows = 100
+    # Errors returned in the response, the summary always covers the whole file
+    max_errors = 1000
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'Se requiere el archivo CSV de usuarios'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows = list(islice(iter_user_rows(upload), self.max_rows + 1))
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.max_rows:
+            return Response(
+                {'error': f'El archivo supera las {self.max_rows} filas, use el comando import_users'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        summary = {'created': 0, 'error': 0}
+        errors = []
+        importer = UserImporter(workers=0, default_role=request.data.get('role') or Role.CLIENT)
+        for result in importer.run(rows):
+            summary[result.status] += 1
+            if result.errors and len(errors) < self.max_errors:
+                errors.append(result_row(result))
+
+        return Response({
+            'summary': summary,
+            'errors': errors,
+            'truncated': summary['error'] > len(errors),
+        }, status=status.HTTP_201_CREATED if summary['created'] else status.HTTP_200_OK)
+
+
 class PasswordResetValidateView(APIView):
     permission_classes = [AllowAny]
     def get(self, request):
         uid = request.query_params.get("uid")
         token = request.query_params.get("token")
         try:
-            uid = force_str(urlsafe_base64_decode(uid))
-            user = User.objects.get(pk=uid)
-            reset_token = OneTimePassword.objects.get(user=user, otp=token)
-            if reset_token.is_expired():
-                reset_token.delete()
+            uid = int(force_str(urlsafe_base64_decode(uid)))
+            result = check_token(uid, token, PASSWORD_RESET)
+            if result == EXPIRED:
                 return Response({"valid": False, "reason": "expired"}, status=400)
+            if result != VALID:
+                return Response({"valid": False}, status=400)
             return Response({"valid": True})
-        except OneTimePassword.DoesNotExist:
-            return Response({"valid": False}, status=400)
         except Exception as e:
             print(f"Error en validación: {e}")
             return Response({"valid": False}, status=400)
@@ -773,22 +916,20 @@ class PasswordResetConfirmView(APIView):
         token = request.data.get("token")
         new_password = request.data.get("password")
         try:
-            uid = force_str(urlsafe_base64_decode(uid))
-            user = User.objects.get(pk=uid)
-            reset_token = OneTimePassword.objects.get(user=user, otp=token)
-            if reset_token.is_expired():
-                reset_token.delete()
+            uid = int(force_str(urlsafe_base64_decode(uid)))
+            # Valida y elimina el token en un solo paso, no puede usarse dos veces
+            result = consume_token(uid, token, PASSWORD_RESET)
+            if result == EXPIRED:
                 return Response({"error": "Token expirado"}, status=400)
+            if result != VALID:
+                return Response({"error": "Token inválido"}, status=400)
 
+            user = User.objects.get(pk=uid)
             user.set_password(new_password)
             user.save()
-            # Elimina el token después de usarlo
-            reset_token.delete()
 
             return Response({"message": "Contraseña restablecida con éxito"})
 
-        except OneTimePassword.DoesNotExist:
-            return Response({"error": "Token inválido"}, status=400)
         except Exception as e:
             print(f"Error al restablecer la contraseña: {e}")
             return Response({"error": "Token inválido o expirado"}, status=400)
\ No newline at end of file
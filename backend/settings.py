@@ -2,6 +2,7 @@ import environ
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 
 env = environ.Env(
     # set casting, default value
@@ -76,6 +77,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    # Las vistas de la API responden 503 si el pool de hashing está lleno; el resto espera turno
+    "apps.users.hashers.HashingFailFastMiddleware",
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -138,14 +141,31 @@ DATABASES = {
 
 REST_FRAMEWORK = {
     "NON_FIELD_ERRORS_KEY": "error",
+    "EXCEPTION_HANDLER": "apps.users.hashers.api_exception_handler",
+    # Proxies delante de gunicorn; con 0 la IP de los throttles es REMOTE_ADDR y X-Forwarded-For se ignora.
+    # Detrás de nginx u otro proxy, NUM_PROXIES=1 para tomar la IP que agrega el proxy.
+    "NUM_PROXIES": env.int("NUM_PROXIES", default=0),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # Lecturas autenticadas con los claims del token, sin consultar User/Role
+        "apps.users.authentication.RoleJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     #TODOS LOS ENDPOINTS DEBEN SER AUTENTICADOS
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # Límites de login, registro y restablecimiento (apps.users.throttling), "n/periodo" con periodo s, m, h o d
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": "20/m",
+        "login_email": "10/15m",
+        "login_global": "600/m",
+        "register_ip": "10/h",
+        "register_email": "5/h",
+        "register_global": "300/m",
+        "password_reset_ip": "10/h",
+        "password_reset_email": "3/h",
+        "password_reset_global": "300/m",
+    },
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',  # Habilita el browsable API
@@ -154,13 +174,60 @@ REST_FRAMEWORK = {
 
 }
 
-# Cache simple en memoria para acelerar endpoints (p.ej., blogs list/retrieve)
+# Cachés configurables por entorno. En producción apuntar a un backend compartido, p.ej.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache y CACHE_LOCATION=redis://host:6379/0
+CACHE_BACKEND = env('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+BLOG_CACHE_BACKEND = env('BLOG_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'local-inmemory-cache',
-    }
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': env('CACHE_LOCATION', default='local-inmemory-cache'),
+        # Los snapshots de cuentas bancarias ocupan una entrada por cuenta; Redis no admite MAX_ENTRIES
+        'OPTIONS': {} if 'redis' in CACHE_BACKEND else {'MAX_ENTRIES': 20000},
+    },
+    # Respuestas del API de blogs (apps.blogs.cache), invalidadas por etiquetas al guardar un Blog.
+    # Debe ser compartida entre workers; el backend de archivos sirve en una sola máquina y en pruebas
+    'blogs': {
+        'BACKEND': BLOG_CACHE_BACKEND,
+        'LOCATION': env('BLOG_CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'brasper-blogs-cache')),
+        'TIMEOUT': 60 * 60 * 6,
+        'OPTIONS': {} if 'redis' in BLOG_CACHE_BACKEND else {'MAX_ENTRIES': 5000},
+    },
 }
+# Feed en tiempo real de transacciones para vendedores (SSE). Se sirve con la aplicación ASGI
+# (gunicorn con UvicornWorker, ver ecosystem.config.js): la espera no ocupa un hilo ni un worker.
+# CacheChannelLayer reparte eventos entre procesos que comparten la caché (no LocMem: el feed
+# responde 503); InMemoryChannelLayer sirve para pruebas y un solo proceso.
+# Cada respuesta dura como máximo MAX_DURATION segundos; el cliente se reconecta con Last-Event-ID
+# y recibe lo publicado en RETENTION segundos. El feed se abre con un ticket de TICKET_TTL segundos
+# (POST feed/ticket/), nunca con el token de acceso en la URL.
+TRANSACTION_FEED = {
+    'LAYER': 'apps.transactions.realtime.CacheChannelLayer',
+    'POLL_INTERVAL': 1.0,
+    'RETENTION': 300,
+    'KEEPALIVE': 15,
+    'MAX_DURATION': 300,
+    'TICKET_TTL': 60,
+}
+
+# Reglas de velocidad al crear transacciones. Si una transacción supera alguna
+# regla dentro de su ventana (segundos) se crea con estado "observed".
+# max_amount es un límite por código de moneda de origen; los montos de cada
+# moneda se acumulan por separado y las monedas sin límite solo se cuentan.
+TRANSACTION_RISK = {
+    'STORE': 'apps.common.counters.CacheCounterStore',
+    'BUCKETS': 12,
+    'RULES': [
+        {'name': 'user_hourly_count', 'dimension': 'user', 'window': 60 * 60, 'max_count': 5},
+        {
+            'name': 'user_daily_amount', 'dimension': 'user', 'window': 60 * 60 * 24,
+            'max_amount': {'PEN': 20000, 'BRL': 30000, 'USD': 5000},
+        },
+        {'name': 'document_daily_count', 'dimension': 'document', 'window': 60 * 60 * 24, 'max_count': 10},
+        {'name': 'destination_hourly_count', 'dimension': 'destination_account', 'window': 60 * 60, 'max_count': 5},
+    ],
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -169,9 +236,48 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+# Contadores de los throttles de autenticación; LocalCounterStore para un solo proceso
+AUTH_THROTTLE = {
+    "STORE": "apps.common.counters.CacheCounterStore",
+    "BUCKETS": 10,
+}
+
+# Bloom filter en memoria de los JTI en la blacklist, evita la consulta en la mayoría de refresh.
+# Solo se usa con una caché compartida (CACHE_BACKEND): con LocMem cada refresh consulta la blacklist.
+# El filtro se pone al día (una consulta) cada vez que otro worker publica un JTI nuevo.
+TOKEN_BLACKLIST_FILTER = {
+    "ENABLED": True,
+    "CAPACITY": 100000,
+    "ERROR_RATE": 0.01,
+    "REBUILD_INTERVAL": 3600,
+}
+
+# El primero es el algoritmo por defecto; los demás solo verifican hashes antiguos,
+# que se recalculan con el perfil del usuario en su siguiente login
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# Perfiles de hashing por tipo de usuario (apps.users.hashers). MEMORY_COST en KiB.
+# MAX_WORKERS: hilos de hashing por proceso; QUEUE_SIZE/QUEUE_TIMEOUT: espera máxima antes de responder 503
+PASSWORD_HASHING = {
+    "PROFILES": {
+        "default": {"HASHER": "argon2", "TIME_COST": 2, "MEMORY_COST": 19456, "PARALLELISM": 1},
+        "staff": {"HASHER": "argon2", "TIME_COST": 3, "MEMORY_COST": 65536, "PARALLELISM": 1},
+    },
+    "MAX_WORKERS": 2,
+    "QUEUE_SIZE": 16,
+    "QUEUE_TIMEOUT": 2,
+}
+
 AUTHENTICATION_BACKENDS = [
-    # Needed to login by username in Django admin, regardless of `allauth`
-    "django.contrib.auth.backends.ModelBackend",
+    # Needed to login by username in Django admin, regardless of `allauth`.
+    # Igual que ModelBackend, pero el usuario de la sesión se lee desde caché
+    "apps.users.backends.CachedModelBackend",
     # `allauth` specific authentication methods, such as login by email
     "allauth.account.auth_backends.AuthenticationBackend",
 ]
@@ -180,6 +286,13 @@ AUTHENTICATION_BACKENDS = [
 DOMAIN = "localhost:3000"
 SITE_NAME = "Henry Ultimate Authentication Course"
 
+# Verificación local de ID tokens de Google; los certificados se guardan en memoria según su Cache-Control
+GOOGLE_ID_TOKEN_VERIFIER = {
+    "STORE": "apps.users.oauth.verifier.GoogleCertificateStore",
+    "CLOCK_SKEW": 5,
+    "TIMEOUT": 5,
+}
+
 GOOGLE_CLIENT_ID = env("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = env("GOOGLE_CLIENT_SECRET")
 SOCIAL_AUTH_PASSWORD = "jgk348030gjw03"
@@ -231,6 +344,19 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 FRONTEND_URL = 'https://braspertransferencias.com/'  # Cambia esto según tu entorno
 
+# sitemap.xml y feeds RSS/Atom de los blogs (apps.blogs.feeds). POST_URL: página pública de
+# cada post en el frontend; ITEMS: entradas por feed
+BLOG_FEEDS = {
+    'POST_URL': FRONTEND_URL + 'blog/{slug}',
+    'TITLE': 'Blog Brasper',
+    'ITEMS': 50,
+}
+
+# Adjuntos del libro de reclamaciones: tamaño máximo en bytes
+COMPLAINTS_UPLOAD = {
+    'MAX_SIZE': 10 * 1024 * 1024,
+}
+
 # Configuración de correo electrónico
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.hostinger.com'  # O el que uses
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.http import HttpResponse
 from django.conf.urls.static import static
 from django.conf import settings
+from apps.blogs.views import sitemap
 
 
 # Vista para la raíz
@@ -22,6 +23,9 @@ urlpatterns = [
     path("api/v1/company/", include("apps.company.urls")),
     path("api/v1/blogs/", include("apps.blogs.urls")),
 
+    # Los crawlers buscan el sitemap en la raíz
+    path("sitemap.xml", sitemap, name="sitemap"),
+
     # Ruta para la raíz
     path("", home_view, name="home"),
 ]
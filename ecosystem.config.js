@@ -3,7 +3,8 @@ module.exports = {
     {
       name: "api-brasper",
       script: "gunicorn",
-      args: "backend.wsgi:application --bind 0.0.0.0:8808",
+      // ASGI: las vistas síncronas corren en hilos y el feed SSE espera sin bloquear el worker
+      args: "backend.asgi:application --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8808",
       interpreter: "/root/apis-django/Api_BrasPer/venv/bin/python3",
       env: {
         "DJANGO_SETTINGS_MODULE": "backend.settings",